@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
-import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Literal
+from typing import Literal
+from urllib.parse import quote
 
 import numpy as np
-import requests
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
@@ -51,96 +57,279 @@ if GEMINI_KEY:
     os.environ["GOOGLE_API_KEY"] = GEMINI_KEY
     os.environ.setdefault("GEMINI_API_KEY", GEMINI_KEY)
 
+from tools.gemini_client import GeminiError, get_gemini_client
+from tools.answer_cache import ANSWER_CACHE_REQUESTS, AnswerCacheConstants, SemanticAnswerCache
+from tools.cv_index import CVIndex, CVIndexManager
+from tools.embeddings import EmbeddingError, provider_for_manifest
+from tools.conversation import ConversationConstants, ConversationStore, SQLiteSessionBackend, Turn
+from tools.metrics import EMBEDDING_CACHE, RETRIEVAL_LATENCY, MetricsConstants, MetricsMiddleware, registry
+from tools.prompt_builder import ContextItem, PromptBuilder
+from tools.rerank import RETRIEVAL_RESULTS, RerankConstants, get_reranker, mmr_select, top_candidates
+from tools.section_router import SECTION_FALLBACKS, section_router
+from tools.singleflight import SingleFlight
+from tools.tenants import TenantConstants, TenantMiddleware, TenantRegistry, UnknownTenant
+from tools.tracing import span, start_trace
+
 try:
-    from google.generativeai.embedding import embed_content  # type: ignore
+    from tools.pdf_generator import (
+        JobCompatibilityPDFGenerator, PDFTooLarge, pdf_store, shutdown_batch_pool, stream_pdf_zip
+    )
 except Exception:  # pragma: no cover
-    embed_content = None
+    JobCompatibilityPDFGenerator = None
+    PDFTooLarge = None
+    pdf_store = None
+    shutdown_batch_pool = None
+    stream_pdf_zip = None
 
+try:
+    from tools.thumbnail_cache import ThumbnailConstants, get_thumbnail_cache
+except Exception:  # pragma: no cover
+    ThumbnailConstants = None
+    get_thumbnail_cache = None
 
-def _load_cv() -> dict[str, Any]:
-    with open(CV_PATH, encoding="utf-8") as f:
-        return json.load(f)
+_pdf_generator = None
 
 
-def _load_embeddings() -> tuple[list[str], np.ndarray, np.ndarray]:
-    """
-    embeddings_data.pkl (generate_embeddings.py ile üretilen) formatı:
-      {
-        'chunks': [str, ...],
-        'embeddings': np.ndarray (N x 768),
-        'cv_json': {...},
-        ...
-      }
-    """
-    with open(EMBEDDINGS_PATH, "rb") as f:
-        data = pickle.load(f)
+def _get_pdf_generator():
+    global _pdf_generator
+    if _pdf_generator is None and JobCompatibilityPDFGenerator is not None:
+        _pdf_generator = JobCompatibilityPDFGenerator()
+    return _pdf_generator
 
-    chunks = data.get("chunks") or []
-    emb = np.asarray(data.get("embeddings"))
-    if emb.ndim != 2:
-        raise RuntimeError("embeddings_data.pkl beklenmeyen formatta (embeddings 2D değil).")
-    norms = np.linalg.norm(emb, axis=1) + 1e-8
-    return list(chunks), emb.astype(np.float32, copy=False), norms.astype(np.float32, copy=False)
 
+# CV + embedding'ler tek bir değişmez snapshot'ta; dosyalar değişince arka planda yeniden kurulup atomik olarak değiştirilir
+cv_index = CVIndexManager(CV_PATH, EMBEDDINGS_PATH)
 
-CV_JSON: dict[str, Any] = _load_cv() if CV_PATH.exists() else {}
-CHUNKS: list[str] = []
-EMB: np.ndarray | None = None
-EMB_NORMS: np.ndarray | None = None
 
-if EMBEDDINGS_PATH.exists():
-    CHUNKS, EMB, EMB_NORMS = _load_embeddings()
+# Aynı anda gelen özdeş istekler tek bir upstream çağrısını paylaşır
+_embed_flight = SingleFlight("embed")
+_chat_flight = SingleFlight("chat")
 
+# Aynı soru hem answer cache hem retrieval için embed edilir; küçük bir LRU tekrarları önler
+_QUERY_EMB_MAX = 1024
+_query_emb_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+_query_emb_lock = threading.Lock()
 
-def _embed_query(text: str) -> np.ndarray | None:
-    if not GEMINI_KEY or embed_content is None:
-        return None
+answer_cache = SemanticAnswerCache()
+_prompt_builder = PromptBuilder()
+
+
+def _cache_partition(index: CVIndex) -> str:
+    # Farklı sağlayıcının vektörleri (boyutları da) karşılaştırılamaz
+    return f"{index.version}/{index.embedding_id}"
+
+
+def _on_index_swap(old: CVIndex, new: CVIndex) -> None:
+    # Eski CV sürümünün partition'ı zaten erişilemez; belleği hemen bırak
+    if _cache_partition(old) != _cache_partition(new):
+        answer_cache.clear()
+    if old.embedding_id != new.embedding_id:
+        provider_for_manifest(new.manifest).warm()
+
+
+cv_index.on_swap(_on_index_swap)
+cv_index.start()
+# Yerel embedding modeli ilk sorudan önce yüklensin (Gemini için no-op)
+provider_for_manifest(cv_index.current.manifest).warm()
+
+# Diğer portföyler (PORTFOLIO_TENANTS_DIR) ilk istekte mmap ile yüklenir; varsayılan tenant yukarıdaki index
+tenants = TenantRegistry(cv_index)
+
+
+def _tenant_index(request: Request) -> tuple[str, CVIndex]:
+    tenant = getattr(request.state, "tenant", TenantConstants.DEFAULT_TENANT)
     try:
-        vec = embed_content(model="models/embedding-001", content=text)["embedding"]
-        return np.asarray(vec, dtype=np.float32)
-    except Exception:
+        return tenant, tenants.get(tenant)
+    except UnknownTenant:
+        raise HTTPException(status_code=404, detail="Portföy bulunamadı.")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _embed_query(index: CVIndex, text: str) -> np.ndarray | None:
+    # Sorgu, index'i üreten sağlayıcıyla gömülür (manifest); yerel modelde ağ çağrısı yok
+    provider = provider_for_manifest(index.manifest)
+    if not provider.available:
         return None
+    key = f"{index.embedding_id}|{_normalize(text)}"
+    with _query_emb_lock:
+        cached = _query_emb_cache.get(key)
+        if cached is not None:
+            _query_emb_cache.move_to_end(key)
+    if cached is not None:
+        EMBEDDING_CACHE.labels("query", "hit").inc()
+        return cached
+    EMBEDDING_CACHE.labels("query", "miss").inc()
+
+    with span("embed", chars=len(text), cache="miss", provider=provider.name) as s:
+        try:
+            arr, shared = _embed_flight.do(key, lambda: provider.embed(_normalize(text)))
+            s.set(ok=True, coalesced=shared)
+        except EmbeddingError:
+            s.set(ok=False)
+            return None
+    with _query_emb_lock:
+        _query_emb_cache[key] = arr
+        while len(_query_emb_cache) > _QUERY_EMB_MAX:
+            _query_emb_cache.popitem(last=False)
+    return arr
 
 
-def rag_search(query: str, top_k: int = 5) -> list[str]:
-    if EMB is None or EMB_NORMS is None or not CHUNKS:
-        return [json.dumps(CV_JSON, ensure_ascii=False, indent=2)] if CV_JSON else []
+def _chunk_item(index: CVIndex, i: int, score: float) -> ContextItem:
+    return ContextItem(index.chunks[i], score, index.chunk_tokens[i])
 
-    q = _embed_query(query.lower().strip())
-    if q is None:
-        # API anahtarı yoksa: basit fallback
-        ql = query.lower()
-        hits = [c for c in CHUNKS if any(tok in c.lower() for tok in ql.split() if len(tok) > 2)]
-        return (hits[:top_k] if hits else CHUNKS[:top_k]) or []
 
+def _vector_candidates(index: CVIndex, q: np.ndarray, ranges: list[tuple[int, int]],
+                       n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(rows, cosine, float32 vectors) of the n best rows in ranges, best first."""
     qn = float(np.linalg.norm(q) + 1e-8)
-    sims = (EMB @ q) / (EMB_NORMS * qn)
-    idx = np.argsort(sims)[-top_k:][::-1]
-    return [CHUNKS[int(i)] for i in idx]
+    rows = np.concatenate([np.arange(a, b) for a, b in ranges]) if len(ranges) > 1 else None
+    with span("similarity", rows=sum(b - a for a, b in ranges), storage=index.storage):
+        sel = slice(*ranges[0]) if rows is None else rows
+        # Kuantize index'te tarama int8 / float16 kopya üzerinde yapılır
+        if index.quantized is not None:
+            sims = index.quantized.dot(q, sel) / (index.emb_norms[sel] * qn)
+        else:
+            sims = (index.emb[sel] @ q) / (index.emb_norms[sel] * qn)
+        cand = top_candidates(sims, n)
+        cand_rows = (ranges[0][0] + cand) if rows is None else rows[cand]
+        cand_sims = sims[cand]
+
+    # Adayların float32 satırları; kuantize index'te mmap'ten sadece bu satırlar okunur
+    cand_vecs = index.emb[cand_rows]
+    if index.quantized is not None and index.quantized.rescore:
+        # Kesin skorlarla yeniden sırala (eşik, bölüm fallback'i ve MMR de bu skorlarla çalışır)
+        with span("rescore", candidates=len(cand)):
+            cand_sims = (cand_vecs @ q) / (index.emb_norms[cand_rows] * qn)
+            order = np.argsort(cand_sims)[::-1]
+            cand_rows, cand_sims, cand_vecs = cand_rows[order], cand_sims[order], cand_vecs[order]
+    return cand_rows, cand_sims, cand_vecs
+
+
+def _retrieve(index: CVIndex, query: str, top_k: int,
+              sections: list[str] | None = None) -> tuple[list[ContextItem], str]:
+    """Return (items, mode) where mode is cv_json / section / keyword / vector."""
+    if not index.has_vectors:
+        cv = index.cv_json
+        return ([ContextItem(json.dumps(cv, ensure_ascii=False, indent=2))] if cv else []), "cv_json"
+
+    # Section filtresi: her section matriste bitişik bir blok; sadece o satırlar taranır
+    full = [(0, len(index.chunks))]
+    ranges = index.section_rows(sections) if sections else []
+    routed = bool(ranges)
+    if not routed:
+        ranges = full
+
+    q = _embed_query(index, query.lower().strip())
+    if q is None:
+        # Sağlayıcı kullanılamıyorsa (API anahtarı / yerel model yok): basit fallback (skor = sıra)
+        ql = query.lower()
+        candidates = [i for a, b in ranges for i in range(a, b)]
+        hits = [i for i in candidates if any(tok in index.chunks[i].lower() for tok in ql.split() if len(tok) > 2)]
+        picked = (hits or candidates)[:top_k]
+        return [_chunk_item(index, i, 1.0 - rank / (top_k + 1)) for rank, i in enumerate(picked)], "keyword"
+
+    n_cand = top_k * RerankConstants.CANDIDATE_FACTOR
+    cand_rows, cand_sims, cand_vecs = _vector_candidates(index, q, ranges, n_cand)
+    mode = "section" if routed else "vector"
+    if routed and float(cand_sims.max(initial=-1.0)) < section_router.min_similarity:
+        # Yönlendirilen bölümde güçlü eşleşme yok (alias yanlış tetiklendi): tüm matriste ara
+        SECTION_FALLBACKS.inc()
+        cand_rows, cand_sims, cand_vecs = _vector_candidates(index, q, full, n_cand)
+        mode = "vector"
+
+    # Opsiyonel cross-encoder: süre bütçesi aşılırsa None döner, bi-encoder skorlarıyla devam edilir
+    relevance = None
+    reranker = get_reranker()
+    if reranker.enabled:
+        with span("rerank", candidates=len(cand_rows)) as s:
+            relevance = reranker.score(query, [index.chunks[int(r)] for r in cand_rows])
+            s.set(ok=relevance is not None)
+
+    # Eşik + MMR: zayıf ve birbirinin tekrarı olan parçalar (ör. benzer yetenek chunk'ları) elenir
+    with span("mmr", candidates=len(cand_rows)) as s:
+        if relevance is not None:
+            picked = mmr_select(relevance, cand_vecs, top_k,
+                                min_similarity=RerankConstants.MIN_SCORE, relative_floor=0.0)
+        else:
+            picked = mmr_select(cand_sims, cand_vecs, top_k)
+        s.set(kept=len(picked))
+    return [_chunk_item(index, int(cand_rows[p]), score) for p, score in picked], mode
+
+
+def rag_search(query: str, top_k: int = 5, index: CVIndex | None = None,
+               sections: list[str] | None = None) -> list[ContextItem]:
+    index = index or cv_index.current
+    start = time.perf_counter()
+    with span("retrieve", top_k=top_k, index=index.version) as s:
+        chunks, mode = _retrieve(index, query, top_k, sections)
+        s.set(mode=mode, chunks=len(chunks))
+    RETRIEVAL_LATENCY.labels(mode).observe(time.perf_counter() - start)
+    RETRIEVAL_RESULTS.labels(mode).observe(len(chunks))
+    return chunks
 
 
 def gemini_generate(prompt: str) -> str:
-    key = GEMINI_KEY or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not key:
+    client = get_gemini_client()
+    if not client.api_key:
         return "⚠️ Gemini API anahtarı bulunamadı (GEMINI_API_KEY / GOOGLE_API_KEY)."
 
-    model = "gemini-2.5-flash"
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
-
+    with span("llm", prompt_chars=len(prompt)) as s:
+        try:
+            reply = client.generate(prompt, model="gemini-2.5-flash", timeout=60)
+            s.set(reply_chars=len(reply), error=False)
+            return reply
+        except GeminiError as e:
+            s.set(error=True)
+            return f"⚠️ Gemini yanıtı alınamadı: {e}"
+
+
+def _summarize_turns(previous: str, turns: list[Turn], lang: str) -> str | None:
+    """Eski mesajları mevcut özete katlar; arka planda, sohbet isteğinin dışında çalışır."""
+    client = get_gemini_client()
+    if not client.api_key:
+        return None
+    transcript = "\n".join(f"{role}: {content}" for role, content in turns)
+    if lang == "tr":
+        instruction = (
+            "Aşağıdaki sohbetin kısa bir özetini çıkar. Kullanıcının ne sorduğunu, hangi konuların "
+            "(proje, deneyim, yetenek) konuşulduğunu ve verilen önemli bilgileri koru. "
+            "En fazla 5 cümle, düz metin, Türkçe."
+        )
+        prev_label, turns_label = "Mevcut özet", "Yeni mesajlar"
+    else:
+        instruction = (
+            "Write a short summary of the conversation below. Keep what the user asked, which topics "
+            "(projects, experience, skills) were discussed and any key facts given. "
+            "At most 5 sentences, plain text, English."
+        )
+        prev_label, turns_label = "Current summary", "New messages"
+    prompt = f"{instruction}\n\n{prev_label}:\n{previous or '-'}\n\n{turns_label}:\n{transcript}"
     try:
-        r = requests.post(f"{url}?key={key}", headers={"Content-Type": "application/json"}, json=payload, timeout=60)
-        j = r.json()
-        return j["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception as e:
-        return f"⚠️ Gemini yanıtı alınamadı: {e}"
+        return client.generate(prompt, model="gemini-2.5-flash", timeout=60).strip()
+    except GeminiError as e:
+        print(f"Conversation summary failed: {e}")
+        return None
+
+
+conversations = ConversationStore(_summarize_turns, backend=SQLiteSessionBackend.from_env())
 
 
 # -----------------------------------------------------------------------------
 # FastAPI app + CORS (Render/Vercel)
 # ÖNEMLİ: CORSMiddleware app tanımından HEMEN sonra olmalı.
 # -----------------------------------------------------------------------------
-app = FastAPI(title="Portfolio AI Chatbot API")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    yield
+    # Batch PDF worker süreçleri uvicorn ile birlikte kapanmalı
+    if shutdown_batch_pool is not None:
+        shutdown_batch_pool()
+
+
+app = FastAPI(title="Portfolio AI Chatbot API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -153,7 +342,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", AnswerCacheConstants.BYPASS_HEADER],
 )
+app.add_middleware(MetricsMiddleware)
+# En dışta: /t/<tenant> önekini metrik ve routing'den önce soyar
+app.add_middleware(TenantMiddleware, tenants=tenants)
 
 
 class ChatMessage(BaseModel):
@@ -165,6 +358,24 @@ class ChatRequest(BaseModel):
     message: str = Field(min_length=1)
     history: list[ChatMessage] = Field(default_factory=list)
     lang: Literal["tr", "en"] = "tr"
+    # Verilirse geçmiş sunucuda tutulur (özet + son mesajlar); istemci sadece yeni mesajı gönderir
+    session_id: str | None = Field(default=None, pattern=r"^[A-Za-z0-9_-]{8,64}$")
+    # İstemcinin gördüğü mesaj sayısı; sunucu oturumu tanımıyorsa 409 ile history istenir
+    history_len: int = Field(default=0, ge=0)
+
+
+class PDFReport(BaseModel):
+    report_content: str = Field(min_length=1)
+    job_title: str = "Unknown Position"
+    candidate_name: str = "Fatma Betül Arslan"
+    language: Literal["tr", "en"] = "en"
+    company_name: str = "Unknown Company"
+    filename: str | None = None
+
+
+class PDFBatchRequest(BaseModel):
+    reports: list[PDFReport] = Field(min_length=1, max_length=500)
+    workers: int | None = Field(default=None, ge=1, le=32)
 
 # Statik dosyalar: URL'ler Streamlit ile aynı kalsın
 assets_dir = ROOT / "assets"
@@ -186,73 +397,223 @@ def health_head():
     return Response(status_code=200)
 
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition (worker başına; çoklu worker'da her biri ayrı scrape edilir)."""
+    return Response(registry.render(), media_type=MetricsConstants.CONTENT_TYPE)
+
+
 @app.get("/api/cv")
-def get_cv():
-    return CV_JSON
+def get_cv(request: Request):
+    _, index = _tenant_index(request)
+    return index.cv_json
 
 
-@app.post("/api/chat")
-def chat(req: ChatRequest):
-    msg = req.message.strip()
-    current_lang = req.lang
+def _chat_key(index: CVIndex, msg: str, lang: str, recent: list[Turn], summary: str = "") -> tuple[str, str, str, str]:
+    history = json.dumps([summary, [list(t) for t in recent]], ensure_ascii=False)
+    return index.version, _normalize(msg), lang, hashlib.sha1(history.encode("utf-8")).hexdigest()
 
-    recent = req.history[-6:] if len(req.history) > 6 else req.history
-    history_text = "\n".join([f"{m.role}: {m.content}" for m in recent])
 
-    retrieved = rag_search(msg, top_k=5)
+def _answer(index: CVIndex, msg: str, current_lang: str, recent: list[Turn], summary: str = "",
+            owner: str | None = None) -> str:
+    """RAG + prompt + Gemini; tek bir (index, mesaj, dil, geçmiş) için bir kez çalışır."""
+    with span("route") as s:
+        route = section_router.route(msg)
+        s.set(sections=",".join(route.sections) or "all")
+    context = rag_search(msg, top_k=5, index=index, sections=route.sections)
 
     # Proje adı geçiyorsa bağlama ekle (Streamlit mantığına yakın)
-    proj_blocks: list[str] = []
-    msg_lower = msg.lower()
-    for proj in (CV_JSON.get("projects") or []):
-        if not isinstance(proj, dict):
-            continue
-        name = str(proj.get("name") or "").strip()
-        if not name:
-            continue
-        if name.lower() in msg_lower:
-            proj_blocks.append(
-                "Proje Adı: {name}\nTeknolojiler: {tech}\nAçıklama: {desc}\nÖzellikler: {feat}".format(
-                    name=name,
-                    tech=proj.get("technology", ""),
-                    desc=proj.get("description", ""),
-                    feat=proj.get("features", ""),
-                )
+    with span("project_scan") as s:
+        matcher = index.matcher
+        matched = matcher.match(msg)
+        if matched:
+            # Açıkça adı geçen projeler benzerlik skorlarının önünde gelir
+            context.append(ContextItem(
+                "Eşleşen Projeler:\n" + "\n\n".join(matcher.blocks[i] for i in matched),
+                score=2.0,
+                tokens=5 + sum(matcher.block_tokens[i] for i in matched),
+            ))
+        s.set(matches=len(matched))
+
+    with span("prompt") as s:
+        if current_lang == "tr":
+            language_prompt = (
+                (f"Sen {owner} adlı kişinin AI portföy asistanısın. " if owner else
+                 "Sen Fatma Betül'ün AI portföy asistanısın. ")
+                + "Sadece Türkçe cevap ver. İngilizce çeviri yapma. "
+                "Kullanıcının sorusuna yanıt verirken aşağıdaki CV bağlamını kullan. "
+                "Bağlamda bilgi yoksa bunu açıkça belirt ve uydurma."
+            )
+            context_label = "CV Bağlamı"
+            question_label = "Kullanıcı Sorusu"
+        else:
+            language_prompt = (
+                (f"You are {owner}'s AI portfolio assistant. " if owner else
+                 "You are Fatma Betül's AI portfolio assistant. ")
+                + "Answer only in English. Do not provide Turkish translations. "
+                "Use the CV context below. If the context lacks the answer, say so."
             )
+            context_label = "CV Context"
+            question_label = "User Question"
 
-    context_chunks = list(retrieved)
-    if proj_blocks:
-        context_chunks.append("Eşleşen Projeler:\n" + "\n\n".join(proj_blocks))
+        built = _prompt_builder.build(
+            language_prompt, context_label, question_label, msg, context,
+            history=recent, lang=current_lang, summary=summary,
+        )
+        prompt = built.text
+        s.set(tokens=built.tokens, chunks=built.context_used, dropped=built.context_dropped,
+              history=built.history_used, chars=len(prompt))
 
-    context_text = "\n---\n".join(context_chunks)
+    return gemini_generate(prompt).strip()
 
-    if current_lang == "tr":
-        language_prompt = (
-            "Sen Fatma Betül'ün AI portföy asistanısın. "
-            "Sadece Türkçe cevap ver. İngilizce çeviri yapma. "
-            "Kullanıcının sorusuna yanıt verirken aşağıdaki CV bağlamını kullan. "
-            "Bağlamda bilgi yoksa bunu açıkça belirt ve uydurma."
-        )
-        context_label = "CV Bağlamı"
-        question_label = "Kullanıcı Sorusu"
-    else:
-        language_prompt = (
-            "You are Fatma Betül's AI portfolio assistant. "
-            "Answer only in English. Do not provide Turkish translations. "
-            "Use the CV context below. If the context lacks the answer, say so."
+
+@app.post("/api/chat")
+def chat(
+    req: ChatRequest,
+    request: Request,
+    response: Response,
+    x_answer_cache: str | None = Header(default=None),
+    cache_control: str | None = Header(default=None),
+):
+    msg = req.message.strip()
+    current_lang = req.lang
+    # İstek boyunca tek snapshot; reload sırasında gelen istek eski index ile tutarlı biter
+    tenant, index = _tenant_index(request)
+    owner = None if tenant == TenantConstants.DEFAULT_TENANT else index.cv_json.get("name")
+
+    with start_trace("chat", lang=current_lang, history_turns=len(req.history), tenant=tenant) as trace:
+        session = None
+        summary = ""
+        if req.session_id:
+            # Oturumlar tenant'a bağlı; başka portföyün id'si başka oturuma denk gelir
+            session_key = req.session_id if tenant == TenantConstants.DEFAULT_TENANT else f"{tenant}:{req.session_id}"
+            session = conversations.get_or_create(session_key, current_lang)
+            if session.is_empty and req.history_len and not req.history:
+                # Oturum süresi doldu / sunucu yeniden başladı: istemci son mesajlarla tekrar denesin
+                raise HTTPException(status_code=409, detail="session_unknown")
+            conversations.seed(session, [(m.role, m.content) for m in req.history])
+            summary, recent = session.snapshot()
+            trace.attrs.update(session_turns=session.summarized_turns + len(session.turns), summary=bool(summary))
+        else:
+            recent = [(m.role, m.content) for m in req.history[-ConversationConstants.KEEP_VERBATIM:]]
+
+        # Sadece geçmişsiz sorular cache'lenir; geçmiş cevabı değiştirir
+        bypass = (x_answer_cache or "").lower() == "bypass" or "no-cache" in (cache_control or "").lower()
+        cache_state = "bypass" if bypass else ("skip" if recent or summary else "miss")
+        qvec = None
+        if cache_state == "miss":
+            qvec = _embed_query(index, msg.lower().strip())
+            if qvec is None:
+                cache_state = "skip"    # Embedding yok: cache'e bakılamadı, miss sayılmaz
+            else:
+                with span("answer_cache") as s:
+                    found = answer_cache.get(qvec, current_lang, _cache_partition(index))
+                    s.set(cache="hit" if found else "miss")
+                if found:
+                    entry, score = found
+                    ANSWER_CACHE_REQUESTS.labels("hit").inc()
+                    response.headers[AnswerCacheConstants.BYPASS_HEADER] = "hit"
+                    response.headers["Server-Timing"] = trace.server_timing()
+                    if session is not None:
+                        conversations.append(session, msg, entry.reply)
+                    return {"reply": entry.reply, "session_id": req.session_id}
+        ANSWER_CACHE_REQUESTS.labels(cache_state).inc()
+
+        reply, shared = _chat_flight.do(
+            _chat_key(index, msg, current_lang, recent, summary),
+            lambda: _answer(index, msg, current_lang, recent, summary, owner),
         )
-        context_label = "CV Context"
-        question_label = "User Question"
-
-    prompt = (
-        f"{language_prompt}\n\n"
-        f"{context_label}:\n{context_text}\n\n"
-        f"{question_label}:\n{msg}\n\n"
-        f"Son sohbet geçmişi (referans için):\n{history_text}"
+        if qvec is not None and not shared and not reply.startswith("⚠️"):
+            answer_cache.put(qvec, current_lang, _cache_partition(index), msg, reply)
+        if session is not None and not reply.startswith("⚠️"):
+            conversations.append(session, msg, reply)
+
+        response.headers[AnswerCacheConstants.BYPASS_HEADER] = cache_state
+        response.headers["Server-Timing"] = trace.server_timing()
+    return {"reply": reply, "session_id": req.session_id}
+
+
+@app.post("/api/pdf")
+def create_pdf(req: PDFReport):
+    """Raporu render eder, kısa ömürlü store'a koyar ve indirme linkini döner."""
+    generator = _get_pdf_generator()
+    if generator is None or pdf_store is None:
+        raise HTTPException(status_code=503, detail="PDF üretimi bu sunucuda kullanılamıyor.")
+
+    buffer = generator.render_pdf_buffer(
+        req.report_content, req.job_title, req.candidate_name, req.language, req.company_name
+    )
+    filename = req.filename or f"job_report_{datetime.now():%Y%m%d_%H%M%S}.pdf"
+    try:
+        entry = pdf_store.put(buffer, filename)
+    except PDFTooLarge:
+        raise HTTPException(status_code=413, detail="PDF indirme deposu için çok büyük.")
+    return {"id": entry.pdf_id, "filename": entry.filename, "size": entry.size, "url": f"/api/pdf/{entry.pdf_id}"}
+
+
+@app.get("/api/pdf/{pdf_id}")
+def download_pdf(pdf_id: str, if_none_match: str | None = Header(default=None)):
+    """Render buffer'ından kopyasız (memoryview) stream eder."""
+    entry = pdf_store.get(pdf_id) if pdf_store is not None else None
+    if entry is None:
+        raise HTTPException(status_code=404, detail="PDF bulunamadı veya süresi doldu.")
+
+    headers = {"ETag": entry.etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+    if if_none_match and entry.etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    headers.update({
+        "Content-Length": str(entry.size),
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(entry.filename)}",
+    })
+    return StreamingResponse(entry.iter_chunks(), media_type="application/pdf", headers=headers)
+
+
+@app.post("/api/pdf/batch")
+def pdf_batch(req: PDFBatchRequest):
+    """
+    Birden fazla uyumluluk raporunu paralel render edip ZIP olarak stream eder.
+    Her PDF bittiği anda arşive yazılır; throughput (PDF/s) arşivdeki
+    batch_summary.json içinde raporlanır.
+    """
+    if stream_pdf_zip is None:
+        raise HTTPException(status_code=503, detail="PDF üretimi bu sunucuda kullanılamıyor.")
+
+    payloads = [r.model_dump() for r in req.reports]
+    return StreamingResponse(
+        stream_pdf_zip(payloads, max_workers=req.workers),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="job_reports.zip"'},
     )
 
-    reply = gemini_generate(prompt).strip()
-    return {"reply": reply}
+
+@app.get("/api/thumbnail")
+def thumbnail(
+    url: str,
+    fmt: Literal["webp", "jpeg"] | None = None,
+    accept: str | None = Header(default=None),
+):
+    """
+    Medium kart görselini bir kez indirir, kart boyutuna küçültür ve diskten
+    uzun ömürlü cache başlıklarıyla sunar (WebP destekleyen tarayıcıya WebP).
+    """
+    if get_thumbnail_cache is None:
+        raise HTTPException(status_code=503, detail="Görsel proxy bu sunucuda kullanılamıyor.")
+
+    cache = get_thumbnail_cache()
+    if not cache.is_allowed(url):
+        raise HTTPException(status_code=400, detail="Sadece Medium görselleri destekleniyor.")
+
+    fmt = fmt or ("webp" if accept and "image/webp" in accept else "jpeg")
+    path = cache.get_variant(url, fmt)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Görsel bulunamadı.")
+
+    return FileResponse(
+        path,
+        media_type=ThumbnailConstants.FORMATS[fmt][1],
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "Vary": "Accept"},
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Semantic answer cache threshold evaluation
+
+ANSWER_CACHE_THRESHOLD'u etiketli soru çiftleri üzerinde ölçer:
+
+  - paraphrase: aynı cevabı hak eden farklı ifadeler (cache hit olmalı)
+  - near_miss: kelimeleri benzeyen ama cevabı farklı sorular (hit OLMAMALI)
+
+Her eşik için paraphrase hit oranı ve near-miss yanlış hit oranı raporlanır;
+önerilen eşik, hiç yanlış hit üretmeyen en düşük eşiktir. Gerçek embedding
+modeliyle çalıştırılmalıdır (sahte sunucunun vektörleri anlamsızdır):
+
+    GEMINI_API_KEY=... python bench/answer_cache_eval.py
+    python bench/answer_cache_eval.py --provider local
+    python bench/answer_cache_eval.py --pairs my_pairs.json   # [{"a","b","label"}]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tools.answer_cache import AnswerCacheConstants  # noqa: E402
+from tools.embeddings import EmbeddingError, get_embedding_provider  # noqa: E402
+
+
+PARAPHRASE = "paraphrase"
+NEAR_MISS = "near_miss"
+
+PAIRS: List[Dict[str, str]] = [
+    # Aynı cevap
+    {"a": "Hangi projeleri yaptın?", "b": "Ne projeler yaptın?", "label": PARAPHRASE},
+    {"a": "Hangi programlama dillerini biliyorsun?", "b": "Hangi dillerde kod yazıyorsun?", "label": PARAPHRASE},
+    {"a": "Eğitim geçmişin nedir?", "b": "Nerede okudun?", "label": PARAPHRASE},
+    {"a": "Kendinden bahseder misin?", "b": "Biraz kendini tanıtır mısın?", "label": PARAPHRASE},
+    {"a": "İletişim bilgilerin neler?", "b": "Sana nasıl ulaşabilirim?", "label": PARAPHRASE},
+    {"a": "What projects have you built?", "b": "Which projects did you work on?", "label": PARAPHRASE},
+    {"a": "Which programming languages do you know?", "b": "What languages do you code in?", "label": PARAPHRASE},
+    {"a": "Tell me about your education.", "b": "Where did you study?", "label": PARAPHRASE},
+    {"a": "How can I contact you?", "b": "What is your email address?", "label": PARAPHRASE},
+    {"a": "What is your work experience?", "b": "Where have you worked?", "label": PARAPHRASE},
+    # Farklı cevap, benzer kelimeler
+    {"a": "Hangi projeleri yaptın?", "b": "Hangi projelerde Python kullandın?", "label": NEAR_MISS},
+    {"a": "Hangi programlama dillerini biliyorsun?", "b": "Hangi yabancı dilleri konuşuyorsun?", "label": NEAR_MISS},
+    {"a": "Docker ile çalıştın mı?", "b": "Kubernetes ile çalıştın mı?", "label": NEAR_MISS},
+    {"a": "LLM hakkında ne biliyorsun?", "b": "RAG hakkında ne biliyorsun?", "label": NEAR_MISS},
+    {"a": "Lisans eğitimin nerede?", "b": "Yüksek lisans eğitimin nerede?", "label": NEAR_MISS},
+    {"a": "En son nerede çalıştın?", "b": "İlk nerede çalıştın?", "label": NEAR_MISS},
+    {"a": "Do you know Python?", "b": "Do you know Java?", "label": NEAR_MISS},
+    {"a": "Which programming languages do you know?", "b": "Which spoken languages do you know?", "label": NEAR_MISS},
+    {"a": "What did you do at your last job?", "b": "What did you do at your first job?", "label": NEAR_MISS},
+    {"a": "Have you worked with AWS?", "b": "Have you worked with GCP?", "label": NEAR_MISS},
+]
+
+
+def similarities(pairs: List[Dict[str, str]], provider_name: Optional[str], model: Optional[str]) -> np.ndarray:
+    provider = get_embedding_provider(provider_name, model)
+    texts = sorted({p[k].lower().strip() for p in pairs for k in ("a", "b")})
+    vectors = provider.embed_batch(texts)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-8
+    by_text = dict(zip(texts, vectors))
+    return np.array([float(by_text[p["a"].lower().strip()] @ by_text[p["b"].lower().strip()]) for p in pairs])
+
+
+def sweep(sims: np.ndarray, labels: List[str], thresholds: np.ndarray) -> List[Dict[str, float]]:
+    para = sims[[label == PARAPHRASE for label in labels]]
+    near = sims[[label == NEAR_MISS for label in labels]]
+    return [{
+        "threshold": round(float(t), 3),
+        "paraphrase_hit_rate": round(float(np.mean(para >= t)) if para.size else 0.0, 3),
+        "near_miss_false_hits": int(np.sum(near >= t)),
+    } for t in thresholds]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="answer cache threshold evaluation")
+    parser.add_argument("--provider", default=None, help="gemini | local (varsayılan EMBEDDING_PROVIDER)")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--pairs", type=Path, default=None, help='JSON: [{"a": ..., "b": ..., "label": ...}]')
+    parser.add_argument("--json-out", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    pairs = json.loads(args.pairs.read_text(encoding="utf-8")) if args.pairs else PAIRS
+    try:
+        sims = similarities(pairs, args.provider, args.model)
+    except EmbeddingError as e:
+        print(f"❌ Embedding alınamadı: {e}")
+        return
+    labels = [p["label"] for p in pairs]
+
+    print(f"\n{'label':<11}{'cos':>7}  pair")
+    for p, s in sorted(zip(pairs, sims), key=lambda x: -x[1]):
+        print(f"{p['label']:<11}{s:>7.3f}  {p['a']}  |  {p['b']}")
+
+    results = sweep(sims, labels, np.arange(0.80, 1.0, 0.01))
+    print(f"\n{'threshold':>9}{'para hit':>10}{'false hit':>11}")
+    for r in results:
+        print(f"{r['threshold']:>9.2f}{r['paraphrase_hit_rate']:>10.3f}{r['near_miss_false_hits']:>11d}")
+
+    safe = [r for r in results if r["near_miss_false_hits"] == 0]
+    current = AnswerCacheConstants.DEFAULT_THRESHOLD
+    if safe:
+        print(f"\n✅ Yanlış hit üretmeyen en düşük eşik: {safe[0]['threshold']:.2f} "
+              f"(paraphrase hit {safe[0]['paraphrase_hit_rate']:.0%}); varsayılan {current}")
+    else:
+        print(f"\n⚠️ Her eşikte yanlış hit var; varsayılan {current}")
+    if args.json_out:
+        args.json_out.write_text(json.dumps({"pairs": [dict(p, cos=float(s)) for p, s in zip(pairs, sims)],
+                                             "sweep": results}, indent=2, ensure_ascii=False))
+        print(f"📄 {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Offline fake Gemini server
+
+generateContent, streamGenerateContent ve embedContent uç noktalarını
+Gemini REST şekliyle taklit eder; API kotası harcamadan yük testi yapılır.
+
+Gecikme (log-normal), token hızı ve hata enjeksiyonu ayarlanabilir:
+
+    python bench/fake_gemini_server.py --port 8089 --latency-median-ms 350 \\
+        --latency-sigma 0.6 --tokens-per-sec 90 --error-rate 0.02 --error-codes 429,503
+
+api_server'ı buna yönlendirmek için:
+
+    GEMINI_API_BASE=http://127.0.0.1:8089/v1beta GEMINI_API_KEY=fake python api_server.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeGeminiConfig:
+    """Behaviour knobs for the fake server"""
+    latency_median_ms: float = 300.0     # generateContent ilk byte gecikmesi (medyan)
+    latency_sigma: float = 0.5           # log-normal sigma (0 = sabit gecikme)
+    embed_latency_ms: float = 40.0
+    tokens_per_sec: float = 80.0         # Çıktı üretim hızı (stream + toplam süre)
+    output_tokens: int = 120             # Yanıt başına ortalama token
+    error_rate: float = 0.0              # İstek başına hata olasılığı
+    error_codes: List[int] = field(default_factory=lambda: [429, 503])
+    embedding_dim: int = 768
+    seed: int = 0
+
+
+_WORDS = (
+    "Fatma Betül veri bilimi projelerinde Python, makine öğrenmesi ve RAG "
+    "sistemleri ile çalıştı; churn tahmini, öneri sistemleri ve kullanıcı "
+    "segmentasyonu gibi alanlarda deneyim kazandı."
+).split()
+
+
+def _sample_latency(cfg: FakeGeminiConfig, rng: random.Random) -> float:
+    if cfg.latency_sigma <= 0:
+        return cfg.latency_median_ms / 1000
+    return rng.lognormvariate(math.log(cfg.latency_median_ms), cfg.latency_sigma) / 1000
+
+
+def _fake_text(prompt: str, n_tokens: int) -> List[str]:
+    offset = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16) % len(_WORDS)
+    return [_WORDS[(offset + i) % len(_WORDS)] for i in range(max(1, n_tokens))]
+
+
+def _fake_embedding(text: str, dim: int) -> List[float]:
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    vec /= np.linalg.norm(vec) + 1e-8
+    return vec.tolist()
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    parts = [p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", [])]
+    return "\n".join(parts)
+
+
+def _candidate(text: str, finish: bool = True) -> Dict[str, Any]:
+    candidate: Dict[str, Any] = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return candidate
+
+
+def create_app(cfg: FakeGeminiConfig) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+    rng = random.Random(cfg.seed)
+    stats = {"generate": 0, "stream": 0, "embed": 0, "errors": 0}
+
+    def _maybe_error():
+        if cfg.error_rate and rng.random() < cfg.error_rate:
+            stats["errors"] += 1
+            code = rng.choice(cfg.error_codes)
+            headers = {"Retry-After": "1"} if code == 429 else {}
+            return JSONResponse(
+                {"error": {"code": code, "message": "injected error", "status": "UNAVAILABLE"}},
+                status_code=code, headers=headers,
+            )
+        return None
+
+    def _n_tokens() -> int:
+        return max(1, int(rng.gauss(cfg.output_tokens, cfg.output_tokens * 0.25)))
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    @app.post("/v1beta/models/{model_action}")
+    async def model_action(model_action: str, request: Request):
+        model, _, action = model_action.partition(":")
+        body = await request.json()
+
+        if action == "embedContent":
+            stats["embed"] += 1
+            await asyncio.sleep(cfg.embed_latency_ms / 1000)
+            error = _maybe_error()
+            if error:
+                return error
+            text = " ".join(p.get("text", "") for p in body.get("content", {}).get("parts", []))
+            return {"embedding": {"values": _fake_embedding(text, cfg.embedding_dim)}}
+
+        if action not in ("generateContent", "streamGenerateContent"):
+            return JSONResponse({"error": {"code": 404, "message": f"unknown action {action}"}}, status_code=404)
+
+        await asyncio.sleep(_sample_latency(cfg, rng))
+        error = _maybe_error()
+        if error:
+            return error
+
+        prompt = _prompt_text(body)
+        tokens = _fake_text(prompt, _n_tokens())
+        usage = {
+            "promptTokenCount": max(1, len(prompt) // 4),
+            "candidatesTokenCount": len(tokens),
+            "totalTokenCount": max(1, len(prompt) // 4) + len(tokens),
+        }
+
+        if action == "generateContent":
+            stats["generate"] += 1
+            await asyncio.sleep(len(tokens) / cfg.tokens_per_sec)
+            return {"candidates": [_candidate(" ".join(tokens))], "usageMetadata": usage, "modelVersion": model}
+
+        stats["stream"] += 1
+        sse = request.query_params.get("alt") == "sse"
+
+        async def _chunks():
+            step = 8
+            for i in range(0, len(tokens), step):
+                await asyncio.sleep(min(step, len(tokens) - i) / cfg.tokens_per_sec)
+                last = i + step >= len(tokens)
+                chunk = {"candidates": [_candidate(" ".join(tokens[i:i + step]) + " ", finish=last)]}
+                if last:
+                    chunk["usageMetadata"] = usage
+                data = json.dumps(chunk, ensure_ascii=False)
+                if sse:
+                    yield f"data: {data}\r\n\r\n"
+                else:
+                    yield ("[" if i == 0 else ",\r\n") + data + ("]" if last else "")
+
+        media_type = "text/event-stream" if sse else "application/json"
+        return StreamingResponse(_chunks(), media_type=media_type)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline fake Gemini server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-median-ms", type=float, default=300.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--embed-latency-ms", type=float, default=40.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--output-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-codes", default="429,503")
+    parser.add_argument("--embedding-dim", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cfg = FakeGeminiConfig(
+        latency_median_ms=args.latency_median_ms,
+        latency_sigma=args.latency_sigma,
+        embed_latency_ms=args.embed_latency_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_codes=[int(c) for c in args.error_codes.split(",") if c.strip()],
+        embedding_dim=args.embedding_dim,
+        seed=args.seed,
+    )
+    print(f"🤖 Fake Gemini: http://{args.host}:{args.port}/v1beta  ({cfg})")
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
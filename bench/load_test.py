@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for api_server
+
+Gerçekçi sohbet karışımıyla (geçmişsiz / geçmişli sorular, TR/EN) api_server'ı
+asyncio + httpx ile yükler ve uç nokta başına p50/p95/p99 gecikme, throughput
+ve hata oranı raporlar.
+
+Her şeyi yerelde, API kotası harcamadan çalıştırmak için:
+
+    python bench/load_test.py --spawn --concurrency 32 --duration 60
+
+--spawn: bench/fake_gemini_server.py ve api_server'ı boş portlarda başlatır,
+api_server'ı GEMINI_API_BASE ile sahte sunucuya yönlendirir. Zaten çalışan bir
+sunucuyu ölçmek için --base-url verin.
+
+httpx requirements-dev.txt içindedir (pip install -r requirements-dev.txt).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+QUESTIONS = {
+    "tr": [
+        "Hangi programlama dillerini biliyorsun?",
+        "Eğitim geçmişin nedir?",
+        "RAG projelerinden bahseder misin?",
+        "Makine öğrenmesi deneyimin neler?",
+        "Hangi sertifikalara sahipsin?",
+        "Son iş deneyimin neydi?",
+        "Gönüllü çalışmaların var mı?",
+        "Medium'da hangi konularda yazıyorsun?",
+    ],
+    "en": [
+        "What programming languages do you know?",
+        "Tell me about your education.",
+        "Which projects used LLMs?",
+        "What is your experience with data analysis?",
+        "Do you have any awards?",
+        "What languages do you speak?",
+    ],
+}
+
+FOLLOW_UPS = {
+    "tr": ["Biraz daha detay verir misin?", "Bu projede hangi teknolojileri kullandın?", "Peki sonuçlar neydi?"],
+    "en": ["Can you elaborate?", "Which technologies did you use there?", "What was the outcome?"],
+}
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    latency: float
+    ok: bool
+    status: int
+
+
+@dataclass
+class Report:
+    samples: List[Sample] = field(default_factory=list)
+    started: float = 0.0
+    finished: float = 0.0
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _history(rng: random.Random, lang: str, turns: int) -> List[Dict[str, str]]:
+    history = []
+    for _ in range(turns):
+        history.append({"role": "user", "content": rng.choice(QUESTIONS[lang])})
+        history.append({"role": "assistant", "content": "Önceki cevap. " * rng.randint(5, 40)})
+    return history
+
+
+async def _timed(client: httpx.AsyncClient, endpoint: str, method: str, url: str,
+                 check: Optional[Callable[[httpx.Response], bool]] = None, **kwargs) -> Sample:
+    start = time.perf_counter()
+    try:
+        resp = await client.request(method, url, **kwargs)
+        await resp.aread()
+        ok = resp.status_code < 400 and (check is None or check(resp))
+        status = resp.status_code
+    except httpx.HTTPError:
+        ok, status = False, 0
+    return Sample(endpoint, time.perf_counter() - start, ok, status)
+
+
+def _reply_ok(resp: httpx.Response) -> bool:
+    # gemini_generate hata durumunda 200 + "⚠️ ..." döner; bunu hata say
+    try:
+        return not resp.json().get("reply", "").startswith("⚠️")
+    except ValueError:
+        return False
+
+
+async def chat_fresh(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+    lang = rng.choice(["tr", "tr", "en"])
+    body = {"message": rng.choice(QUESTIONS[lang]), "history": [], "lang": lang}
+    return await _timed(client, "POST /api/chat (fresh)", "POST", "/api/chat", check=_reply_ok, json=body)
+
+
+async def chat_history(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+    lang = rng.choice(["tr", "tr", "en"])
+    body = {
+        "message": rng.choice(FOLLOW_UPS[lang]),
+        "history": _history(rng, lang, rng.randint(1, 8)),
+        "lang": lang,
+    }
+    return await _timed(client, "POST /api/chat (history)", "POST", "/api/chat", check=_reply_ok, json=body)
+
+
+async def get_cv(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+    return await _timed(client, "GET /api/cv", "GET", "/api/cv")
+
+
+async def health(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+    return await _timed(client, "GET /health", "GET", "/health")
+
+
+SCENARIOS = {
+    "chat": chat_fresh,
+    "chat_history": chat_history,
+    "cv": get_cv,
+    "health": health,
+}
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """'chat:6,chat_history:3,cv:1' -> [(name, weight), ...]"""
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition(":")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Bilinmeyen senaryo: {name} (seçenekler: {', '.join(SCENARIOS)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+async def run_load(base_url: str, mix: List[Tuple[str, float]], concurrency: int,
+                   duration: Optional[float], total_requests: Optional[int],
+                   timeout: float, seed: int) -> Report:
+    report = Report()
+    names = [n for n, _ in mix]
+    weights = [w for _, w in mix]
+    remaining = [total_requests] if total_requests else None
+    deadline: Optional[float] = None
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+
+        async def user(idx: int):
+            rng = random.Random(seed + idx)
+            while True:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                if remaining is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                scenario = SCENARIOS[rng.choices(names, weights)[0]]
+                report.samples.append(await scenario(client, rng))
+
+        report.started = time.perf_counter()
+        if duration:
+            deadline = report.started + duration
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        report.finished = time.perf_counter()
+    return report
+
+
+def summarize(report: Report) -> Dict[str, Dict[str, Any]]:
+    elapsed = max(report.finished - report.started, 1e-9)
+    grouped: Dict[str, List[Sample]] = defaultdict(list)
+    for s in report.samples:
+        grouped[s.endpoint].append(s)
+    grouped["ALL"] = list(report.samples)
+
+    summary = {}
+    for endpoint, samples in grouped.items():
+        latencies = sorted(s.latency * 1000 for s in samples)
+        errors = sum(1 for s in samples if not s.ok)
+        summary[endpoint] = {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "throughput_rps": len(samples) / elapsed,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+            "status_codes": dict(sorted(
+                {str(c): sum(1 for s in samples if s.status == c) for c in {s.status for s in samples}}.items()
+            )),
+        }
+    return summary
+
+
+def print_summary(summary: Dict[str, Dict[str, Any]], elapsed: float) -> None:
+    header = f"{'endpoint':<28}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(f"\n⏱️  {elapsed:.1f}s\n{header}\n{'-' * len(header)}")
+    for endpoint, row in sorted(summary.items(), key=lambda kv: (kv[0] == "ALL", kv[0])):
+        print(f"{endpoint:<28}{row['requests']:>7}{row['throughput_rps']:>8.1f}"
+              f"{row['error_rate'] * 100:>6.1f}%{row['p50_ms']:>8.0f}ms{row['p95_ms']:>7.0f}ms"
+              f"{row['p99_ms']:>7.0f}ms{row['max_ms']:>7.0f}ms")
+
+
+# -- local stack ---------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"Sunucu hazır olmadı: {url}")
+
+
+def spawn_stack(args: argparse.Namespace) -> Tuple[str, List[subprocess.Popen]]:
+    """Start the fake Gemini server and api_server on free local ports"""
+    fake_port, api_port = _free_port(), _free_port()
+    fake_cmd = [
+        sys.executable, str(ROOT / "bench" / "fake_gemini_server.py"), "--port", str(fake_port),
+        "--latency-median-ms", str(args.fake_latency_ms), "--latency-sigma", str(args.fake_latency_sigma),
+        "--tokens-per-sec", str(args.fake_tokens_per_sec), "--error-rate", str(args.fake_error_rate),
+    ]
+    env = dict(os.environ,
+               GEMINI_API_BASE=f"http://127.0.0.1:{fake_port}/v1beta",
+               GEMINI_API_KEY="fake-key", GOOGLE_API_KEY="fake-key")
+    api_cmd = [
+        sys.executable, "-m", "uvicorn", "api_server:app", "--host", "127.0.0.1",
+        "--port", str(api_port), "--workers", str(args.server_workers), "--log-level", "warning",
+    ]
+    procs = [subprocess.Popen(fake_cmd, cwd=ROOT)]
+    _wait_ready(f"http://127.0.0.1:{fake_port}/stats")
+    procs.append(subprocess.Popen(api_cmd, cwd=ROOT, env=env))
+    base_url = f"http://127.0.0.1:{api_port}"
+    _wait_ready(f"{base_url}/health")
+    return base_url, procs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="api_server load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="fake Gemini + api_server'ı yerelde başlat")
+    parser.add_argument("--mix", default="chat:6,chat_history:3,cv:1")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="saniye (--requests verilirse yok sayılır)")
+    parser.add_argument("--requests", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-out", type=Path, default=None)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--fake-latency-ms", type=float, default=300.0)
+    parser.add_argument("--fake-latency-sigma", type=float, default=0.5)
+    parser.add_argument("--fake-tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    procs: List[subprocess.Popen] = []
+    base_url = args.base_url
+    try:
+        if args.spawn:
+            base_url, procs = spawn_stack(args)
+        print(f"🚀 {base_url}  mix={args.mix}  concurrency={args.concurrency}")
+        report = asyncio.run(run_load(
+            base_url, parse_mix(args.mix), args.concurrency,
+            None if args.requests else args.duration, args.requests, args.timeout, args.seed,
+        ))
+    finally:
+        for p in reversed(procs):
+            p.terminate()
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    summary = summarize(report)
+    print_summary(summary, report.finished - report.started)
+    if args.json_out:
+        args.json_out.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"📄 {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Embedding quantization benchmark
+
+float32 / float16 / int8 depolamanın bellek, gecikme ve recall etkisini
+api_server'ın kullandığı yol üzerinden (tools/quantize.py + top_candidates,
+float32 matrisinden mmap ile kesin yeniden skorlama) ölçer. Referans, float32
+üzerinde tam kosinüs araması; recall@k, kuantize aramanın bulduğu top-k'nin
+bu referansla örtüşme oranıdır.
+
+    python bench/quantization_bench.py                          # sentetik 20k x 768
+    python bench/quantization_bench.py --rows 100000 --dim 384
+    python bench/quantization_bench.py --embeddings embeddings_data.pkl
+
+Sorgular, rastgele seçilen chunk vektörlerine gürültü eklenerek üretilir
+(aynı konudaki farklı bir soru gibi); API çağrısı yapılmaz.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tools.cv_index import load_embeddings  # noqa: E402
+from tools.quantize import QuantizationConstants, QuantizedMatrix  # noqa: E402
+from tools.rerank import RerankConstants, top_candidates  # noqa: E402
+
+
+def synthetic_matrix(rows: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Kümelenmiş vektörler: gerçek indekslerdeki gibi birbirine yakın komşular olsun"""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assign = rng.integers(0, clusters, rows)
+    return centers[assign] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+
+
+def make_queries(emb: np.ndarray, count: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+    base = emb[rng.integers(0, emb.shape[0], count)]
+    scale = np.linalg.norm(base, axis=1, keepdims=True) / np.sqrt(emb.shape[1])
+    return (base + noise * scale * rng.standard_normal(base.shape)).astype(np.float32)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def run(emb: np.ndarray, queries: np.ndarray, top_k: int, factor: int) -> List[Dict[str, object]]:
+    norms = (np.linalg.norm(emb, axis=1) + 1e-8).astype(np.float32)
+    n_cand = top_k * factor
+
+    # Kesin skorlama kaynağı: float32 .npy, api_server'daki gibi mmap ile açılır
+    tmp = tempfile.NamedTemporaryFile(suffix=".npy", delete=False)
+    tmp.close()
+    np.save(tmp.name, emb)
+    exact = np.load(tmp.name, mmap_mode="r")
+
+    truth = []
+    for q in queries:
+        sims = (emb @ q) / (norms * (np.linalg.norm(q) + 1e-8))
+        truth.append(top_candidates(sims, top_k))
+
+    configs = [("float32", None, False)]
+    for mode in (QuantizationConstants.FLOAT16, QuantizationConstants.INT8):
+        matrix = QuantizedMatrix.from_matrix(exact, mode, rescore=False)
+        configs += [(mode, matrix, False), (mode, matrix, True)]
+
+    results = []
+    for name, matrix, rescore in configs:
+        latencies, recalls, top1 = [], [], []
+        for q, best in zip(queries, truth):
+            start = time.perf_counter()
+            qn = float(np.linalg.norm(q) + 1e-8)
+            if matrix is None:
+                sims = (emb @ q) / (norms * qn)
+            else:
+                sims = matrix.dot(q, slice(None)) / (norms * qn)
+            cand = top_candidates(sims, n_cand if rescore else top_k)
+            if rescore:
+                cand_sims = (exact[cand] @ q) / (norms[cand] * qn)
+                cand = cand[np.argsort(cand_sims)[::-1]]
+            found = cand[:top_k]
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(set(best.tolist()) & set(found.tolist())) / top_k)
+            top1.append(found[0] == best[0])
+        heap = (matrix.nbytes if matrix is not None else emb.nbytes) + norms.nbytes
+        results.append({
+            "storage": name,
+            "rescore": rescore,
+            "vector_mb": round(heap / 1024 / 1024, 2),
+            "compression": round((emb.nbytes + norms.nbytes) / heap, 2),
+            f"recall@{top_k}": round(float(np.mean(recalls)), 4),
+            "top1": round(float(np.mean(top1)), 4),
+            "p50_ms": round(_percentile(latencies, 50), 3),
+            "p95_ms": round(_percentile(latencies, 95), 3),
+        })
+    Path(tmp.name).unlink(missing_ok=True)
+    return results
+
+
+def print_report(results: List[Dict[str, object]], rows: int, dim: int, top_k: int) -> None:
+    header = f"{'storage':<9}{'rescore':>8}{'MB':>9}{'x':>7}{f'recall@{top_k}':>11}{'top1':>8}{'p50 ms':>9}{'p95 ms':>9}"
+    print(f"\n📦 {rows} x {dim}\n{header}\n{'-' * len(header)}")
+    for r in results:
+        print(f"{r['storage']:<9}{'yes' if r['rescore'] else 'no':>8}{r['vector_mb']:>9.2f}{r['compression']:>7.2f}"
+              f"{r[f'recall@{top_k}']:>11.4f}{r['top1']:>8.4f}{r['p50_ms']:>9.3f}{r['p95_ms']:>9.3f}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="embedding quantization benchmark")
+    parser.add_argument("--embeddings", type=Path, default=None, help="embeddings_data.pkl (yoksa sentetik)")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.8, help="sorgu gürültüsü (vektör normuna göre)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--candidate-factor", type=int, default=RerankConstants.CANDIDATE_FACTOR)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-out", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    if args.embeddings:
+        emb = np.ascontiguousarray(load_embeddings(args.embeddings).emb, dtype=np.float32)
+        # Embedding hatasında generate_embeddings sıfır vektör yazar; bunlar ölçümü bozar
+        emb = emb[np.linalg.norm(emb, axis=1) > 0]
+        if emb.shape[0] == 0:
+            print(f"❌ {args.embeddings} içinde sıfır olmayan vektör yok")
+            return
+    else:
+        emb = synthetic_matrix(args.rows, args.dim, args.clusters, rng)
+    top_k = min(args.top_k, emb.shape[0])
+    queries = make_queries(emb, args.queries, args.noise, rng)
+
+    results = run(emb, queries, top_k, args.candidate_factor)
+    print_report(results, emb.shape[0], emb.shape[1], top_k)
+    if args.json_out:
+        args.json_out.write_text(json.dumps({"rows": emb.shape[0], "dim": emb.shape[1], "results": results}, indent=2))
+        print(f"📄 {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,8 @@ type CvJson = {
   references?: Array<{ name?: string; title?: string; organization?: string }>
 }
 
+type ChatMessage = { role: 'user' | 'assistant'; content: string; failed?: boolean }
+
 const API = import.meta.env.VITE_API_URL || ''
 
 async function sleep(ms: number) {
@@ -41,15 +43,25 @@ async function fetchWithTimeout(input: RequestInfo | URL, init: RequestInit = {}
   }
 }
 
+class HttpError extends Error {
+  status: number
+  constructor(status: number) {
+    super(`HTTP ${status}`)
+    this.status = status
+  }
+}
+
 async function fetchWithRetry(input: RequestInfo | URL, init: RequestInit = {}, retries = 2, timeoutMs = 25000) {
   let lastErr: unknown
   for (let i = 0; i <= retries; i++) {
     try {
       const res = await fetchWithTimeout(input, init, timeoutMs)
-      if (!res.ok) throw new Error(`HTTP ${res.status}`)
+      if (!res.ok) throw new HttpError(res.status)
       return res
     } catch (e) {
       lastErr = e
+      // 4xx tekrar denemeyle düzelmez (408/429 hariç)
+      if (e instanceof HttpError && e.status >= 400 && e.status < 500 && e.status !== 408 && e.status !== 429) break
       if (i < retries) {
         await sleep(800 * Math.pow(2, i)) // 0.8s, 1.6s...
       }
@@ -75,6 +87,13 @@ function setStored<T>(key: string, value: T) {
   }
 }
 
+// Sunucunun oturuma kaydettiği turlar: başarısız yanıtlar ve onlara ait sorular sunucuda yok
+function recordedTurns(messages: ChatMessage[]) {
+  return messages
+    .filter((m, i) => !m.failed && !(m.role === 'user' && messages[i + 1]?.failed))
+    .map(({ role, content }) => ({ role, content }))
+}
+
 function scrollToId(id: string) {
   const el = document.getElementById(id)
   if (!el) return
@@ -173,10 +192,12 @@ export default function App() {
 
   const [chatOpen, setChatOpen] = useState(false)
   const [chatInput, setChatInput] = useState('')
-  const [chatMessages, setChatMessages] = useState<Array<{ role: 'user' | 'assistant'; content: string }>>(() => [])
+  const [chatMessages, setChatMessages] = useState<ChatMessage[]>(() => [])
   const [chatLoading, setChatLoading] = useState(false)
   const chatBodyRef = useRef<HTMLDivElement | null>(null)
   const chatBottomRef = useRef<HTMLDivElement | null>(null)
+  // Sohbet geçmişi sunucuda (özet + son mesajlar) bu id ile tutulur
+  const chatSessionRef = useRef<string>(crypto.randomUUID().replace(/-/g, ''))
 
   useEffect(() => {
     const onKey = (e: KeyboardEvent) => {
@@ -202,24 +223,48 @@ export default function App() {
     const next = [...chatMessages, { role: 'user' as const, content: msg }]
     setChatMessages(next)
     setChatLoading(true)
-    try {
-      const resp = await fetchWithRetry(
+    // Geçmiş sunucuda; her turda sadece yeni mesaj gider. Sunucu oturumu tanımıyorsa (409) son mesajlarla tekrar.
+    const recorded = recordedTurns(chatMessages)
+    const post = (history: ReturnType<typeof recordedTurns>) =>
+      fetchWithRetry(
         `${API}/api/chat`,
         {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ message: msg, history: next, lang: 'tr' }),
+          body: JSON.stringify({
+            message: msg,
+            history,
+            history_len: recorded.length,
+            lang: 'tr',
+            session_id: chatSessionRef.current,
+          }),
         },
         2,
         30000,
       )
+    try {
+      let resp: Response
+      try {
+        resp = await post([])
+      } catch (e) {
+        if (!(e instanceof HttpError && e.status === 409)) throw e
+        resp = await post(recorded.slice(-6))
+      }
+      if (import.meta.env.DEV) {
+        // Sunucu tarafı aşama süreleri (embed, retrieve, llm, ...)
+        const timing = resp.headers.get('Server-Timing')
+        if (timing) console.debug('[chat] Server-Timing:', timing)
+      }
       const data = await resp.json()
-      setChatMessages((prev) => [...prev, { role: 'assistant', content: data?.reply ?? '' }])
+      const reply: string = data?.reply ?? ''
+      // Sunucu tarafı hata yanıtları (⚠️) oturuma yazılmaz
+      setChatMessages((prev) => [...prev, { role: 'assistant', content: reply, failed: !reply || reply.startsWith('⚠️') }])
     } catch {
       setChatMessages((prev) => [
         ...prev,
         {
           role: 'assistant',
+          failed: true,
           content:
             lang === 'tr'
               ? '⚠️ Yanıt alınamadı. Sunucu uyanıyor olabilir (cold start). 10–30 sn sonra tekrar deneyin.'
@@ -5,10 +5,12 @@ Bu script CV verilerini okuyup embedding'leri hesaplar ve dosya olarak kaydeder.
 Deploy sırasında API limiti olmayacak çünkü embedding'ler önceden hesaplanmış olacak.
 """
 
+import argparse
 import json
 import numpy as np
 import pickle
 import os
+import time
 from pathlib import Path
 
 try:
@@ -39,100 +41,90 @@ def _load_gemini_key():
     return None
 
 
-GEMINI_KEY = _load_gemini_key()
-if not GEMINI_KEY:
-    raise RuntimeError(
-        "Gemini API anahtarı bulunamadı. Lütfen GOOGLE_API_KEY veya GEMINI_API_KEY "
-        "ortam değişkenini ayarlayın ya da .streamlit/secrets.toml içinde tanımlayın."
-    )
+def _require_gemini_key():
+    key = _load_gemini_key()
+    if not key:
+        raise RuntimeError(
+            "Gemini API anahtarı bulunamadı. Lütfen GOOGLE_API_KEY veya GEMINI_API_KEY "
+            "ortam değişkenini ayarlayın ya da .streamlit/secrets.toml içinde tanımlayın. "
+            "Anahtarsız indeks için: --provider local"
+        )
+    os.environ["GOOGLE_API_KEY"] = key
+    os.environ.setdefault("GEMINI_API_KEY", key)
 
-# google.generativeai kütüphanesi embed_content çağrılarında GOOGLE_API_KEY değişkenini arıyor.
-os.environ["GOOGLE_API_KEY"] = GEMINI_KEY
-os.environ.setdefault("GEMINI_API_KEY", GEMINI_KEY)
 
-from google.generativeai.embedding import embed_content
+from tools.chunking import build_chunks
+from tools.cv_index import LEGACY_MANIFEST
+from tools.embeddings import EmbeddingConstants, EmbeddingError, get_embedding_provider
+from tools.prompt_builder import estimate_tokens
+
+def load_previous_vectors(provider, output_file="embeddings_data.pkl"):
+    """Önceki çalıştırmanın vektörleri (chunk hash -> vektör); değişmeyen chunk'lar tekrar embed edilmez"""
+    if not os.path.exists(output_file):
+        return {}
+    try:
+        with open(output_file, 'rb') as f:
+            data = pickle.load(f)
+    except Exception as e:
+        print(f"⚠️ Önceki embedding dosyası okunamadı: {e}")
+        return {}
+    # Başka sağlayıcı / modelin vektörleri aynı uzayda değil
+    manifest = data.get('manifest') or LEGACY_MANIFEST
+    if (manifest.get('provider'), manifest.get('model')) != (provider.name, provider.model):
+        print(f"   ℹ️ Önceki indeks {manifest.get('provider')}/{manifest.get('model')} ile üretilmiş, "
+              f"tüm chunk'lar yeniden embed edilecek")
+        return {}
+    records = data.get('records') or []
+    embeddings = data.get('embeddings')
+    if embeddings is None or len(records) != len(embeddings):
+        return {}
+    return {r['hash']: np.asarray(vec) for r, vec in zip(records, embeddings) if np.any(vec)}
 
-def build_chunks(cv_json):
-    """CV verilerini chunk'lara böler"""
-    chunks = []
-    
-    for section, content in cv_json.items():
-        if section in ['name', 'title', 'location', 'email', 'phone']:
-            # Kişisel bilgileri tek chunk'ta birleştir
-            if section == 'name':
-                personal_info = f"Kişisel Bilgiler: {content}"
-                if 'title' in cv_json:
-                    personal_info += f" - {cv_json['title']}"
-                if 'location' in cv_json:
-                    personal_info += f" - {cv_json['location']}"
-                chunks.append(personal_info)
-        elif section == 'profile':
-            chunks.append(f"Profil: {content}")
-        elif section == 'education':
-            # Eğitim bilgilerini tek chunk'ta birleştir
-            edu_text = "Eğitim: "
-            for edu in content:
-                edu_text += f"{edu['institution']} - {edu['degree']} ({edu['years']}); "
-            chunks.append(edu_text.strip())
-        elif section == 'experience':
-            # Her deneyimi ayrı chunk yap
-            for exp in content:
-                exp_text = f"Deneyim: {exp['title']} at {exp['company']} ({exp['duration']}) - {exp['description']}"
-                chunks.append(exp_text)
-        elif section == 'skills':
-            # Yetenekleri kategorilere göre grupla
-            for category, skills in content.items():
-                skills_text = f"Yetenekler - {category}: {', '.join(skills)}"
-                chunks.append(skills_text)
-        elif section == 'projects':
-            # Her projeyi ayrı chunk yap
-            for project in content:
-                if isinstance(project, dict):
-                    proj_text = f"Proje: {project.get('name', '')} - {project.get('description', '')}"
-                    chunks.append(proj_text)
-        elif section == 'links':
-            # Linkleri tek chunk'ta birleştir
-            links_text = "Linkler: " + " | ".join([f"{k}: {v}" for k, v in content.items()])
-            chunks.append(links_text)
-        else:
-            # Diğer bölümler için genel yaklaşım
-            if isinstance(content, (str, int, float)):
-                chunks.append(f"{section}: {content}")
-    
-    return chunks
 
-def generate_embeddings(chunks, api_key=None):
-    """Chunk'lar için embedding'leri hesapla"""
-    print(f"🔄 {len(chunks)} chunk için embedding hesaplanıyor...")
+def generate_embeddings(chunks, provider, previous=None):
+    """Chunk'lar için embedding'leri hesapla (yeni chunk'lar BATCH_SIZE'lık gruplar halinde)"""
+    print(f"🔄 {len(chunks)} chunk için embedding hesaplanıyor ({provider.name}: {provider.model})...")
+    previous = previous or {}
     
-    embeddings = []
-    for i, chunk in enumerate(chunks):
-        print(f"   📝 Chunk {i+1}/{len(chunks)}: {chunk[:50]}...")
-        
+    embeddings = [previous.get(record.hash) for record in chunks]
+    todo = [i for i, vec in enumerate(embeddings) if vec is None]
+    batch_size = EmbeddingConstants.BATCH_SIZE
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        print(f"   📝 Chunk {batch[0]+1}-{batch[-1]+1}/{len(chunks)}: {chunks[batch[0]].text[:50]}...")
         try:
-            # Google API ile embedding hesapla
-            result = embed_content(model="models/embedding-001", content=chunk)
-            embedding = np.asarray(result["embedding"])
-            embeddings.append(embedding)
-            
-            # Progress göster
-            if (i + 1) % 5 == 0:
-                print(f"   ✅ {i+1}/{len(chunks)} tamamlandı")
-                
-        except Exception as e:
-            print(f"   ❌ Hata (chunk {i+1}): {str(e)}")
-            # Sıfır vektör ekle (fallback)
-            embeddings.append(np.zeros(768))
+            vectors = provider.embed_batch([chunks[i].text for i in batch])
+        except EmbeddingError:
+            # Grup başarısızsa chunk chunk dene; hatalı olanlara sıfır vektör (boyut diğer chunk'lardan)
+            vectors = []
+            for i in batch:
+                try:
+                    vectors.append(provider.embed(chunks[i].text))
+                except EmbeddingError as e:
+                    print(f"   ❌ Hata (chunk {i+1}): {str(e)}")
+                    vectors.append(None)
+        for i, vec in zip(batch, vectors):
+            if vec is not None:
+                embeddings[i] = np.asarray(vec)
+        print(f"   ✅ {min(start + batch_size, len(todo))}/{len(todo)} tamamlandı")
     
+    dim = next((len(v) for v in embeddings if v is not None), 768)
+    embeddings = [v if v is not None else np.zeros(dim) for v in embeddings]
     print(f"✅ Tüm embedding'ler hesaplandı!")
     return np.vstack(embeddings)
 
-def save_embeddings_data(chunks, embeddings, cv_json, output_file="embeddings_data.pkl"):
+def save_embeddings_data(chunks, embeddings, cv_json, manifest, output_file="embeddings_data.pkl"):
     """Embedding verilerini dosyaya kaydet"""
     data = {
-        'chunks': chunks,
+        'chunks': [c.text for c in chunks],
         'embeddings': embeddings,
         'cv_json': cv_json,
+        # Vektörleri üreten sağlayıcı; api_server sorguları da bununla embed eder
+        'manifest': manifest,
+        # Section / item / hash bilgisi: filtreli arama ve artımlı yeniden indeksleme için
+        'records': [c.as_dict() for c in chunks],
+        # Prompt bütçesi için chunk başına token tahmini (api_server okur)
+        'token_counts': [estimate_tokens(c.text) for c in chunks],
         'alias': {
             "deneyim": "experience", "tecrübe": "experience",
             "eğitim": "education",  "projeler": "projects",
@@ -145,12 +137,27 @@ def save_embeddings_data(chunks, embeddings, cv_json, output_file="embeddings_da
     
     print(f"💾 Embedding verileri '{output_file}' dosyasına kaydedildi")
     print(f"   📊 {len(chunks)} chunk, {embeddings.shape[0]}x{embeddings.shape[1]} embedding")
+    print(f"   🧭 Sağlayıcı: {manifest['provider']} / {manifest['model']}")
 
 def main():
     """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="CV embedding indeksini üret")
+    parser.add_argument("--provider", choices=[EmbeddingConstants.GEMINI, EmbeddingConstants.LOCAL],
+                        default=os.getenv(EmbeddingConstants.PROVIDER_ENV, EmbeddingConstants.GEMINI),
+                        help="gemini (API) ya da local (sentence-transformers, CPU)")
+    parser.add_argument("--model", default=None, help="Sağlayıcının varsayılan modeli yerine")
+    args = parser.parse_args()
+
     print("🚀 Local Embedding Generator")
     print("=" * 50)
     
+    if args.provider == EmbeddingConstants.GEMINI:
+        _require_gemini_key()
+    provider = get_embedding_provider(args.provider, args.model)
+    if not provider.available:
+        print("❌ sentence-transformers kurulu değil: pip install sentence-transformers")
+        return
+    
     # CV dosyasını oku
     cv_file = "betül-cv.json"
     if not os.path.exists(cv_file):
@@ -164,13 +171,18 @@ def main():
     # Chunk'ları oluştur
     print("🔨 Chunk'lar oluşturuluyor...")
     chunks = build_chunks(cv_json)
-    print(f"   📝 {len(chunks)} chunk oluşturuldu")
+    print(f"   📝 {len(chunks)} chunk oluşturuldu ({len({c.section for c in chunks})} bölüm)")
     
-    # Embedding'leri hesapla
-    embeddings = generate_embeddings(chunks)
+    # Embedding'leri hesapla (değişmeyen chunk'lar önceki dosyadan)
+    previous = load_previous_vectors(provider)
+    reused = sum(1 for c in chunks if c.hash in previous)
+    if reused:
+        print(f"   ♻️ {reused} chunk değişmemiş, önceki embedding'ler kullanılacak")
+    embeddings = generate_embeddings(chunks, provider, previous=previous)
     
     # Dosyaya kaydet
-    save_embeddings_data(chunks, embeddings, cv_json)
+    manifest = {**provider.manifest(), "dim": int(embeddings.shape[1]), "created_at": int(time.time())}
+    save_embeddings_data(chunks, embeddings, cv_json, manifest)
     
     print("\n🎉 Tamamlandı!")
     print("📁 Şimdi bu dosyaları Streamlit Cloud'a upload edebilirsiniz:")
@@ -3,9 +3,9 @@ import streamlit as st
 import time
 from datetime import datetime
 from tools.gemini_tool import ask_gemini, generate_cover_letter
+from tools.project_matcher import ProjectMatcherConstants, get_project_matcher
 from common_css import LIGHT_CSS, DARK_CSS
 import ast
-import re
 # ------------------------------------------------------------------ #
 # (İstersen bu uzun CSS'i ayrı bir dosyaya da taşıyabilirsin)
 CSS = """
@@ -1174,28 +1174,10 @@ def run(*, tool_def, rag, cv_json):
         retrieved_chunks = rag.search_similar_chunks(user_msg, top_k=5)
 
         # Kullanıcının sorusunda proje adı geçiyorsa ilgili projeyi doğrudan bağlama ekle
-        project_context_blocks = []
-        projects = cv_json.get("projects", [])
+        # (Matcher CV başına bir kez kurulur; bloklar önceden formatlanmıştır)
+        project_matcher = get_project_matcher(cv_json)
+        project_context_blocks = project_matcher.matched_blocks(user_msg, ProjectMatcherConstants.HALF_TOKENS)
         msg_lower = user_msg.lower()
-        for proj in projects:
-            name = proj.get("name", "")
-            if not name:
-                continue
-            name_tokens = [tok for tok in re.split(r"[^a-z0-9çğıöşü]+", name.lower()) if len(tok) > 2]
-            if not name_tokens:
-                continue
-            match_count = sum(1 for tok in name_tokens if tok in msg_lower)
-            if name.lower() in msg_lower or match_count >= max(1, len(name_tokens) // 2):
-                tech = proj.get("technology", "")
-                desc = proj.get("description", "")
-                features = proj.get("features", "")
-                formatted = (
-                    f"Proje Adı: {name}\n"
-                    f"Teknolojiler: {tech}\n"
-                    f"Açıklama: {desc}\n"
-                    f"Özellikler: {features}"
-                )
-                project_context_blocks.append(formatted)
 
         # Eğitim bilgilerini her zaman (özellikle 'eğitim', 'education', 'üniversite' vb. geçtiğinde)
         education_block = ""
@@ -1218,14 +1200,9 @@ def run(*, tool_def, rag, cv_json):
 
         if project_context_blocks:
             context_chunks.append("Eşleşen Projeler:\n" + "\n\n".join(project_context_blocks))
-        elif projects:
+        elif project_matcher.summary_blocks:
             # RAG başarısız olursa en azından ilk birkaç projeyi ver
-            fallback_projects = []
-            for proj in projects[:5]:
-                fallback_projects.append(
-                    f"Proje Adı: {proj.get('name','')}\nTeknolojiler: {proj.get('technology','')}\nAçıklama: {proj.get('description','')}"
-                )
-            context_chunks.append("Örnek Projeler:\n" + "\n\n".join(fallback_projects))
+            context_chunks.append("Örnek Projeler:\n" + "\n\n".join(project_matcher.summary_blocks[:5]))
 
         context_text = "\n---\n".join(context_chunks)
         
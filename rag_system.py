@@ -41,6 +41,9 @@ _ensure_gemini_key()
 
 from google.generativeai.embedding import embed_content
 
+from tools.chunking import build_chunks
+from tools.section_router import SectionRouterConstants, section_router
+
 @st.cache_resource(show_spinner=False)
 def embed_cached(txt: str):
     """Query için embedding hesapla (sadece kullanıcı sorguları için)"""
@@ -59,7 +62,9 @@ class RAGSystem:
         # Her çalıştırmada güncel CV JSON'dan embedding üret
         # (böylece CV'de yaptığın değişiklikler anında chatbota yansır)
         self.cv_json = json.load(open(cv_path, encoding="utf-8"))
-        self.chunks = self._build_chunks(self.cv_json)
+        # generate_embeddings.py ile aynı chunker (tools/chunking.py)
+        self.records = build_chunks(self.cv_json)
+        self.chunks = [r.text for r in self.records]
 
         progress_bar = st.progress(0)
         status_text = st.empty()
@@ -75,71 +80,23 @@ class RAGSystem:
         status_text.empty()
 
         self.index = np.vstack(embeddings)
-        self.alias = {
-            "deneyim": "experience", "tecrübe": "experience",
-            "eğitim": "education",  "projeler": "projects",
-            "ödüller": "awards",    "yetenek": "skills",
-        }
+        self.alias = SectionRouterConstants.ALIASES
         
         self.full_text = json.dumps(self.cv_json, ensure_ascii=False, indent=2)
 
     # — Kullanıcı sorgusu
     def search_similar_chunks(self, query: str, top_k: int = 5):
+        # Bölüm odaklı kısa sorular sadece o bölümün satırlarında aranır
+        sections = section_router.route(query).sections
+        rows = [i for i, r in enumerate(self.records) if r.section in sections] if sections else []
+        if rows and len(rows) <= top_k:
+            return [self.chunks[i] for i in rows]
+        rows = rows or list(range(len(self.chunks)))
+
         key = query.lower().strip()
         q_vec = embed_cached(key)
-        sims = cosine_similarity([q_vec], self.index)[0]
+        sims = cosine_similarity([q_vec], self.index[rows])[0]
         top_idx = sims.argsort()[-top_k:][::-1]
-        top_chunks = [self.chunks[i] for i in top_idx]
+        top_chunks = [self.chunks[rows[i]] for i in top_idx]
         return top_chunks or [json.dumps(self.cv_json, ensure_ascii=False, indent=2)]  # fall-back
 
-    # —— yardımcılar (_build_chunks & _build_embed_index) aynı kalır
-
-
-    def _build_chunks(self, cv_json):
-        """CV verilerini chunk'lara böler (generate_embeddings.py ile aynı mantık)"""
-        chunks = []
-        
-        for section, content in cv_json.items():
-            if section in ['name', 'title', 'location', 'email', 'phone']:
-                # Kişisel bilgileri tek chunk'ta birleştir
-                if section == 'name':
-                    personal_info = f"Kişisel Bilgiler: {content}"
-                    if 'title' in cv_json:
-                        personal_info += f" - {cv_json['title']}"
-                    if 'location' in cv_json:
-                        personal_info += f" - {cv_json['location']}"
-                    chunks.append(personal_info)
-            elif section == 'profile':
-                chunks.append(f"Profil: {content}")
-            elif section == 'education':
-                # Eğitim bilgilerini tek chunk'ta birleştir
-                edu_text = "Eğitim: "
-                for edu in content:
-                    edu_text += f"{edu['institution']} - {edu['degree']} ({edu['years']}); "
-                chunks.append(edu_text.strip())
-            elif section == 'experience':
-                # Her deneyimi ayrı chunk yap
-                for exp in content:
-                    exp_text = f"Deneyim: {exp['title']} at {exp['company']} ({exp['duration']}) - {exp['description']}"
-                    chunks.append(exp_text)
-            elif section == 'skills':
-                # Yetenekleri kategorilere göre grupla
-                for category, skills in content.items():
-                    skills_text = f"Yetenekler - {category}: {', '.join(skills)}"
-                    chunks.append(skills_text)
-            elif section == 'projects':
-                # Her projeyi ayrı chunk yap
-                for project in content:
-                    if isinstance(project, dict):
-                        proj_text = f"Proje: {project.get('name', '')} - {project.get('description', '')}"
-                        chunks.append(proj_text)
-            elif section == 'links':
-                # Linkleri tek chunk'ta birleştir
-                links_text = "Linkler: " + " | ".join([f"{k}: {v}" for k, v in content.items()])
-                chunks.append(links_text)
-            else:
-                # Diğer bölümler için genel yaklaşım
-                if isinstance(content, (str, int, float)):
-                    chunks.append(f"{section}: {content}")
-        
-        return chunks
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Testler repo kökünden import eder (tools/, api_server)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,52 @@
+import numpy as np
+
+from tools.answer_cache import AnswerCacheConstants, SemanticAnswerCache
+
+
+def _vec(*values):
+    return np.asarray(values, dtype=np.float32)
+
+
+def test_default_threshold_is_conservative():
+    assert SemanticAnswerCache().threshold == AnswerCacheConstants.DEFAULT_THRESHOLD >= 0.95
+
+
+def test_hit_above_threshold_and_miss_below():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put(_vec(1, 0, 0), "tr", "v1", "Hangi projeleri yaptın?", "reply")
+    entry, score = cache.get(_vec(0.99, 0.05, 0), "tr", "v1")
+    assert entry.reply == "reply" and score >= 0.95
+    assert cache.get(_vec(0.8, 0.6, 0), "tr", "v1") is None     # cos 0.8: yakın ama farklı soru
+
+
+def test_partitions_isolate_language_and_version():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.put(_vec(1, 0), "tr", "v1", "q", "tr reply")
+    assert cache.get(_vec(1, 0), "en", "v1") is None
+    assert cache.get(_vec(1, 0), "tr", "v2") is None
+
+
+def test_ttl_and_lru_eviction():
+    cache = SemanticAnswerCache(threshold=0.9, ttl=0, max_entries=2)
+    cache.put(_vec(1, 0), "tr", "v1", "q", "r")
+    assert cache.get(_vec(1, 0), "tr", "v1") is None
+
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=2)
+    for i, v in enumerate([_vec(1, 0, 0), _vec(0, 1, 0), _vec(0, 0, 1)]):
+        cache.put(v, "tr", "v1", f"q{i}", f"r{i}")
+    assert len(cache) == 2
+    assert cache.get(_vec(1, 0, 0), "tr", "v1") is None
+
+
+def test_expired_best_match_falls_through_to_fresh_one(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("tools.answer_cache.time.time", lambda: now[0])
+    cache = SemanticAnswerCache(threshold=0.9, ttl=60)
+    cache.put(_vec(1, 0), "tr", "v1", "old", "old reply")
+    now[0] += 50
+    cache.put(_vec(0.96, 0.28), "tr", "v1", "fresh", "fresh reply")
+    now[0] += 20                    # "old" süresi doldu, "fresh" taze
+
+    entry, score = cache.get(_vec(1, 0), "tr", "v1")
+    assert entry.reply == "fresh reply" and 0.9 <= score < 1
+    assert len(cache) == 1
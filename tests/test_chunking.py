@@ -0,0 +1,67 @@
+import pytest
+
+from tools.chunking import CVChunker, _windows, infer_section, section_order
+from tools.prompt_builder import PromptBudgetConstants
+
+WORDS = [f"kelime{i:03d}" for i in range(300)]
+BODY = " ".join(WORDS)
+
+
+def test_short_body_is_one_window():
+    assert _windows("kısa açıklama", 160, 32) == ["kısa açıklama"]
+
+
+@pytest.mark.parametrize("window,overlap", [(40, 8), (40, 0), (25, 20), (160, 32)])
+def test_windows_cover_every_word_within_budget(window, overlap):
+    pieces = _windows(BODY, window, overlap)
+    limit = int(window * PromptBudgetConstants.CHARS_PER_TOKEN)
+    assert all(len(p) <= limit for p in pieces)
+    assert pieces[0].split()[0] == WORDS[0] and pieces[-1].split()[-1] == WORDS[-1]
+    # Sıra korunur, hiçbir kelime kaybolmaz
+    seen = []
+    for p in pieces:
+        for w in p.split():
+            if not seen or WORDS.index(w) > WORDS.index(seen[-1]):
+                seen.append(w)
+    assert seen == WORDS
+
+
+def test_windows_overlap_and_always_progress():
+    pieces = _windows(BODY, 40, 8)
+    overlap_chars = int(8 * PromptBudgetConstants.CHARS_PER_TOKEN)
+    for prev, cur in zip(pieces, pieces[1:]):
+        shared = set(prev.split()) & set(cur.split())
+        assert shared and sum(len(w) + 1 for w in shared) <= overlap_chars
+        assert cur.split()[-1] != prev.split()[-1]
+
+
+def test_word_longer_than_window_is_kept_whole():
+    long_word = "x" * 500
+    assert _windows(f"a {long_word} b", 20, 5) == ["a", long_word, "b"]
+
+
+def test_chunker_repeats_header_and_keeps_sections_contiguous():
+    cv = {
+        "name": "Test", "title": "Veri Bilimci",
+        "projects": [{"name": "Demo", "technology": "Python", "description": BODY}],
+        "skills": {"Diller": ["Python", "SQL"]},
+        "experience": [{"title": "DS", "company": "ACME", "duration": "2023", "description": "RAG"}],
+    }
+    chunks = CVChunker(window_tokens=60, overlap_tokens=10).build(cv)
+    projects = [c for c in chunks if c.section == "projects"]
+    assert len(projects) > 1
+    assert all(c.text.startswith("Proje: Demo (Python) - ") for c in projects)
+    assert [c.part for c in projects] == list(range(len(projects)))
+    sections = [c.section for c in chunks]
+    assert section_order(sections) == list(range(len(sections)))
+    assert len({c.hash for c in chunks}) == len(chunks)
+
+
+def test_section_order_groups_rows_stably():
+    assert section_order(["a", "b", "a", "c", "b"]) == [0, 2, 1, 4, 3]
+
+
+def test_infer_section_for_legacy_chunks():
+    assert infer_section("Deneyim: DS at ACME") == "experience"
+    assert infer_section("Ödül: Hackathon") == "other"
+    assert infer_section("awards: x") == "awards"
@@ -0,0 +1,123 @@
+import threading
+import time
+
+from tools.conversation import ConversationConstants, ConversationStore, SQLiteSessionBackend
+
+C = ConversationConstants
+
+
+class BlockingSummarizer:
+    """Records each fold; blocks until release() so tests can interleave appends"""
+
+    def __init__(self, block: bool = False, result: str = "özet"):
+        self.calls = []
+        self.result = result
+        self.gate = threading.Event()
+        if not block:
+            self.gate.set()
+
+    def __call__(self, previous, turns, lang):
+        self.calls.append(list(turns))
+        self.gate.wait(5)
+        return self.result
+
+
+def _wait_idle(session, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with session.lock:
+            if not session.summarizing:
+                return
+        time.sleep(0.01)
+    raise AssertionError("summary did not finish")
+
+
+def _fill(store, session, pairs, start=0):
+    for i in range(start, start + pairs):
+        store.append(session, f"q{i}", f"a{i}")
+
+
+def test_fold_keeps_last_messages_verbatim():
+    summarizer = BlockingSummarizer()
+    store = ConversationStore(summarizer)
+    session = store.get_or_create(None)
+    _fill(store, session, (C.KEEP_VERBATIM + C.SUMMARIZE_BATCH) // 2 + 1)
+    _wait_idle(session)
+
+    summary, recent = session.snapshot()
+    assert summary == "özet"
+    assert len(session.turns) == C.KEEP_VERBATIM
+    assert recent[-1] == ("assistant", f"a{(C.KEEP_VERBATIM + C.SUMMARIZE_BATCH) // 2}")
+    assert session.summarized_turns == len(summarizer.calls[0])
+
+
+def test_trim_during_fold_keeps_turns_aligned():
+    summarizer = BlockingSummarizer(block=True)
+    store = ConversationStore(summarizer)
+    session = store.get_or_create(None)
+    history = [("user" if i % 2 == 0 else "assistant", f"m{i}") for i in range(C.MAX_PENDING_TURNS - 2)]
+    store.seed(session, history)
+    fold = summarizer.calls[0]
+    assert len(fold) == len(history) - C.KEEP_VERBATIM
+
+    # Özetleme askıdayken kırpma: fold'un ilk mesajları listeden düşer
+    _fill(store, session, 2)
+    trimmed = session.trimmed_turns
+    assert 0 < trimmed < len(fold)
+
+    summarizer.gate.set()
+    _wait_idle(session)
+    assert session.summarized_turns == len(fold)
+    assert session.turns[0] == history[len(fold)]
+    assert not any(t in session.turns for t in fold)
+
+
+def test_failed_summary_leaves_turns_in_place():
+    store = ConversationStore(lambda previous, turns, lang: None)
+    session = store.get_or_create(None)
+    _fill(store, session, (C.KEEP_VERBATIM + C.SUMMARIZE_BATCH) // 2 + 1)
+    _wait_idle(session)
+    assert session.summary == ""
+    assert session.summarized_turns == 0
+    assert len(session.turns) == C.KEEP_VERBATIM + C.SUMMARIZE_BATCH + 2
+
+
+def test_pending_turns_are_capped():
+    store = ConversationStore(lambda previous, turns, lang: None)
+    session = store.get_or_create(None)
+    _fill(store, session, C.MAX_PENDING_TURNS)
+    _wait_idle(session)
+    assert len(session.turns) == C.MAX_PENDING_TURNS
+    assert session.turns[-1] == ("assistant", f"a{C.MAX_PENDING_TURNS - 1}")
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    db = tmp_path / "sessions.db"
+    store = ConversationStore(BlockingSummarizer(), backend=SQLiteSessionBackend(db))
+    session = store.get_or_create("abc", "en")
+    store.append(session, "Hi", "Hello!")
+
+    restarted = ConversationStore(BlockingSummarizer(), backend=SQLiteSessionBackend(db))
+    loaded = restarted.get_or_create("abc")
+    assert loaded is not session
+    assert loaded.lang == "en"
+    assert loaded.turns == [("user", "Hi"), ("assistant", "Hello!")]
+
+
+def test_sqlite_backend_drops_expired_sessions(tmp_path):
+    backend = SQLiteSessionBackend(tmp_path / "sessions.db")
+    store = ConversationStore(BlockingSummarizer(), backend=backend)
+    session = store.get_or_create("old")
+    store.append(session, "q", "a")
+    assert backend.load("old", max_age=60) is not None
+    time.sleep(0.02)
+    assert backend.load("old", max_age=0.01) is None
+    assert backend.prune(max_age=0.01) == 1
+
+
+def test_seed_only_fills_unknown_sessions():
+    store = ConversationStore(BlockingSummarizer())
+    session = store.get_or_create("s")
+    store.seed(session, [("user", "q"), ("assistant", "a")])
+    store.seed(session, [("user", "other")])
+    assert session.turns == [("user", "q"), ("assistant", "a")]
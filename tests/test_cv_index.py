@@ -0,0 +1,88 @@
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from tools.cv_index import CVIndex, CVIndexManager
+
+CV = {"name": "Test Kişi", "projects": [{"name": "Demo", "description": "RAG demo"}]}
+CHUNKS = ["Deneyim: ACME'de veri bilimci", "Projeler: Demo RAG", "Eğitim: Test Üniversitesi"]
+
+
+def _write(tmp_path, cv=CV, vectors=None, chunks=CHUNKS):
+    cv_path, emb_path = tmp_path / "cv.json", tmp_path / "embeddings_data.pkl"
+    cv_path.write_text(json.dumps(cv, ensure_ascii=False), encoding="utf-8")
+    if vectors is None:
+        vectors = np.eye(len(chunks), 8, dtype=np.float32)
+    with open(emb_path, "wb") as f:
+        pickle.dump({"chunks": chunks, "embeddings": vectors, "cv_json": cv,
+                     "manifest": {"provider": "local", "model": "test"}}, f)
+    # Aynı saniyede yazılan dosyalar için damga kesin değişsin
+    for p in (cv_path, emb_path):
+        st = p.stat()
+        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+    return cv_path, emb_path
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return _write(tmp_path)
+
+
+def test_version_changes_when_only_embeddings_change(tmp_path, paths):
+    cv_path, emb_path = paths
+    before = CVIndex.load(cv_path, emb_path, quantization="none").version
+    _write(tmp_path, vectors=np.eye(len(CHUNKS), 8, dtype=np.float32) * 2 + 1)
+    after = CVIndex.load(cv_path, emb_path, quantization="none").version
+    assert before != after
+
+
+def test_version_is_stable_for_identical_content(tmp_path, paths):
+    cv_path, emb_path = paths
+    before = CVIndex.load(cv_path, emb_path, quantization="none").version
+    _write(tmp_path)
+    assert CVIndex.load(cv_path, emb_path, quantization="none").version == before
+
+
+def test_manager_swaps_and_notifies(tmp_path, paths):
+    manager = CVIndexManager(*paths, poll_seconds=0, publish_metrics=False)
+    old = manager.current
+    swaps = []
+    manager.on_swap(lambda o, n: swaps.append((o, n)))
+
+    assert manager.reload() is False            # Dosyalar değişmedi
+    _write(tmp_path, cv={**CV, "name": "Yeni İsim"})
+    assert manager.reload() is True
+    new = manager.current
+    assert new is not old and new.version != old.version
+    assert new.cv_json["name"] == "Yeni İsim"
+    assert swaps == [(old, new)]
+    # Eski snapshot değişmez: süren istekler tutarlı kalır
+    assert old.cv_json["name"] == "Test Kişi"
+
+
+def test_manager_keeps_old_index_on_broken_file(tmp_path, paths):
+    cv_path, emb_path = paths
+    manager = CVIndexManager(cv_path, emb_path, poll_seconds=0, publish_metrics=False)
+    old = manager.current
+    emb_path.write_bytes(b"not a pickle")
+    assert manager.reload() is False
+    assert manager.current is old
+    # Aynı bozuk dosya tekrar denenmez
+    assert manager.reload() is False
+
+
+def test_storage_switch_drops_previous_vector_bytes_label(tmp_path, paths, monkeypatch):
+    from tools.cv_index import INDEX_VECTOR_BYTES
+
+    monkeypatch.setattr(INDEX_VECTOR_BYTES, "_children", {})
+    monkeypatch.setenv("EMBEDDING_QUANTIZATION", "none")
+    manager = CVIndexManager(*paths, poll_seconds=0)
+    assert ("float32",) in INDEX_VECTOR_BYTES._children
+
+    monkeypatch.setenv("EMBEDDING_QUANTIZATION", "int8")
+    assert manager.reload(force=True) is True
+    assert manager.current.storage == "int8"
+    assert [k for k in INDEX_VECTOR_BYTES._children] == [("int8",)]
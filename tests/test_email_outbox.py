@@ -0,0 +1,132 @@
+import json
+import socket
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+import pytest
+
+from tools.email_outbox import EmailOutbox, OutboxConstants, OutboxWorker, is_permanent_failure
+
+aiosmtpd = pytest.importorskip("aiosmtpd.controller")
+
+
+class _Handler:
+    """Records delivered messages; rejects recipients at reject.example.com with 550"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.endswith("@reject.example.com"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, list(envelope.rcpt_tos)))
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    handler = _Handler()
+    controller = aiosmtpd.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _message(to: str) -> MIMEText:
+    msg = MIMEText("merhaba")
+    msg["From"], msg["To"], msg["Subject"] = "bot@example.com", to, "test"
+    return msg
+
+
+def _row(outbox: EmailOutbox, row_id: int):
+    with outbox._connect() as conn:
+        return conn.execute("SELECT * FROM outbox WHERE id = ?", (row_id,)).fetchone()
+
+
+def test_delivers_queued_messages_over_one_session(tmp_path, smtp_server):
+    controller, handler = smtp_server
+    outbox = EmailOutbox(tmp_path / "outbox.sqlite3")
+    ids = [outbox.enqueue(_message(f"u{i}@example.com"), "bot@example.com", [f"u{i}@example.com"])
+           for i in range(3)]
+    worker = OutboxWorker(outbox, controller.hostname, controller.port, use_starttls=False)
+
+    assert worker.process_due() == 3
+    assert [rcpt for _, rcpt in handler.messages] == [[f"u{i}@example.com"] for i in range(3)]
+    assert all(_row(outbox, i)["status"] == "sent" for i in ids)
+    assert outbox.stats() == {"sent": 3}
+    worker._disconnect()
+
+
+def test_refused_recipient_fails_without_retry(tmp_path, smtp_server):
+    controller, _ = smtp_server
+    outbox = EmailOutbox(tmp_path / "outbox.sqlite3")
+    row_id = outbox.enqueue(_message("x@reject.example.com"), "bot@example.com", ["x@reject.example.com"])
+    worker = OutboxWorker(outbox, controller.hostname, controller.port, use_starttls=False)
+
+    assert worker.process_due() == 0
+    row = _row(outbox, row_id)
+    assert row["status"] == "failed"
+    assert row["attempts"] == 1
+    assert "SMTPRecipientsRefused" in row["last_error"]
+
+
+def test_connection_error_is_retried_with_backoff(tmp_path):
+    outbox = EmailOutbox(tmp_path / "outbox.sqlite3")
+    row_id = outbox.enqueue(_message("u@example.com"), "bot@example.com", ["u@example.com"])
+    # Kimsenin dinlemediği port: bağlantı reddedilir (geçici hata)
+    worker = OutboxWorker(outbox, "127.0.0.1", _free_port(), use_starttls=False)
+
+    before = time.time()
+    assert worker.process_due() == 0
+    row = _row(outbox, row_id)
+    assert row["status"] == "pending"
+    assert row["attempts"] == 1
+    base = OutboxConstants.BACKOFF_BASE_SECONDS
+    assert before + base / 2 <= row["send_after"] <= time.time() + base
+    # Backoff dolmadan tekrar denenmez
+    assert outbox.claim_due() == []
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    outbox = EmailOutbox(tmp_path / "outbox.sqlite3")
+    row_id = outbox.enqueue(_message("u@example.com"), "bot@example.com", ["u@example.com"])
+    outbox.mark_retry(row_id, OutboxConstants.MAX_ATTEMPTS - 1, "timeout")
+    assert _row(outbox, row_id)["status"] == "pending"
+    outbox.mark_retry(row_id, OutboxConstants.MAX_ATTEMPTS, "timeout")
+    assert _row(outbox, row_id)["status"] == "failed"
+
+
+def test_interrupted_sends_are_requeued_on_restart(tmp_path):
+    db = tmp_path / "outbox.sqlite3"
+    outbox = EmailOutbox(db)
+    row_id = outbox.enqueue(_message("u@example.com"), "bot@example.com", ["u@example.com"])
+    assert [r["id"] for r in outbox.claim_due()] == [row_id]
+    assert _row(outbox, row_id)["status"] == "sending"
+
+    restarted = EmailOutbox(db)
+    row = _row(restarted, row_id)
+    assert row["status"] == "pending"
+    assert json.loads(row["to_addrs"]) == ["u@example.com"]
+
+
+@pytest.mark.parametrize("exc, permanent", [
+    (smtplib.SMTPRecipientsRefused({"x@y": (550, b"no")}), True),
+    (smtplib.SMTPAuthenticationError(535, b"bad credentials"), True),
+    (smtplib.SMTPDataError(554, b"rejected"), True),
+    (smtplib.SMTPDataError(451, b"try later"), False),
+    (smtplib.SMTPServerDisconnected("gone"), False),
+    (ConnectionRefusedError(), False),
+])
+def test_permanent_failure_classification(exc, permanent):
+    assert is_permanent_failure(exc) is permanent
@@ -0,0 +1,33 @@
+import tempfile
+from pathlib import Path
+
+import pytest
+
+streamlit_config = pytest.importorskip("streamlit.config")
+
+# tools.gemini_tool import sırasında st.secrets["GEMINI_API_KEY"] okur
+_secrets = Path(tempfile.mkdtemp()) / "secrets.toml"
+_secrets.write_text('GEMINI_API_KEY = "test"\n', encoding="utf-8")
+streamlit_config.set_option("secrets.files", [str(_secrets)])
+
+from tools import email_tool  # noqa: E402
+
+
+def _tool(**settings):
+    tool = email_tool.EmailTool.__new__(email_tool.EmailTool)
+    tool.email_user = settings.get("user")
+    tool.email_password = settings.get("password")
+    tool.recipient_email = settings.get("recipient")
+    tool._get_outbox_worker = lambda: pytest.fail("nothing may be queued without SMTP settings")
+    return tool
+
+
+@pytest.mark.parametrize("settings, expected", [
+    ({"password": "p", "recipient": "r@example.com"}, "authentication failed"),
+    ({"user": "u@example.com", "recipient": "r@example.com"}, "authentication failed"),
+    ({"user": "u@example.com", "password": "p"}, "RECIPIENT_EMAIL"),
+])
+def test_missing_config_is_reported_and_not_queued(settings, expected):
+    result = _tool(**settings).send_email("Ali", "ali@example.com", "Merhaba", "Selam")
+    assert result["success"] is False
+    assert expected in result["message"]
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import tools.embeddings as embeddings
+from tools.embeddings import EmbeddingError, EmbeddingProvider, LocalEmbeddingProvider
+
+
+class FakeModel:
+    fail_encode = False
+
+    def __init__(self, name, device="cpu", backend=None, model_kwargs=None):
+        self.backend = backend
+
+    def encode(self, texts, **kwargs):
+        if self.fail_encode:
+            raise RuntimeError("out of memory")
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def _factory(fail_backends, calls):
+    def make(name, device="cpu", **kwargs):
+        calls.append(kwargs.get("backend", "torch"))
+        if kwargs.get("backend", "torch") in fail_backends:
+            raise OSError(f"{kwargs.get('backend', 'torch')} missing")
+        return FakeModel(name, device, **kwargs)
+    return make
+
+
+def test_provider_base_is_abstract():
+    with pytest.raises(TypeError):
+        EmbeddingProvider("model")
+
+
+def test_onnx_failure_falls_back_to_torch(monkeypatch):
+    calls = []
+    monkeypatch.setattr(embeddings, "SentenceTransformer", _factory({"onnx"}, calls))
+    provider = LocalEmbeddingProvider("m", backend="onnx-int8")
+    assert provider.embed_batch(["a", "b"]).shape == (2, 4)
+    assert calls == ["onnx", "torch"]
+    assert provider.manifest()["backend"] == "torch"
+
+
+def test_failed_load_is_wrapped_and_remembered(monkeypatch):
+    calls = []
+    monkeypatch.setattr(embeddings, "SentenceTransformer", _factory({"onnx", "torch"}, calls))
+    provider = LocalEmbeddingProvider("m", backend="onnx")
+    assert provider.available
+    with pytest.raises(EmbeddingError, match="torch missing"):
+        provider.embed("soru")
+    assert not provider.available
+    with pytest.raises(EmbeddingError):
+        provider.embed("soru")
+    assert calls == ["onnx", "torch"]        # Yükleme tekrar denenmedi
+
+
+def test_torch_only_failure_is_wrapped(monkeypatch):
+    monkeypatch.setattr(embeddings, "SentenceTransformer", _factory({"torch"}, []))
+    with pytest.raises(EmbeddingError):
+        LocalEmbeddingProvider("m", backend="torch").embed("soru")
+
+
+def test_encode_failure_is_wrapped(monkeypatch):
+    monkeypatch.setattr(embeddings, "SentenceTransformer", _factory(set(), []))
+    monkeypatch.setattr(FakeModel, "fail_encode", True)
+    provider = LocalEmbeddingProvider("m", backend="torch")
+    with pytest.raises(EmbeddingError, match="out of memory"):
+        provider.embed("soru")
+    assert provider.available                # Model yüklü; geçici hata
+
+
+def test_missing_dependency(monkeypatch):
+    monkeypatch.setattr(embeddings, "SentenceTransformer", None)
+    provider = LocalEmbeddingProvider("m")
+    assert not provider.available
+    with pytest.raises(EmbeddingError):
+        provider.embed("soru")
@@ -0,0 +1,79 @@
+import pytest
+import requests
+
+from tools import gemini_client
+from tools.gemini_client import GeminiClient, GeminiError
+
+
+class _Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = str(body)
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _Session:
+    """Replays a script of responses / exceptions and records the read timeouts"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.read_timeouts = []
+
+    def post(self, url, headers, json, timeout):
+        self.read_timeouts.append(timeout[1])
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step() if callable(step) else step
+
+
+OK = _Response(200, {"candidates": [{"content": {"parts": [{"text": "hi"}]}}],
+                     "embedding": {"values": [1.0]}})
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(gemini_client.time, "sleep", lambda s: None)
+    monkeypatch.setattr(GeminiClient, "_backoff", staticmethod(lambda attempt: 0.0))
+
+
+def _client(session):
+    return GeminiClient(api_key="k", base_url="http://fake", session=session)
+
+
+def test_generate_does_not_retry_read_timeout():
+    session = _Session(requests.ReadTimeout("slow"), OK)
+    with pytest.raises(GeminiError):
+        _client(session).generate("q", timeout=60)
+    assert len(session.read_timeouts) == 1
+
+
+def test_generate_retries_connection_errors_and_5xx():
+    session = _Session(requests.ConnectionError("reset"), _Response(503, "busy"), OK)
+    assert _client(session).generate("q") == "hi"
+    assert len(session.read_timeouts) == 3
+
+
+def test_embed_retries_read_timeout():
+    session = _Session(requests.ReadTimeout("slow"), OK)
+    assert _client(session).embed("q", timeout=10) == [1.0]
+
+
+def test_timeout_is_one_deadline_across_retries(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(gemini_client.time, "monotonic", lambda: now[0])
+
+    def _slow_503(*args, **kwargs):
+        now[0] += 4.0
+        return _Response(503, "busy")
+
+    session = _Session(*[_slow_503] * 4)
+
+    with pytest.raises(GeminiError):
+        _client(session).embed("q", timeout=10)
+    # 0 -> 4 -> 8 -> deadline (10) reached before a 4th attempt
+    assert session.read_timeouts == [10.0, 6.0, 2.0]
@@ -0,0 +1,34 @@
+from tools.metrics import Registry, registry
+
+
+def test_process_cpu_seconds_is_exported_as_counter():
+    text = registry.render()
+    assert "# TYPE process_cpu_seconds_total counter" in text
+    value = next(line for line in text.splitlines() if line.startswith("process_cpu_seconds_total "))
+    assert float(value.split()[1]) >= 0
+
+
+def test_callback_metrics_render_current_value():
+    reg = Registry()
+    state = {"n": 1.0}
+    reg.counter("work_seconds_total", "Work.", fn=lambda: state["n"])
+    reg.gauge("queue_depth", "Depth.", fn=lambda: 3)
+    state["n"] = 2.5
+    text = reg.render()
+    assert "# TYPE work_seconds_total counter\nwork_seconds_total 2.5" in text
+    assert "# TYPE queue_depth gauge\nqueue_depth 3" in text
+
+
+def test_failing_callback_skips_sample():
+    reg = Registry()
+    reg.counter("broken_total", "Broken.", fn=lambda: 1 / 0)
+    assert reg.render().splitlines()[-1] == "# TYPE broken_total counter"
+
+
+def test_removed_label_set_is_not_rendered():
+    reg = Registry()
+    gauge = reg.gauge("test_storage_bytes", "Bytes by storage mode.", ("storage",))
+    gauge.labels("float32").set(10)
+    gauge.labels("int8").set(3)
+    gauge.remove("float32")
+    assert [line for line in gauge.render() if not line.startswith("#")] == ['test_storage_bytes{storage="int8"} 3']
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("reportlab")
+
+from tools import pdf_generator
+from tools.pdf_generator import get_batch_pool, iter_pdf_batch, shutdown_batch_pool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv(pdf_generator.BatchConstants.WORKERS_ENV, "2")
+    shutdown_batch_pool()
+    yield
+    shutdown_batch_pool()
+
+
+def _payloads(n):
+    return [{"report_content": f"# Report {i}\n\nScore: {i}", "job_title": f"Job {i}"} for i in range(n)]
+
+
+def test_batches_reuse_one_spawned_pool(pool):
+    first = list(iter_pdf_batch(_payloads(3)))
+    executor, workers = get_batch_pool()
+    second = list(iter_pdf_batch(_payloads(2), max_workers=1))
+
+    assert sorted(i for i, _, _ in first) == [0, 1, 2]
+    assert sorted(i for i, _, _ in second) == [0, 1]
+    assert all(data.startswith(b"%PDF") for _, _, data in first + second)
+    assert get_batch_pool()[0] is executor
+    assert workers == 2
+    assert executor._mp_context.get_start_method() == "spawn"
+
+
+def test_failed_item_is_reported_and_pool_survives(pool):
+    errors = []
+    results = list(iter_pdf_batch([{"job_title": "no content"}] + _payloads(1), errors=errors))
+
+    assert [i for i, _, _ in results] == [1]
+    assert [e["index"] for e in errors] == [0]
+    assert list(iter_pdf_batch(_payloads(1)))
+
+
+def test_shutdown_creates_fresh_pool_on_next_use(pool):
+    executor, _ = get_batch_pool()
+    shutdown_batch_pool()
+    assert get_batch_pool()[0] is not executor
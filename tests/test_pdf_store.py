@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+pytest.importorskip("reportlab")
+
+from tools.pdf_generator import PDFStore, PDFTooLarge
+
+
+def _buffer(size):
+    return io.BytesIO(b"%PDF" + b"x" * (size - 4))
+
+
+def test_put_rejects_document_over_byte_budget():
+    store = PDFStore(max_total_bytes=100)
+    with pytest.raises(PDFTooLarge):
+        store.put(_buffer(101), "big.pdf")
+    assert store._total_bytes == 0
+
+
+def test_new_entry_survives_when_entry_budget_is_full():
+    store = PDFStore(max_entries=1)
+    first = store.put(_buffer(10), "a.pdf")
+    second = store.put(_buffer(10), "b.pdf")
+
+    assert store.get(second.pdf_id) is second
+    assert store.get(first.pdf_id) is None
+
+
+def test_older_entries_make_room_for_new_bytes():
+    store = PDFStore(max_total_bytes=100)
+    old = [store.put(_buffer(40), f"{i}.pdf") for i in range(2)]
+    new = store.put(_buffer(90), "new.pdf")
+
+    assert store.get(new.pdf_id) is new
+    assert all(store.get(e.pdf_id) is None for e in old)
+    assert store._total_bytes == 90
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    store = PDFStore(ttl_seconds=60)
+    entry = store.put(_buffer(10), "a.pdf")
+    monkeypatch.setattr("tools.pdf_generator.time.time", lambda: entry.created_at + 61)
+    assert store.get(entry.pdf_id) is None
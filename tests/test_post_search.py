@@ -0,0 +1,107 @@
+from concurrent.futures import Future
+from datetime import datetime
+
+import numpy as np
+
+from tools import social_media_tool
+from tools.post_index import PostIndex
+from tools.social_media_tool import SocialMediaAggregator
+
+
+class _StaticFeed:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def get_posts(self):
+        return self.posts
+
+
+def _post(i, title):
+    return {"url": f"https://medium.com/p/{i}", "title": title, "summary": title,
+            "published_date": datetime(2024, 1, i + 1), "tags": []}
+
+
+def _aggregator(posts, index):
+    agg = SocialMediaAggregator.__new__(SocialMediaAggregator)
+    agg.feed_cache = _StaticFeed(posts)
+    agg.post_index = index
+    return agg
+
+
+def _embed(text):
+    return np.array([1.0, 0.0] if "python" in text.lower() else [0.0, 1.0], dtype=np.float32)
+
+
+def test_cold_index_falls_back_to_latest_posts():
+    posts = [_post(0, "Python tips"), _post(1, "Docker notes")]
+    agg = _aggregator(posts, PostIndex(embed_fn=_embed))
+
+    results = agg.search_posts("python", limit=2)
+
+    assert [p["url"] for p in results] == [p["url"] for p in posts]
+
+
+def test_synced_index_ranks_by_query():
+    posts = [_post(0, "Docker notes"), _post(1, "Python tips")]
+    index = PostIndex(embed_fn=_embed)
+    index.sync(posts)
+    agg = _aggregator(posts, index)
+
+    results = agg.search_posts("python", limit=2)
+
+    assert [p["title"] for p in results] == ["Python tips"]
+
+
+
+def test_save_to_disk_replaces_file_atomically(tmp_path):
+    path = tmp_path / "index.pkl"
+    index = PostIndex(embed_fn=_embed, disk_path=path)
+    index.sync([_post(0, "Python tips")])
+
+    assert PostIndex(embed_fn=_embed, disk_path=path)._vectors.keys() == {"https://medium.com/p/0"}
+    assert [p.name for p in tmp_path.iterdir()] == ["index.pkl"]
+
+
+def test_failed_save_keeps_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "index.pkl"
+    index = PostIndex(embed_fn=_embed, disk_path=path)
+    index.sync([_post(0, "Python tips")])
+
+    def _broken_dump(data, f):
+        f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr("tools.post_index.pickle.dump", _broken_dump)
+    index.sync([_post(0, "Python tips"), _post(1, "Docker notes")])
+    monkeypatch.undo()
+
+    assert PostIndex(embed_fn=_embed, disk_path=path)._vectors.keys() == {"https://medium.com/p/0"}
+    assert [p.name for p in tmp_path.iterdir()] == ["index.pkl"]
+
+
+class _Thumbnails:
+    def __init__(self, reachable, slow=()):
+        self.reachable, self.slow = reachable, slow
+
+    def validate_async(self, urls):
+        checks = {}
+        for url in set(urls):
+            checks[url] = Future()
+            if url not in self.slow:
+                checks[url].set_result(url in self.reachable)
+        return checks
+
+
+def test_guessed_thumbnails_are_swapped_before_publishing(monkeypatch):
+    monkeypatch.setattr(social_media_tool.FeedCacheConstants, "THUMBNAIL_CHECK_WAIT", 0.01)
+    guessed = [social_media_tool._GUESSED_IMAGE_URL.format(post_id=f"{i:012x}") for i in range(3)]
+    monkeypatch.setattr(social_media_tool, "get_thumbnail_cache",
+                        lambda: _Thumbnails(reachable={guessed[0]}, slow={guessed[2]}))
+    posts = [dict(_post(i, f"Post {i}"), post_id=f"{i:012x}", thumbnail=guessed[i]) for i in range(3)]
+    agg = _aggregator([], None)
+    monkeypatch.setattr(agg, "_create_card_image", lambda title, index: f"card:{title}")
+
+    agg._validate_guessed_thumbnails(posts)
+
+    # reachable guess kept, 404 swapped, unfinished check left for the next refresh
+    assert [p["thumbnail"] for p in posts] == [guessed[0], "card:Post 1", guessed[2]]
@@ -0,0 +1,43 @@
+from tools.prompt_builder import ContextItem, PromptBuilder, estimate_tokens, truncate_to_tokens
+
+HISTORY = [("user", "Hangi projeleri yaptın?"), ("assistant", "Portföy asistanı ve RAG projeleri.")]
+
+
+def _build(lang, budget=3000, history=HISTORY, summary=""):
+    return PromptBuilder(budget=budget).build(
+        "instr", "CTX", "Q", "soru", [ContextItem("chunk", score=1.0)],
+        history=history, lang=lang, summary=summary)
+
+
+def test_history_labels_follow_language():
+    en = _build("en", summary="talked about RAG").text
+    assert "Recent conversation (for reference):" in en
+    assert "Summary of the earlier conversation: talked about RAG" in en
+    assert "User: Hangi projeleri yaptın?" in en and "Assistant: Portföy" in en
+    assert "Önceki" not in en and "Kullanıcı" not in en
+
+    tr = _build("tr", summary="RAG konuşuldu").text
+    assert "Son sohbet geçmişi (referans için):" in tr
+    assert "Önceki konuşmanın özeti: RAG konuşuldu" in tr
+    assert "Kullanıcı: Hangi projeleri yaptın?" in tr and "Asistan: Portföy" in tr
+
+
+def test_dropped_history_note_is_localized():
+    history = [("user", "x" * 600), ("assistant", "y" * 600)] * 4
+    built = _build("en", budget=400, history=history)
+    assert built.history_dropped > 0
+    assert f"{built.history_dropped} earlier messages omitted" in built.text
+
+
+def test_budget_is_respected_and_context_ranked():
+    items = [ContextItem("low " * 200, score=0.1), ContextItem("high", score=0.9)]
+    built = PromptBuilder(budget=300).build("instr", "CTX", "Q", "soru", items, lang="en")
+    assert built.tokens <= 300
+    assert built.text.index("high") < built.text.index("low")
+
+
+def test_truncate_to_tokens():
+    text = "kelime " * 100
+    cut = truncate_to_tokens(text, 20)
+    assert estimate_tokens(cut) <= 20 and cut.endswith("…")
+    assert truncate_to_tokens("kısa", 20) == "kısa"
@@ -0,0 +1,96 @@
+import pickle
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from tools.cv_index import CVIndex, load_embeddings_mmap
+from tools.quantize import QuantizationConstants as QC, QuantizedMatrix, quantization_mode, quantize
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(0)
+    emb = rng.standard_normal((QC.BLOCK_ROWS + 37, 32)).astype(np.float32)
+    emb[5] = 0.0                                 # Embedding hatası: sıfır satır
+    return emb
+
+
+def test_int8_round_trip_error_is_bounded(matrix):
+    codes, scales = quantize(matrix, QC.INT8)
+    assert codes.dtype == np.int8 and scales.shape == (matrix.shape[0],)
+    restored = codes.astype(np.float32) * scales[:, None]
+    # Yarım adım: satır başına max|x| / 127 / 2
+    assert np.all(np.abs(restored - matrix) <= scales[:, None] / 2 + 1e-6)
+    assert np.all(codes[5] == 0)
+
+
+@pytest.mark.parametrize("mode,tolerance", [(QC.INT8, 0.05), (QC.FLOAT16, 1e-2)])
+def test_dot_matches_float32(matrix, mode, tolerance):
+    q = np.random.default_rng(1).standard_normal(32).astype(np.float32)
+    qm = QuantizedMatrix.from_matrix(matrix, mode, rescore=True)
+    exact = matrix @ q
+    approx = qm.dot(q, slice(None))
+    assert np.max(np.abs(approx - exact)) / np.max(np.abs(exact)) < tolerance
+    rows = np.array([3, 4100, 7])
+    assert np.allclose(qm.dot(q, rows), approx[rows])
+    assert np.allclose(qm.vectors(rows) @ q, approx[rows], atol=1e-4)
+    assert qm.mode == mode
+
+
+def test_int8_is_four_times_smaller(matrix):
+    qm = QuantizedMatrix.from_matrix(matrix, QC.INT8)
+    assert matrix.nbytes / qm.nbytes > 3.5             # 32 boyutta ölçek payı dahil
+    with pytest.raises(ValueError):
+        qm.codes[0, 0] = 1                       # Salt okunur
+
+
+def test_auto_mode_quantizes_only_large_indexes(monkeypatch):
+    monkeypatch.delenv(QC.MODE_ENV, raising=False)
+    monkeypatch.setenv(QC.AUTO_MIN_MB_ENV, "1")
+    assert quantization_mode(source_bytes=200_000) == QC.NONE
+    assert quantization_mode(source_bytes=2 * 1024 * 1024) == QC.INT8
+    assert quantization_mode(QC.FLOAT16, source_bytes=0) == QC.FLOAT16
+    assert quantization_mode("bogus") == QC.NONE
+
+
+def test_small_cv_index_stays_float32(tmp_path, monkeypatch):
+    monkeypatch.delenv(QC.MODE_ENV, raising=False)
+    path = tmp_path / "embeddings_data.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"chunks": ["a", "b"], "embeddings": np.eye(2, 8, dtype=np.float32)}, f)
+    (tmp_path / "cv.json").write_text("{}", encoding="utf-8")
+    index = CVIndex.load(tmp_path / "cv.json", path)
+    assert index.storage == "float32" and index.quantized is None
+
+
+def test_concurrent_sidecar_writers_do_not_clash(tmp_path, monkeypatch):
+    path = tmp_path / "embeddings_data.pkl"
+    emb = np.random.default_rng(2).standard_normal((50, 16)).astype(np.float32)
+    with open(path, "wb") as f:
+        pickle.dump({"chunks": [f"c{i}" for i in range(50)], "embeddings": emb}, f)
+
+    # Yazımı yavaşlat: işçiler sidecar'ı aynı anda yazıyor olsun
+    save = np.save
+    monkeypatch.setattr(np, "save", lambda *a, **k: (time.sleep(0.05), save(*a, **k)))
+    results, errors = [], []
+    start = threading.Barrier(8)
+
+    def load():
+        start.wait()
+        try:
+            results.append(load_embeddings_mmap(path).emb)
+        except Exception as e:            # pragma: no cover - hata testi başarısız kılar
+            errors.append(e)
+
+    threads = [threading.Thread(target=load) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    # Hiçbir işçi yarış yüzünden mmap'siz (bellekte) yüklemeye düşmedi
+    assert all(isinstance(r, np.memmap) for r in results)
+    assert all(np.array_equal(r, emb) for r in results)
+    assert not list(tmp_path.glob("*.tmp"))
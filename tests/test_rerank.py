@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from tools.rerank import RerankConstants, mmr_select, top_candidates
+
+
+def _unit(*rows):
+    return np.asarray(rows, dtype=np.float32)
+
+
+def test_top_candidates_best_first():
+    sims = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert top_candidates(sims, 2).tolist() == [1, 3]
+    assert top_candidates(sims, 10).tolist() == [1, 3, 2, 0]
+
+
+def test_near_duplicates_are_skipped():
+    vectors = _unit([1, 0, 0], [1, 0.01, 0], [0, 1, 0])
+    sims = np.array([0.9, 0.89, 0.85], dtype=np.float32)
+    picked = mmr_select(sims, vectors, 3, mmr_lambda=0.7, min_similarity=0.0, relative_floor=0.0)
+    assert [p for p, _ in picked] == [0, 2]
+
+
+def test_diversity_beats_redundant_relevance():
+    vectors = _unit([1, 0, 0], [0.9, 0.43, 0], [0, 0, 1])
+    sims = np.array([0.9, 0.88, 0.8], dtype=np.float32)
+    picked = mmr_select(sims, vectors, 2, mmr_lambda=0.5, min_similarity=0.0, relative_floor=0.0)
+    assert [p for p, _ in picked] == [0, 2]
+
+
+def test_thresholds_drop_weak_matches_but_keep_best():
+    vectors = np.eye(3, dtype=np.float32)
+    sims = np.array([0.6, 0.5, 0.3], dtype=np.float32)
+    picked = mmr_select(sims, vectors, 3, min_similarity=0.45, relative_floor=0.0)
+    assert [p for p, _ in picked] == [0, 1]
+    picked = mmr_select(sims, vectors, 3, min_similarity=0.0, relative_floor=0.9)
+    assert [p for p, _ in picked] == [0]
+    # Hiçbiri eşiği geçmese de en iyi parça döner
+    picked = mmr_select(sims, vectors, 3, min_similarity=0.99, relative_floor=0.0)
+    assert picked == [(0, pytest.approx(0.6))]
+
+
+def test_relative_floor_from_env(monkeypatch):
+    vectors = np.eye(3, dtype=np.float32)
+    sims = np.array([0.9, 0.7, 0.6], dtype=np.float32)
+    monkeypatch.setenv(RerankConstants.RELATIVE_FLOOR_ENV, "0")
+    assert len(mmr_select(sims, vectors, 3, min_similarity=0.0)) == 3
+    monkeypatch.setenv(RerankConstants.RELATIVE_FLOOR_ENV, "0.75")
+    assert [p for p, _ in mmr_select(sims, vectors, 3, min_similarity=0.0)] == [0, 1]
+
+
+def test_empty_candidates():
+    assert mmr_select(np.array([], dtype=np.float32), np.empty((0, 3), dtype=np.float32), 3) == []
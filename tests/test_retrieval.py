@@ -0,0 +1,62 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import api_server
+from tools.cv_index import CVIndex
+
+# section -> (chunk, vektör yönü)
+ROWS = [
+    ("experience", "Deneyim: Veri Bilimci at ACME", 0),
+    ("experience", "Deneyim: Stajyer at Beta", 1),
+    ("projects", "Proje: Portföy Asistanı (Python) - RAG", 2),
+    ("projects", "Proje: Churn Tahmini (sklearn)", 3),
+    ("skills", "Yetenekler - Araçlar: Docker, Kubernetes", 4),
+    ("skills", "Yetenekler - Diller: Python, SQL", 5),
+]
+
+
+@pytest.fixture(params=["none", "int8"])
+def index(request, tmp_path):
+    emb = np.zeros((len(ROWS), 8), dtype=np.float32)
+    for i, (_, _, axis) in enumerate(ROWS):
+        emb[i, axis] = 1.0
+        emb[i, 7] = 0.1
+    path = tmp_path / "embeddings_data.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"chunks": [c for _, c, _ in ROWS], "embeddings": emb,
+                     "records": [{"section": s} for s, _, _ in ROWS],
+                     "manifest": {"provider": "local", "model": "test"}}, f)
+    cv_path = tmp_path / "cv.json"
+    cv_path.write_text("{}", encoding="utf-8")
+    return CVIndex.load(cv_path, path, quantization=request.param)
+
+
+def _query_along(monkeypatch, axis):
+    vec = np.zeros(8, dtype=np.float32)
+    vec[axis] = 1.0
+    monkeypatch.setattr(api_server, "_embed_query", lambda index, text: vec)
+
+
+def test_routed_section_is_scored(monkeypatch, index):
+    _query_along(monkeypatch, 3)
+    items, mode = api_server._retrieve(index, "Hangi projeleri yaptın?", 2, ["projects"])
+    assert mode == "section"
+    assert items[0].text.startswith("Proje: Churn") and items[0].score > 0.9
+    assert all(i.text.startswith("Proje") for i in items)
+
+
+def test_weak_section_match_falls_back_to_full_matrix(monkeypatch, index):
+    # Alias "projects"e yönlendirdi ama soru aslında yeteneklerle ilgili
+    _query_along(monkeypatch, 4)
+    items, mode = api_server._retrieve(index, "Docker projelerin?", 2, ["projects"])
+    assert mode == "vector"
+    assert items[0].text.startswith("Yetenekler - Araçlar")
+
+
+def test_keyword_fallback_stays_in_section_without_embeddings(monkeypatch, index):
+    monkeypatch.setattr(api_server, "_embed_query", lambda index, text: None)
+    items, mode = api_server._retrieve(index, "churn projesi", 2, ["projects"])
+    assert mode == "keyword"
+    assert items[0].text.startswith("Proje: Churn")
@@ -0,0 +1,39 @@
+import pytest
+
+from tools.section_router import SectionRouter
+
+
+@pytest.fixture
+def router():
+    return SectionRouter(enabled=True)
+
+
+@pytest.mark.parametrize("question,sections", [
+    ("Eğitim bilgilerin neler?", ["education"]),
+    ("Hangi projeleri yaptın?", ["projects"]),
+    ("Projelerinden ve ödüllerinden bahset", ["projects", "awards"]),
+    ("What is your work experience?", ["experience"]),
+    ("E-posta adresin ne?", ["personal"]),
+])
+def test_section_questions_are_routed(router, question, sections):
+    assert router.route(question).sections == sections
+
+
+@pytest.mark.parametrize("question", [
+    "LLM hakkında ne biliyorsun?",
+    "Docker ile çalıştın mı?",
+    "Hangi programlama dillerini biliyorsun?",
+    "Which programming languages do you know?",
+    "Where did you work before?",
+])
+def test_generic_words_do_not_route(router, question):
+    assert not router.route(question).routed
+
+
+def test_long_or_broad_questions_use_full_search(router):
+    assert not router.route("Eğitimin, deneyimin, projelerin ve ödüllerin neler?").routed
+    assert not router.route("Bana biraz kendinden ve projelerinden detaylı şekilde bahseder misin lütfen").routed
+
+
+def test_disabled_router_never_routes():
+    assert not SectionRouter(enabled=False).route("Eğitim bilgilerin neler?").routed
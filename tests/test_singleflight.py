@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(flight.do, "q", fn) for _ in range(8)]
+        # Takipçiler lider bitmeden bağlansın
+        threading.Event().wait(0.05)
+        release.set()
+        results = [f.result(5) for f in futures]
+
+    assert len(calls) == 1
+    assert {r for r, _ in results} == {"answer"}
+    assert sum(1 for _, shared in results if not shared) == 1
+    assert flight.in_flight() == 0
+
+
+def test_error_is_raised_to_every_waiter_and_not_kept():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def boom():
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, "q", boom) for _ in range(4)]
+        threading.Event().wait(0.05)
+        release.set()
+        for f in futures:
+            with pytest.raises(ValueError):
+                f.result(5)
+
+    # Sonuç saklanmaz: sonraki çağrı fn'i yeniden çalıştırır
+    assert flight.do("q", lambda: 42) == (42, False)
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight("test")
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
@@ -0,0 +1,79 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from tools.cv_index import CVIndexManager
+from tools.tenants import TenantConstants, TenantRegistry, UnknownTenant
+
+
+def _portfolio(directory, name, rows=3):
+    directory.mkdir(parents=True, exist_ok=True)
+    cv = {"name": name}
+    (directory / TenantConstants.CV_FILE).write_text(json.dumps(cv), encoding="utf-8")
+    with open(directory / TenantConstants.EMBEDDINGS_FILE, "wb") as f:
+        pickle.dump({"chunks": [f"{name} chunk {i}" for i in range(rows)],
+                     "embeddings": np.eye(rows, 8, dtype=np.float32), "cv_json": cv}, f)
+    return directory
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_QUANTIZATION", "none")
+    default_dir = _portfolio(tmp_path / "default", "Varsayılan")
+    default = CVIndexManager(default_dir / TenantConstants.CV_FILE, default_dir / TenantConstants.EMBEDDINGS_FILE,
+                             poll_seconds=0, publish_metrics=False)
+    base = tmp_path / "tenants"
+    for tenant in ("ali", "ayse", "can"):
+        _portfolio(base / tenant, tenant.title())
+    return TenantRegistry(default, base_dir=base, max_resident=2, max_resident_bytes=10 ** 9)
+
+
+def test_default_tenant_uses_the_server_index(registry):
+    assert registry.get(TenantConstants.DEFAULT_TENANT).cv_json["name"] == "Varsayılan"
+
+
+def test_lru_evicts_least_recently_used(registry):
+    assert registry.get("ali").cv_json["name"] == "Ali"
+    registry.get("ayse")
+    registry.get("ali")             # ali en son kullanılan
+    registry.get("can")             # sınır 2: ayse düşer
+    assert list(registry._resident) == ["ali", "can"]
+
+
+def test_byte_budget_keeps_only_newest(registry):
+    registry.max_resident_bytes = 1
+    registry.get("ali")
+    registry.get("ayse")
+    assert list(registry._resident) == ["ayse"]
+
+
+@pytest.mark.parametrize("tenant", ["missing", "../etc", "Ali", TenantConstants.DEFAULT_TENANT + "/x"])
+def test_unknown_or_invalid_tenant(registry, tenant):
+    with pytest.raises(UnknownTenant):
+        registry.get(tenant)
+    assert tenant not in registry._loading
+
+
+def test_resolve_prefix_header_and_host(registry):
+    assert registry.resolve("/t/ali/api/chat", None, None) == ("ali", "/api/chat")
+    assert registry.resolve("/api/chat", None, "ayse") == ("ayse", "/api/chat")
+    registry.hosts = {"can.example.com": "can"}
+    assert registry.resolve("/api/cv", "can.example.com:443", None) == ("can", "/api/cv")
+    assert registry.resolve("/api/cv", "other.example.com", None) == (TenantConstants.DEFAULT_TENANT, "/api/cv")
+
+
+def test_resident_total_tracks_loads_evictions_and_reloads(registry, tmp_path):
+    registry.get("ali")
+    registry.get("ayse")
+    registry.get("can")     # ali düşer
+    sizes = {t: m.current.resident_bytes for t, m in registry._resident.items()}
+    assert registry._total_bytes == sum(sizes.values())
+
+    _portfolio(tmp_path / "tenants" / "can", "Can", rows=6)
+    manager = registry._resident["can"]
+    manager.last_checked = 0
+    registry.get("can")
+    assert manager.current.resident_bytes > sizes["can"]
+    assert registry._total_bytes == sizes["ayse"] + manager.current.resident_bytes
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from tools.metrics import registry
+
+
+class AnswerCacheConstants:
+    """Constants for the semantic answer cache"""
+    THRESHOLD_ENV = "ANSWER_CACHE_THRESHOLD"
+    # Kosinüs. 0.92 "Docker ile çalıştın mı?" ~ "Kubernetes ile çalıştın mı?" gibi yakın ama farklı
+    # soruları da eşleyebiliyor; yanlış cevap, kaçan hit'ten pahalı. Ayar: bench/answer_cache_eval.py
+    DEFAULT_THRESHOLD = 0.95
+    TTL_SECONDS = 6 * 60 * 60
+    MAX_ENTRIES = 512
+    BYPASS_HEADER = "X-Answer-Cache"   # istek: "bypass" | yanıt: hit / miss / bypass / skip
+
+
+ANSWER_CACHE_REQUESTS = registry.counter(
+    "answer_cache_requests_total", "Semantic answer cache lookups by result.", ("result",))
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    reply: str
+    vector: np.ndarray
+    created_at: float
+
+
+Partition = Tuple[str, str]   # (lang, cv_version)
+
+
+class SemanticAnswerCache:
+    """
+    Reply cache for history-free questions, keyed by the query embedding.
+
+    Entries live in (lang, cv_version) partitions, so a CV reload or the other
+    language never serves a stale / wrong-language reply. A lookup is one
+    matrix-vector product against the partition's normalized vectors; the
+    best match above the threshold wins. Eviction is TTL + global LRU.
+    """
+
+    def __init__(self,
+                 threshold: Optional[float] = None,
+                 ttl: float = AnswerCacheConstants.TTL_SECONDS,
+                 max_entries: int = AnswerCacheConstants.MAX_ENTRIES):
+        if threshold is None:
+            threshold = float(os.getenv(AnswerCacheConstants.THRESHOLD_ENV, AnswerCacheConstants.DEFAULT_THRESHOLD))
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Partition, str], CachedAnswer]" = OrderedDict()
+        # Partition başına (anahtarlar, matris); ekleme/silmede yeniden kurulur
+        self._matrices: Dict[Partition, Tuple[list, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _unit(vec: np.ndarray) -> np.ndarray:
+        vec = np.asarray(vec, dtype=np.float32)
+        return vec / (float(np.linalg.norm(vec)) + 1e-8)
+
+    def get(self, vec: np.ndarray, lang: str, cv_version: str) -> Optional[Tuple[CachedAnswer, float]]:
+        """Best cached answer with similarity >= threshold, or None"""
+        partition = (lang, cv_version)
+        q = self._unit(vec)
+        now = time.time()
+        with self._lock:
+            keys, matrix = self._matrix_locked(partition)
+            if matrix is None or matrix.shape[1] != q.shape[0]:
+                return None
+            sims = matrix @ q
+            candidates = np.flatnonzero(sims >= self.threshold)
+            expired = []
+            hit = None
+            # Eşik üstündekiler skor sırasıyla: süresi dolmuş en iyi eşleşme taze olanı gizlemesin
+            for i in candidates[np.argsort(-sims[candidates], kind="stable")]:
+                entry = self._entries.get(keys[i])
+                if entry is None:
+                    continue
+                if now - entry.created_at > self.ttl:
+                    expired.append(keys[i])
+                    continue
+                hit = keys[i], entry, float(sims[i])
+                break
+            for key in expired:
+                self._remove_locked(key)
+            if hit is None:
+                return None
+            key, entry, score = hit
+            self._entries.move_to_end(key)
+            return entry, score
+
+    def put(self, vec: np.ndarray, lang: str, cv_version: str, question: str, reply: str) -> None:
+        partition = (lang, cv_version)
+        key = (partition, " ".join(question.casefold().split()))
+        with self._lock:
+            self._entries[key] = CachedAnswer(question, reply, self._unit(vec), time.time())
+            self._entries.move_to_end(key)
+            self._matrices.pop(partition, None)
+            self._evict_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def _matrix_locked(self, partition: Partition) -> Tuple[list, Optional[np.ndarray]]:
+        cached = self._matrices.get(partition)
+        if cached is None:
+            keys = [k for k in self._entries if k[0] == partition]
+            matrix = np.vstack([self._entries[k].vector for k in keys]) if keys else None
+            cached = self._matrices[partition] = (keys, matrix)
+        return cached
+
+    def _remove_locked(self, key: Tuple[Partition, str]) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._matrices.pop(key[0], None)
+
+    def _evict_locked(self) -> None:
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if now - e.created_at > self.ttl]:
+            self._remove_locked(key)
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self._matrices.pop(key[0], None)
@@ -0,0 +1,233 @@
+import hashlib
+import os
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from tools.prompt_builder import PromptBudgetConstants
+
+
+class ChunkingConstants:
+    """Constants for turning a CV into retrieval chunks"""
+    WINDOW_ENV = "CHUNK_WINDOW_TOKENS"
+    OVERLAP_ENV = "CHUNK_OVERLAP_TOKENS"
+    DEFAULT_WINDOW_TOKENS = 160     # Uzun açıklamalar bu boyutta parçalara bölünür
+    DEFAULT_OVERLAP_TOKENS = 32
+    PERSONAL_FIELDS = ("name", "title", "location", "email", "phone")
+    # Section -> chunk başlığı (embedding'lerde ve prompt'ta görünen etiket)
+    LABELS = {
+        "personal": "Kişisel Bilgiler",
+        "profile": "Profil",
+        "education": "Eğitim",
+        "experience": "Deneyim",
+        "skills": "Yetenekler",
+        "projects": "Proje",
+        "links": "Linkler",
+        "awards": "Ödül",
+        "certifications": "Sertifikalar",
+        "languages": "Diller",
+        "volunteering": "Gönüllülük",
+        "medium_articles": "Medium Yazısı",
+        "references": "Referanslar",
+    }
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+    One retrieval unit: section + item it came from, its text and a stable hash.
+
+    hash depends only on the text, so re-indexing can reuse vectors of
+    unchanged chunks; part > 0 marks the later windows of a long item.
+    """
+    section: str
+    item_id: str
+    text: str
+    part: int = 0
+    hash: str = ""
+
+    def __post_init__(self):
+        if not self.hash:
+            object.__setattr__(self, "hash", hashlib.sha1(self.text.encode("utf-8")).hexdigest()[:16])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_SLUG_RE = re.compile(r"[^0-9a-zçğıöşü]+")
+
+
+def _slug(value: Any, fallback: int) -> str:
+    slug = _SLUG_RE.sub("-", str(value or "").casefold()).strip("-")
+    return slug[:48] or str(fallback)
+
+
+def _text(value: Any, lang: str = "tr") -> str:
+    """description/features gibi alanlar düz metin, liste ya da {tr, en} olabilir"""
+    if isinstance(value, dict):
+        value = value.get(lang) or next(iter(value.values()), "")
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_text(v, lang) for v in value if v)
+    return str(value or "").strip()
+
+
+def _windows(body: str, window_tokens: int, overlap_tokens: int) -> List[str]:
+    """Split body on word boundaries into ~window_tokens pieces overlapping by overlap_tokens"""
+    per_token = PromptBudgetConstants.CHARS_PER_TOKEN
+    window_chars = int(window_tokens * per_token)
+    if len(body) <= window_chars:
+        return [body]
+    overlap_chars = int(min(overlap_tokens, window_tokens // 2) * per_token)
+    words = body.split()
+    pieces: List[str] = []
+    start = 0
+    while start < len(words):
+        end, size = start, 0
+        while end < len(words) and (size + len(words[end]) + 1 <= window_chars or end == start):
+            size += len(words[end]) + 1
+            end += 1
+        pieces.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+        # Bir sonraki pencere, son overlap_chars kadarlık kelimelerle başlar
+        back, size = end, 0
+        while back > start + 1 and size + len(words[back - 1]) + 1 <= overlap_chars:
+            back -= 1
+            size += len(words[back]) + 1
+        start = back
+    return pieces
+
+
+class CVChunker:
+    """
+    Single CV -> chunk records builder shared by indexing (generate_embeddings)
+    and serving (rag_system / api_server).
+
+    Every section produces chunks (unknown ones through a generic formatter),
+    emitted section by section so each section is a contiguous row range of
+    the embedding matrix. Long bodies are split into overlapping windows,
+    each repeating the item header so it stands on its own.
+    """
+
+    def __init__(self, window_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None):
+        C = ChunkingConstants
+        self.window_tokens = window_tokens or int(os.getenv(C.WINDOW_ENV, C.DEFAULT_WINDOW_TOKENS))
+        self.overlap_tokens = overlap_tokens if overlap_tokens is not None else int(
+            os.getenv(C.OVERLAP_ENV, C.DEFAULT_OVERLAP_TOKENS))
+
+    def _emit(self, out: List[Chunk], section: str, item_id: str, header: str, body: str = "") -> None:
+        if not body:
+            out.append(Chunk(section, item_id, header))
+            return
+        head_tokens = int(len(header) / PromptBudgetConstants.CHARS_PER_TOKEN)
+        window = max(self.window_tokens - head_tokens, self.window_tokens // 2)
+        for part, piece in enumerate(_windows(body, window, self.overlap_tokens)):
+            out.append(Chunk(section, item_id, f"{header}{piece}", part))
+
+    def build(self, cv_json: Dict[str, Any]) -> List[Chunk]:
+        out: List[Chunk] = []
+        label = ChunkingConstants.LABELS
+        handled = set()
+        for section, content in cv_json.items():
+            if section in handled or content in (None, "", [], {}):
+                continue
+            handled.add(section)
+            if section in ChunkingConstants.PERSONAL_FIELDS:
+                if "personal" in handled:
+                    continue
+                handled.add("personal")
+                parts = [str(cv_json[f]) for f in ChunkingConstants.PERSONAL_FIELDS if cv_json.get(f)]
+                self._emit(out, "personal", "personal", f"{label['personal']}: " + " - ".join(parts))
+            elif section == "profile":
+                self._emit(out, section, section, f"{label[section]}: ", _text(content))
+            elif section == "education":
+                # Eğitim bilgilerini tek chunk'ta birleştir
+                items = "; ".join(f"{e.get('institution', '')} - {e.get('degree', '')} ({e.get('years', '')})"
+                                  for e in content if isinstance(e, dict))
+                self._emit(out, section, section, f"{label[section]}: {items}")
+            elif section == "experience":
+                for i, exp in enumerate(content):
+                    if not isinstance(exp, dict):
+                        continue
+                    header = (f"{label[section]}: {exp.get('title', '')} at {exp.get('company', '')} "
+                              f"({exp.get('duration', '')}) - ")
+                    self._emit(out, section, f"experience:{_slug(exp.get('company'), i)}-{i}",
+                               header, _text(exp.get("description")))
+            elif section == "skills" and isinstance(content, dict):
+                for category, skills in content.items():
+                    self._emit(out, section, f"skills:{_slug(category, 0)}",
+                               f"{label[section]} - {category}: {_text(skills)}")
+            elif section == "projects":
+                for i, proj in enumerate(content):
+                    if not isinstance(proj, dict):
+                        continue
+                    header = f"{label[section]}: {proj.get('name', '')} ({_text(proj.get('technology'))}) - "
+                    body = _text(proj.get("description"))
+                    features = _text(proj.get("features"))
+                    if features:
+                        body = f"{body} Özellikler: {features}"
+                    self._emit(out, section, f"projects:{_slug(proj.get('name'), i)}", header, body)
+            elif section == "links" and isinstance(content, dict):
+                self._emit(out, section, section,
+                           f"{label[section]}: " + " | ".join(f"{k}: {v}" for k, v in content.items()))
+            elif section in ("awards", "medium_articles"):
+                for i, item in enumerate(content):
+                    if isinstance(item, dict):
+                        name = item.get("name") or item.get("title") or ""
+                        extra = " / ".join(_text(item.get(k)) for k in ("organization", "platform") if item.get(k))
+                        header = f"{label[section]}: {name}" + (f" ({extra})" if extra else "") + " - "
+                        body = _text(item.get("description") or item.get("summary_tr") or item.get("summary"))
+                        self._emit(out, section, f"{section}:{_slug(name, i)}", header, body)
+                    else:
+                        self._emit(out, section, f"{section}:{i}", f"{label[section]}: {_text(item)}")
+            elif section == "references":
+                items = "; ".join(
+                    ", ".join(_text(r.get(k)) for k in ("name", "title", "organization") if r.get(k))
+                    if isinstance(r, dict) else _text(r)
+                    for r in content
+                )
+                self._emit(out, section, section, f"{label[section]}: {items}")
+            elif section == "languages" and isinstance(content, dict):
+                self._emit(out, section, section,
+                           f"{label[section]}: " + ", ".join(f"{k} ({v})" for k, v in content.items()))
+            else:
+                # certifications, volunteering ve bilinmeyen bölümler için genel yaklaşım
+                title = label.get(section, section)
+                if isinstance(content, dict):
+                    body = "; ".join(f"{k}: {_text(v)}" for k, v in content.items())
+                elif isinstance(content, list):
+                    body = "; ".join(_text(v) if not isinstance(v, dict) else
+                                     ", ".join(f"{k}: {_text(x)}" for k, x in v.items()) for v in content)
+                else:
+                    body = _text(content)
+                self._emit(out, section, section, f"{title}: ", body)
+        return out
+
+
+def build_chunks(cv_json: Dict[str, Any], window_tokens: Optional[int] = None,
+                 overlap_tokens: Optional[int] = None) -> List[Chunk]:
+    return CVChunker(window_tokens, overlap_tokens).build(cv_json)
+
+
+# Eski pickle'larda sadece metin var; section, metnin başlığından çıkarılır
+_LEGACY_PREFIXES = (
+    ("Kişisel Bilgiler", "personal"), ("Profil", "profile"), ("Eğitim", "education"),
+    ("Deneyim", "experience"), ("Yetenekler", "skills"), ("Proje", "projects"), ("Linkler", "links"),
+)
+
+
+def infer_section(text: str) -> str:
+    for prefix, section in _LEGACY_PREFIXES:
+        if text.startswith(prefix):
+            return section
+    head = text.split(":", 1)[0].strip()
+    return head if head in ChunkingConstants.LABELS else "other"
+
+
+def section_order(sections: Iterable[str]) -> List[int]:
+    """Stable row order that makes every section a contiguous block"""
+    first: Dict[str, int] = {}
+    sections = list(sections)
+    for i, s in enumerate(sections):
+        first.setdefault(s, i)
+    return sorted(range(len(sections)), key=lambda i: (first[sections[i]], i))
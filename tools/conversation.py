@@ -0,0 +1,274 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from tools.metrics import registry
+from tools.prompt_builder import truncate_to_tokens
+
+
+class ConversationConstants:
+    """Constants for server-side conversation state"""
+    KEEP_VERBATIM = 6               # Prompt'a aynen giren son mesaj sayısı
+    SUMMARIZE_BATCH = 4             # Bu kadar mesaj pencereden taşınca özete katlanır
+    MAX_PENDING_TURNS = 40          # Özetleme sürekli başarısız olursa üst sınır
+    SUMMARY_MAX_TOKENS = 250
+    SESSION_TTL_SECONDS = 6 * 60 * 60
+    MAX_SESSIONS = 2000
+    SUMMARY_WORKERS = 2
+    DB_ENV = "CHAT_SESSION_DB"      # Ayarlanırsa oturumlar SQLite'ta da tutulur (restart'a dayanıklı)
+
+
+SUMMARY_UPDATES = registry.counter(
+    "conversation_summary_updates_total", "Rolling summary updates by outcome.", ("outcome",))
+ACTIVE_SESSIONS = registry.gauge(
+    "conversation_sessions", "Conversation sessions held in memory.")
+TURNS_DROPPED = registry.counter(
+    "conversation_turns_dropped_total", "Messages dropped by the pending-turn cap without being summarized.")
+SESSION_LOOKUPS = registry.counter(
+    "conversation_session_lookups_total", "Session lookups by where they were found.", ("result",))
+
+Turn = Tuple[str, str]   # (role, content)
+Summarizer = Callable[[str, List[Turn], str], Optional[str]]
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+@dataclass
+class ConversationSession:
+    session_id: str
+    lang: str = "tr"
+    summary: str = ""
+    turns: List[Turn] = field(default_factory=list)     # Henüz özete katlanmamış mesajlar
+    summarized_turns: int = 0
+    trimmed_turns: int = 0          # MAX_PENDING_TURNS kırpmasıyla baştan silinen mesajlar (bellekte)
+    updated_at: float = field(default_factory=time.time)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    summarizing: bool = False
+
+    def snapshot(self) -> Tuple[str, List[Turn]]:
+        """(summary, last KEEP_VERBATIM turns) for prompt assembly"""
+        with self.lock:
+            return self.summary, list(self.turns[-ConversationConstants.KEEP_VERBATIM:])
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.turns and not self.summary
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id        TEXT PRIMARY KEY,
+    lang              TEXT NOT NULL,
+    summary           TEXT NOT NULL DEFAULT '',
+    turns             TEXT NOT NULL DEFAULT '[]',
+    summarized_turns  INTEGER NOT NULL DEFAULT 0,
+    updated_at        REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+"""
+
+
+class SQLiteSessionBackend:
+    """
+    Write-through persistence for ConversationStore.
+
+    One row per session holding the summary and the pending turns (at most
+    MAX_PENDING_TURNS), so a save is a single small upsert. Memory stays the
+    primary store; the database is only read on an in-memory miss.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> Optional["SQLiteSessionBackend"]:
+        path = os.getenv(ConversationConstants.DB_ENV)
+        return cls(Path(path)) if path else None
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, session_id: str, max_age: float) -> Optional[ConversationSession]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT lang, summary, turns, summarized_turns, updated_at FROM sessions "
+                "WHERE session_id = ? AND updated_at >= ?",
+                (session_id, time.time() - max_age),
+            ).fetchone()
+        if row is None:
+            return None
+        lang, summary, turns, summarized, updated_at = row
+        return ConversationSession(session_id, lang=lang, summary=summary,
+                                   turns=[tuple(t) for t in json.loads(turns)],
+                                   summarized_turns=summarized, updated_at=updated_at)
+
+    def save(self, session: ConversationSession) -> None:
+        """Caller holds session.lock"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, lang, summary, turns, summarized_turns, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET "
+                "lang = excluded.lang, summary = excluded.summary, turns = excluded.turns, "
+                "summarized_turns = excluded.summarized_turns, updated_at = excluded.updated_at",
+                (session.session_id, session.lang, session.summary,
+                 json.dumps(session.turns, ensure_ascii=False), session.summarized_turns, session.updated_at),
+            )
+
+    def prune(self, max_age: float) -> int:
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - max_age,))
+            return cur.rowcount
+
+
+class ConversationStore:
+    """
+    In-memory conversation sessions with a rolling summary.
+
+    After each turn, once more than KEEP_VERBATIM + SUMMARIZE_BATCH messages
+    are pending, the oldest ones are folded into the summary on a background
+    thread; the prompt only ever carries the summary plus the last
+    KEEP_VERBATIM messages, so its size stays flat as the chat grows.
+
+    Memory is a bounded LRU with TTL; with a backend every change is also
+    written through, and sessions evicted from memory (or lost in a restart)
+    are reloaded from it on the next request.
+    """
+
+    def __init__(self, summarizer: Summarizer,
+                 ttl: float = ConversationConstants.SESSION_TTL_SECONDS,
+                 max_sessions: int = ConversationConstants.MAX_SESSIONS,
+                 backend: Optional[SQLiteSessionBackend] = None):
+        self._summarize = summarizer
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.backend = backend
+        if backend is not None:
+            backend.prune(ttl)
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=ConversationConstants.SUMMARY_WORKERS,
+                                            thread_name_prefix="chat-summary")
+
+    def get_or_create(self, session_id: Optional[str], lang: str = "tr") -> ConversationSession:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and now - session.updated_at > self.ttl:
+                del self._sessions[session_id]
+                session = None
+            if session is not None:
+                self._sessions.move_to_end(session.session_id)
+                SESSION_LOOKUPS.labels("memory").inc()
+                return session
+
+        # Bellekte yok: SQLite okuması store kilidi dışında yapılır
+        loaded = self.backend.load(session_id, self.ttl) if self.backend is not None and session_id else None
+        SESSION_LOOKUPS.labels("backend" if loaded is not None else "new").inc()
+        with self._lock:
+            # Bu arada aynı oturum başka bir istekle eklenmiş olabilir
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = loaded or ConversationSession(session_id or new_session_id(), lang=lang)
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            ACTIVE_SESSIONS.set(len(self._sessions))
+        if loaded is session:
+            self._maybe_summarize(session)
+        return session
+
+    def seed(self, session: ConversationSession, history: List[Turn]) -> None:
+        """Adopt client-sent history for a session the server does not know (yet)"""
+        with session.lock:
+            if not session.is_empty or not history:
+                return
+            session.turns = list(history)
+            self._persist_locked(session)
+        self._maybe_summarize(session)
+
+    def append(self, session: ConversationSession, user_msg: str, reply: str) -> None:
+        with session.lock:
+            session.turns.extend([("user", user_msg), ("assistant", reply)])
+            session.updated_at = time.time()
+            overflow = len(session.turns) - ConversationConstants.MAX_PENDING_TURNS
+            if overflow > 0:
+                del session.turns[:overflow]
+                session.trimmed_turns += overflow
+                if not session.summarizing:
+                    # Özetleme sürüyorsa hesap _fold'da: kırpılanlar katlanan mesajlar olabilir
+                    self._count_dropped(session, overflow)
+            self._persist_locked(session)
+        self._maybe_summarize(session)
+
+    def _persist_locked(self, session: ConversationSession) -> None:
+        if self.backend is None:
+            return
+        try:
+            self.backend.save(session)
+        except sqlite3.Error as e:
+            # Kalıcılık en iyi çaba; sohbet bellekteki durumla devam eder
+            print(f"Conversation session save failed: {e}")
+
+    def _maybe_summarize(self, session: ConversationSession) -> None:
+        C = ConversationConstants
+        with session.lock:
+            if session.summarizing or len(session.turns) <= C.KEEP_VERBATIM + C.SUMMARIZE_BATCH:
+                return
+            session.summarizing = True
+            fold = list(session.turns[:len(session.turns) - C.KEEP_VERBATIM])
+            previous = session.summary
+            trimmed_before = session.trimmed_turns
+        self._executor.submit(self._fold, session, previous, fold, trimmed_before)
+
+    @staticmethod
+    def _count_dropped(session: ConversationSession, count: int) -> None:
+        TURNS_DROPPED.inc(count)
+        print(f"Conversation {session.session_id[:8]}: {count} messages dropped before summarization")
+
+    def _fold(self, session: ConversationSession, previous: str, fold: List[Turn], trimmed_before: int) -> None:
+        try:
+            summary = self._summarize(previous, fold, session.lang)
+        except Exception as e:
+            print(f"Conversation summary failed: {e}")
+            summary = None
+        with session.lock:
+            session.summarizing = False
+            # Özetleme sürerken kırpılan mesajlar listenin başından gitti: önce fold'un başı
+            trimmed = session.trimmed_turns - trimmed_before
+            if not summary:
+                SUMMARY_UPDATES.labels("error").inc()
+                if trimmed:
+                    self._count_dropped(session, trimmed)
+                return
+            n = len(fold)
+            del session.turns[:max(0, n - trimmed)]
+            if trimmed > n:
+                # fold'dan sonra gelen mesajlar da kırpılmış; özete hiç girmediler
+                self._count_dropped(session, trimmed - n)
+            session.summary = truncate_to_tokens(summary.strip(), ConversationConstants.SUMMARY_MAX_TOKENS)
+            session.summarized_turns += n
+            self._persist_locked(session)
+        SUMMARY_UPDATES.labels("ok").inc()
+        # Özetleme sürerken yeni mesajlar birikmiş olabilir
+        self._maybe_summarize(session)
@@ -0,0 +1,376 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from tools.chunking import infer_section, section_order
+from tools.metrics import registry
+from tools.project_matcher import ProjectMatcher
+from tools.prompt_builder import estimate_tokens
+from tools.quantize import QuantizationConstants, QuantizedMatrix, quantization_mode
+
+
+class CVIndexConstants:
+    """Constants for CV / embedding index loading and hot reload"""
+    POLL_ENV = "CV_INDEX_POLL_SECONDS"
+    DEFAULT_POLL_SECONDS = 5.0      # 0 = izleme kapalı
+    # Dosya yazılırken yarım okumamak için: değişiklik bu kadar süre sabit kalmalı
+    SETTLE_SECONDS = 1.0
+
+
+INDEX_RELOADS = registry.counter(
+    "cv_index_reloads_total", "CV / embedding index reloads by outcome.", ("outcome",))
+INDEX_CHUNKS = registry.gauge(
+    "cv_index_chunks", "Chunks in the active CV index.")
+INDEX_LOADED_AT = registry.gauge(
+    "cv_index_loaded_timestamp_seconds", "Unix time the active CV index was built.")
+INDEX_VECTOR_BYTES = registry.gauge(
+    "cv_index_vector_bytes", "Heap held by the active index's search matrix.", ("storage",))
+
+FileStamp = Optional[Tuple[float, int]]   # (mtime, size); dosya yoksa None
+
+
+def _stamp(path: Path) -> FileStamp:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def index_version(cv: Dict[str, Any], data: Optional["EmbeddingData"]) -> str:
+    """
+    Content hash of what answers depend on: the CV json plus, when present,
+    the chunk texts, the manifest and the vector norms. Regenerating only the
+    embeddings therefore changes the version (answer cache partition and
+    single-flight keys), while re-saving identical files does not.
+    """
+    h = hashlib.sha1(json.dumps(cv, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    if data is not None:
+        h.update(json.dumps(data.manifest, sort_keys=True).encode("utf-8"))
+        for chunk in data.chunks:
+            h.update(chunk.encode("utf-8"))
+            h.update(b"\0")
+        # Norm vektörü N float: tüm matrisi okumadan vektör değişikliğini yakalar
+        h.update(np.ascontiguousarray(data.norms, dtype=np.float32).tobytes())
+    return h.hexdigest()[:12]
+
+
+def load_cv(cv_path: Path) -> Dict[str, Any]:
+    with open(cv_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class EmbeddingData(NamedTuple):
+    chunks: List[str]
+    emb: np.ndarray
+    norms: np.ndarray
+    token_counts: List[int]
+    sections: List[str]
+    manifest: Dict[str, Any]
+
+
+# manifest'i olmayan eski pickle'lar Gemini embedding-001 ile üretildi
+LEGACY_MANIFEST = {"provider": "gemini", "model": "models/embedding-001"}
+
+
+def load_embeddings(embeddings_path: Path) -> EmbeddingData:
+    """
+    embeddings_data.pkl (generate_embeddings.py ile üretilen) formatı:
+      {
+        'chunks': [str, ...],
+        'embeddings': np.ndarray (N x 768),
+        'cv_json': {...},
+        'token_counts': [int, ...],   # eski dosyalarda yoksa burada hesaplanır
+        'records': [{'section', 'item_id', 'text', 'part', 'hash'}, ...],   # eski dosyalarda yok
+        'manifest': {'provider', 'model', 'dim', ...},   # eski dosyalarda yok
+        ...
+      }
+    Rows are reordered so that every section is one contiguous block.
+    """
+    with open(embeddings_path, "rb") as f:
+        data = pickle.load(f)
+
+    chunks = list(data.get("chunks") or [])
+    emb = np.asarray(data.get("embeddings"))
+    if emb.ndim != 2:
+        raise RuntimeError("embeddings_data.pkl beklenmeyen formatta (embeddings 2D değil).")
+    if emb.shape[0] != len(chunks):
+        raise RuntimeError("embeddings_data.pkl beklenmeyen formatta (chunk / embedding sayısı farklı).")
+    token_counts = data.get("token_counts")
+    if not token_counts or len(token_counts) != len(chunks):
+        token_counts = [estimate_tokens(c) for c in chunks]
+    records = data.get("records")
+    if records and len(records) == len(chunks):
+        sections = [r.get("section") or infer_section(c) for r, c in zip(records, chunks)]
+    else:
+        sections = [infer_section(c) for c in chunks]
+
+    order = section_order(sections)
+    if order != list(range(len(order))):
+        chunks = [chunks[i] for i in order]
+        token_counts = [token_counts[i] for i in order]
+        sections = [sections[i] for i in order]
+        emb = emb[order]
+    emb = emb.astype(np.float32, copy=False)
+    norms = (np.linalg.norm(emb, axis=1) + 1e-8).astype(np.float32, copy=False)
+    manifest = dict(data.get("manifest") or LEGACY_MANIFEST)
+    return EmbeddingData(chunks, emb, norms, list(token_counts), sections, manifest)
+
+
+def _sidecar_paths(embeddings_path: Path) -> Tuple[Path, Path]:
+    return embeddings_path.with_suffix(".vectors.npy"), embeddings_path.with_suffix(".chunks.json")
+
+
+def _write_atomic(path: Path, write: Callable[[Any], Any]) -> None:
+    """
+    Write through a uniquely named temp file in the same directory, then
+    rename over path. Several workers may build the same sidecar at once;
+    each writes its own temp file and the last rename wins with a complete file.
+    """
+    tmp = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False)
+    try:
+        with tmp:
+            write(tmp)
+        os.replace(tmp.name, path)
+    except BaseException:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+
+
+def load_embeddings_mmap(embeddings_path: Path) -> EmbeddingData:
+    """
+    Same as load_embeddings, but the matrix is memory-mapped from a .npy sidecar.
+
+    The pickle is unpickled once to write the sidecars (vectors .npy + chunks
+    json); after that only the small json is parsed and the vectors stay in
+    the page cache, shared between workers and evictable by the OS.
+    """
+    npy_path, meta_path = _sidecar_paths(embeddings_path)
+    src_mtime = embeddings_path.stat().st_mtime
+    fresh = all(p.exists() and p.stat().st_mtime >= src_mtime for p in (npy_path, meta_path))
+    meta = json.loads(meta_path.read_text(encoding="utf-8")) if fresh else {}
+    if "manifest" not in meta:
+        data = load_embeddings(embeddings_path)
+        meta = {"chunks": data.chunks, "token_counts": data.token_counts,
+                "sections": data.sections, "norms": data.norms.tolist(), "manifest": data.manifest}
+        try:
+            _write_atomic(npy_path, lambda f: np.save(f, np.ascontiguousarray(data.emb, dtype=np.float32)))
+            _write_atomic(meta_path, lambda f: f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8")))
+        except OSError as e:
+            # Salt okunur dizin: mmap'siz devam
+            print(f"Embedding sidecar could not be written ({e}); loading {embeddings_path.name} into memory")
+            return data
+
+    emb = np.load(npy_path, mmap_mode="r")
+    chunks = meta["chunks"]
+    if emb.ndim != 2 or emb.shape[0] != len(chunks):
+        raise RuntimeError(f"{npy_path.name} beklenmeyen formatta (chunk / embedding sayısı farklı).")
+    return EmbeddingData(chunks, emb, np.asarray(meta["norms"], dtype=np.float32),
+                         list(meta["token_counts"]), list(meta["sections"]), dict(meta["manifest"]))
+
+
+@dataclass(frozen=True)
+class CVIndex:
+    """
+    Immutable snapshot of everything retrieval needs.
+
+    A request grabs the current snapshot once and uses only that object, so
+    a reload swapping in a new one never mixes old chunks with new vectors.
+    """
+    cv_json: Dict[str, Any]
+    version: str
+    matcher: ProjectMatcher
+    chunks: List[str] = field(default_factory=list)
+    emb: Optional[np.ndarray] = None
+    emb_norms: Optional[np.ndarray] = None
+    chunk_tokens: List[int] = field(default_factory=list)
+    sections: List[str] = field(default_factory=list)
+    # section -> (başlangıç, bitiş) satır aralığı; filtreli arama sadece bu dilimi tarar
+    section_ranges: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    # Vektörleri üreten embedding sağlayıcısı; sorgular aynı sağlayıcıyla gömülür
+    manifest: Dict[str, Any] = field(default_factory=lambda: dict(LEGACY_MANIFEST))
+    # Aday araması için int8 / float16 kopya; varsa emb float32 mmap'tir ve sadece adaylar için okunur
+    quantized: Optional[QuantizedMatrix] = None
+    loaded_at: float = field(default_factory=time.time)
+    stamps: Tuple[FileStamp, FileStamp] = (None, None)
+    # Yaklaşık heap (mmap'li matris sayılmaz); snapshot kurulurken bir kez ölçülür,
+    # tenant LRU'su her yüklemede CV'yi yeniden serialize etmesin
+    resident_bytes: int = field(default=0, init=False, compare=False)
+
+    def __post_init__(self):
+        size = sum(len(c) for c in self.chunks) * 2 + len(json.dumps(self.cv_json, ensure_ascii=False))
+        object.__setattr__(self, "resident_bytes", size + self.vector_bytes)
+
+    @property
+    def has_vectors(self) -> bool:
+        return self.emb is not None and self.emb_norms is not None and bool(self.chunks)
+
+    @property
+    def embedding_id(self) -> str:
+        return f"{self.manifest.get('provider')}:{self.manifest.get('model')}"
+
+    @property
+    def storage(self) -> str:
+        return self.quantized.mode if self.quantized is not None else "float32"
+
+    @property
+    def vector_bytes(self) -> int:
+        """Heap held by the search matrix (mmap'li float32 sayılmaz)"""
+        size = self.quantized.nbytes if self.quantized is not None else 0
+        if self.emb is not None and not isinstance(self.emb, np.memmap):
+            size += self.emb.nbytes
+        if self.emb_norms is not None:
+            size += self.emb_norms.nbytes
+        return size
+
+    @classmethod
+    def load(cls, cv_path: Path, embeddings_path: Path, mmap: bool = False,
+             quantization: Optional[str] = None) -> "CVIndex":
+        """
+        quantization (EMBEDDING_QUANTIZATION, default auto = int8 only for large
+        indexes) keeps only a compact copy in memory for candidate search; the
+        float32 matrix is then always memory-mapped from the .npy sidecar for
+        exact rescoring.
+        """
+        stamps = (_stamp(cv_path), _stamp(embeddings_path))
+        cv = load_cv(cv_path) if stamps[0] else {}
+        if not stamps[1]:
+            return cls(cv_json=cv, version=index_version(cv, None), matcher=ProjectMatcher.from_cv(cv), stamps=stamps)
+        # Pickle boyutu float32 matrisin üst sınırı sayılır (metin + ek alanlar küçük)
+        mode = quantization_mode(quantization, stamps[1][1])
+        quantize = mode != QuantizationConstants.NONE
+        data = (load_embeddings_mmap if mmap or quantize else load_embeddings)(embeddings_path)
+        quantized = None
+        if quantize:
+            if isinstance(data.emb, np.memmap):
+                quantized = QuantizedMatrix.from_matrix(data.emb, mode)
+            else:
+                # Sidecar yazılamadı: float32 zaten bellekte, ikinci bir kopya tutmanın anlamı yok
+                print(f"{embeddings_path.name}: float32 sidecar unavailable, skipping {mode} quantization")
+        if data.emb.flags.writeable:
+            data.emb.setflags(write=False)
+        data.norms.setflags(write=False)
+        ranges: Dict[str, Tuple[int, int]] = {}
+        for row, section in enumerate(data.sections):
+            start, _ = ranges.get(section, (row, row))
+            ranges[section] = (start, row + 1)
+        return cls(cv_json=cv, version=index_version(cv, data), matcher=ProjectMatcher.from_cv(cv),
+                   chunks=data.chunks, emb=data.emb, emb_norms=data.norms, chunk_tokens=data.token_counts,
+                   sections=data.sections, section_ranges=ranges, manifest=data.manifest,
+                   quantized=quantized, stamps=stamps)
+
+    def section_rows(self, sections: List[str]) -> List[Tuple[int, int]]:
+        """Row ranges of the requested sections (unknown sections are ignored)"""
+        return sorted(self.section_ranges[s] for s in set(sections) if s in self.section_ranges)
+
+
+class CVIndexManager:
+    """
+    Holds the active CVIndex and swaps in a new one when the files change.
+
+    A daemon thread polls the mtime/size of the CV json and the embeddings
+    pickle (no inotify dependency; a stat every few seconds is free). A new
+    snapshot is built entirely off to the side and published with a single
+    attribute assignment; in-flight requests keep the snapshot they started
+    with. A broken file is logged and the old snapshot stays active.
+    """
+
+    def __init__(self, cv_path: Path, embeddings_path: Path, poll_seconds: Optional[float] = None,
+                 mmap: bool = False, publish_metrics: bool = True):
+        if poll_seconds is None:
+            poll_seconds = float(os.getenv(CVIndexConstants.POLL_ENV, CVIndexConstants.DEFAULT_POLL_SECONDS))
+        self.cv_path = Path(cv_path)
+        self.embeddings_path = Path(embeddings_path)
+        self.poll_seconds = poll_seconds
+        self.mmap = mmap
+        self.publish_metrics = publish_metrics
+        self.last_checked = time.monotonic()
+        self._listeners: List[Callable[[CVIndex, CVIndex], None]] = []
+        self._reload_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._failed_stamps: Optional[Tuple[FileStamp, FileStamp]] = None
+        self._published_storage: Optional[str] = None
+        self._current = CVIndex.load(self.cv_path, self.embeddings_path, mmap=mmap)
+        self._publish_metrics(self._current)
+
+    @property
+    def current(self) -> CVIndex:
+        return self._current
+
+    def on_swap(self, listener: Callable[[CVIndex, CVIndex], None]) -> None:
+        """listener(old, new) runs on the reloading thread after each swap"""
+        self._listeners.append(listener)
+
+    def _stamps(self) -> Tuple[FileStamp, FileStamp]:
+        return _stamp(self.cv_path), _stamp(self.embeddings_path)
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild and swap if the files changed (or force); True when swapped"""
+        with self._reload_lock:
+            self.last_checked = time.monotonic()
+            old = self._current
+            stamps = self._stamps()
+            if not force and stamps in (old.stamps, self._failed_stamps):
+                return False
+            start = time.perf_counter()
+            try:
+                new = CVIndex.load(self.cv_path, self.embeddings_path, mmap=self.mmap)
+            except Exception as e:
+                # Aynı bozuk dosya için her turda tekrar denenmez
+                self._failed_stamps = stamps
+                INDEX_RELOADS.labels("error").inc()
+                print(f"CV index reload failed, keeping version {old.version}: {e}")
+                return False
+            self._current = new
+            INDEX_RELOADS.labels("ok").inc()
+            self._publish_metrics(new)
+            print(f"CV index reloaded: {old.version} -> {new.version}, {len(new.chunks)} chunks "
+                  f"({(time.perf_counter() - start) * 1000:.0f}ms)")
+        for listener in self._listeners:
+            try:
+                listener(old, new)
+            except Exception as e:
+                print(f"CV index swap listener failed: {e}")
+        return True
+
+    def _publish_metrics(self, index: CVIndex) -> None:
+        # Tenant index'leri ayrı metriklenir; bu gauge'lar varsayılan index içindir
+        if not self.publish_metrics:
+            return
+        INDEX_CHUNKS.set(len(index.chunks))
+        INDEX_LOADED_AT.set(index.loaded_at)
+        if self._published_storage not in (None, index.storage):
+            # Depolama modu değişti (ör. float32 -> int8): eski etiket sabit değerle kalmasın
+            INDEX_VECTOR_BYTES.remove(self._published_storage)
+        INDEX_VECTOR_BYTES.labels(index.storage).set(index.vector_bytes)
+        self._published_storage = index.storage
+
+    def start(self) -> None:
+        if self.poll_seconds <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="cv-index-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            stamps = self._stamps()
+            if stamps in (self._current.stamps, self._failed_stamps):
+                continue
+            # Yazım bitsin: kısa bir süre sonra damga hâlâ aynıysa yükle
+            if self._stop.wait(CVIndexConstants.SETTLE_SECONDS) or self._stamps() != stamps:
+                continue
+            self.reload()
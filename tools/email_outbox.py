@@ -0,0 +1,256 @@
+import json
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from email.message import Message
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class OutboxConstants:
+    """Constants for the durable email outbox"""
+    DB_ENV = "EMAIL_OUTBOX_DB"
+    DEFAULT_DB = Path(__file__).resolve().parent.parent / ".email_outbox.sqlite3"
+    MAX_ATTEMPTS = 6
+    BACKOFF_BASE_SECONDS = 5
+    BACKOFF_MAX_SECONDS = 15 * 60
+    POLL_SECONDS = 5
+    SMTP_TIMEOUT = 20
+    # Sunucular boşta kalan bağlantıyı ~5 dk'da kapatır; öncesinde biz kapatalım
+    IDLE_DISCONNECT_SECONDS = 120
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at  REAL NOT NULL,
+    send_after  REAL NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    last_error  TEXT,
+    from_addr   TEXT NOT NULL,
+    to_addrs    TEXT NOT NULL,
+    message     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, send_after);
+"""
+
+
+class EmailOutbox:
+    """
+    Durable SQLite-backed queue of outgoing emails.
+
+    enqueue() only writes a row, so request handlers return immediately. A
+    background OutboxWorker delivers the rows over a reusable SMTP session.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or os.getenv(OutboxConstants.DB_ENV) or OutboxConstants.DEFAULT_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.wakeup = threading.Event()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Önceki process gönderim ortasında öldüyse satırları tekrar kuyruğa al
+            conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """One short-lived connection per operation (commit on success, always closed)"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, msg: Message, from_addr: str, to_addrs: List[str]) -> int:
+        """Persist a message for delivery and wake the worker"""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO outbox (created_at, send_after, from_addr, to_addrs, message) VALUES (?, ?, ?, ?, ?)",
+                (now, now, from_addr, json.dumps(to_addrs), msg.as_string()),
+            )
+            row_id = int(cur.lastrowid)
+        self.wakeup.set()
+        return row_id
+
+    def claim_due(self, limit: int = 10) -> List[sqlite3.Row]:
+        """Mark due pending rows as 'sending' and return them"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND send_after <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+            if rows:
+                conn.executemany("UPDATE outbox SET status = 'sending' WHERE id = ?", [(r["id"],) for r in rows])
+        return rows
+
+    def mark_sent(self, row_id: int) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET status = 'sent', last_error = NULL WHERE id = ?", (row_id,))
+
+    def mark_retry(self, row_id: int, attempts: int, error: str, permanent: bool = False) -> None:
+        """Reschedule with jittered exponential backoff, or give up (permanent error / MAX_ATTEMPTS)"""
+        if permanent or attempts >= OutboxConstants.MAX_ATTEMPTS:
+            status, send_after = "failed", time.time()
+        else:
+            delay = min(OutboxConstants.BACKOFF_MAX_SECONDS,
+                        OutboxConstants.BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)))
+            status, send_after = "pending", time.time() + random.uniform(delay / 2, delay)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, send_after = ? WHERE id = ?",
+                (status, attempts, error[:500], send_after, row_id),
+            )
+
+    def next_due_in(self) -> Optional[float]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT MIN(send_after) FROM outbox WHERE status = 'pending'").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+def is_permanent_failure(exc: BaseException) -> bool:
+    """
+    Errors that will not go away by retrying: refused recipients, rejected
+    credentials and any other 5xx reply. Connection problems and 4xx replies
+    are transient.
+    """
+    if isinstance(exc, (smtplib.SMTPRecipientsRefused, smtplib.SMTPAuthenticationError)):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and 500 <= exc.smtp_code < 600
+
+
+class OutboxWorker:
+    """
+    Background sender that keeps one authenticated SMTP session open.
+
+    The session is re-used across messages (checked with NOOP), re-opened when
+    the server drops it and closed after IDLE_DISCONNECT_SECONDS without work.
+    STARTTLS and login are skipped when disabled / no credentials are set, so
+    a local aiosmtpd-style debugging server can stand in for Gmail.
+    """
+
+    def __init__(self, outbox: EmailOutbox, host: str, port: int,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 use_starttls: bool = True):
+        self.outbox = outbox
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_starttls = use_starttls
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self.outbox.wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.process_due()
+            except Exception as e:  # worker asla ölmemeli
+                print(f"Email outbox worker error: {e}")
+            if self._smtp is not None and time.time() - self._last_used > OutboxConstants.IDLE_DISCONNECT_SECONDS:
+                self._disconnect()
+            due_in = self.outbox.next_due_in()
+            timeout = OutboxConstants.POLL_SECONDS if due_in is None else min(due_in, OutboxConstants.POLL_SECONDS)
+            self.outbox.wakeup.wait(timeout)
+            self.outbox.wakeup.clear()
+        self._disconnect()
+
+    def process_due(self) -> int:
+        """Deliver every due message; returns the number sent"""
+        sent = 0
+        while True:
+            rows = self.outbox.claim_due()
+            if not rows:
+                return sent
+            for row in rows:
+                try:
+                    self._send(row["from_addr"], json.loads(row["to_addrs"]), row["message"])
+                    self.outbox.mark_sent(row["id"])
+                    sent += 1
+                except Exception as e:
+                    self._disconnect()
+                    permanent = is_permanent_failure(e)
+                    if permanent:
+                        print(f"Email {row['id']} failed permanently: {type(e).__name__}: {e}")
+                    self.outbox.mark_retry(row["id"], row["attempts"] + 1, f"{type(e).__name__}: {e}", permanent)
+
+    def _send(self, from_addr: str, to_addrs: List[str], message: str) -> None:
+        smtp = self._session()
+        try:
+            smtp.sendmail(from_addr, to_addrs, message.encode("utf-8"))
+        except smtplib.SMTPServerDisconnected:
+            # Bağlantı arada düşmüş: bir kez yeniden bağlanıp dene
+            self._disconnect()
+            self._session().sendmail(from_addr, to_addrs, message.encode("utf-8"))
+        self._last_used = time.time()
+
+    def _session(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self._disconnect()
+
+        smtp = smtplib.SMTP(self.host, self.port, timeout=OutboxConstants.SMTP_TIMEOUT)
+        try:
+            if self.use_starttls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self._last_used = time.time()
+        return smtp
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+
+_outbox_worker: Optional[OutboxWorker] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox_worker(**smtp_settings: Any) -> OutboxWorker:
+    """Return the process-wide outbox worker, starting it on first use"""
+    global _outbox_worker
+    with _outbox_lock:
+        if _outbox_worker is None:
+            _outbox_worker = OutboxWorker(EmailOutbox(), **smtp_settings)
+        _outbox_worker.start()
+        return _outbox_worker
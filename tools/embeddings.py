@@ -0,0 +1,208 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from tools.gemini_client import GeminiConstants, GeminiError, get_gemini_client
+from tools.metrics import MetricsConstants, registry
+
+try:  # Opsiyonel: yerel embedding sadece sentence-transformers kuruluysa
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # pragma: no cover
+    SentenceTransformer = None
+
+
+class EmbeddingConstants:
+    """Constants for embedding providers"""
+    PROVIDER_ENV = "EMBEDDING_PROVIDER"         # generate_embeddings varsayılanı: gemini | local
+    GEMINI = "gemini"
+    LOCAL = "local"
+    LOCAL_MODEL_ENV = "LOCAL_EMBEDDING_MODEL"
+    # 384 boyutlu, Türkçe dahil 50+ dil; CPU'da kısa bir soru ~5-15 ms
+    DEFAULT_LOCAL_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    LOCAL_BACKEND_ENV = "LOCAL_EMBEDDING_BACKEND"   # torch | onnx | onnx-int8
+    DEFAULT_LOCAL_BACKEND = "onnx-int8"
+    ONNX_INT8_FILE_ENV = "LOCAL_EMBEDDING_ONNX_FILE"
+    DEFAULT_ONNX_INT8_FILE = "onnx/model_qint8_avx2.onnx"
+    BATCH_SIZE = 32
+    GEMINI_TIMEOUT = 10
+
+
+EMBED_LATENCY = registry.histogram(
+    "embedding_latency_seconds", "Embedding call latency by provider.", ("provider",),
+    buckets=MetricsConstants.FAST_BUCKETS)
+
+
+class EmbeddingError(RuntimeError):
+    """Raised when a provider cannot produce an embedding"""
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns text into vectors. The index manifest records name + model, and the
+    server embeds queries with the provider that built the index, so query and
+    chunk vectors always live in the same space.
+    """
+    name = ""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
+
+    @abstractmethod
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), dim) float32; raises EmbeddingError"""
+
+    def manifest(self) -> Dict[str, Any]:
+        return {"provider": self.name, "model": self.model}
+
+    def warm(self) -> None:
+        """Load whatever is needed before the first request"""
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    name = EmbeddingConstants.GEMINI
+
+    def __init__(self, model: str = GeminiConstants.EMBEDDING_MODEL):
+        super().__init__(model)
+
+    @property
+    def available(self) -> bool:
+        return bool(get_gemini_client().api_key)
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        client = get_gemini_client()
+        vectors = []
+        for text in texts:
+            start = time.perf_counter()
+            try:
+                vectors.append(client.embed(text, model=self.model, timeout=EmbeddingConstants.GEMINI_TIMEOUT))
+            except GeminiError as e:
+                raise EmbeddingError(str(e)) from e
+            EMBED_LATENCY.labels(self.name).observe(time.perf_counter() - start)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    CPU sentence-transformers model, optionally through ONNX Runtime with the
+    int8 dynamically quantized export. The model is loaded once per process
+    (warm() starts it in the background at server startup); if the requested
+    backend cannot load, it falls back to plain torch. A model that cannot be
+    loaded at all is remembered: available turns False and later calls fail
+    fast with the original error instead of retrying the load per request.
+    """
+    name = EmbeddingConstants.LOCAL
+
+    def __init__(self, model: Optional[str] = None, backend: Optional[str] = None):
+        C = EmbeddingConstants
+        super().__init__(model or os.getenv(C.LOCAL_MODEL_ENV, C.DEFAULT_LOCAL_MODEL))
+        self.backend = backend or os.getenv(C.LOCAL_BACKEND_ENV, C.DEFAULT_LOCAL_BACKEND)
+        self._model = None
+        self._load_error: Optional[str] = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return SentenceTransformer is not None and self._load_error is None
+
+    def _load(self):
+        with self._load_lock:
+            if self._model is not None:
+                return self._model
+            if self._load_error is not None:
+                raise EmbeddingError(self._load_error)
+            if SentenceTransformer is None:
+                raise EmbeddingError("sentence-transformers kurulu değil (pip install sentence-transformers)")
+            start = time.perf_counter()
+            kwargs: Dict[str, Any] = {"device": "cpu"}
+            if self.backend == "onnx":
+                kwargs["backend"] = "onnx"
+            elif self.backend == "onnx-int8":
+                kwargs["backend"] = "onnx"
+                kwargs["model_kwargs"] = {"file_name": os.getenv(EmbeddingConstants.ONNX_INT8_FILE_ENV,
+                                                                 EmbeddingConstants.DEFAULT_ONNX_INT8_FILE)}
+            try:
+                model = SentenceTransformer(self.model, **kwargs)
+            except Exception as e:
+                if "backend" not in kwargs:
+                    raise self._fail(e) from e
+                # onnxruntime / optimum yok ya da modelde int8 export yok: torch ile devam
+                print(f"Local embedding backend '{self.backend}' unavailable ({e}); falling back to torch")
+                self.backend = "torch"
+                try:
+                    model = SentenceTransformer(self.model, device="cpu")
+                except Exception as e2:
+                    raise self._fail(e2) from e2
+            self._model = model
+            print(f"Local embedding model '{self.model}' ({self.backend}) loaded "
+                  f"({time.perf_counter() - start:.1f}s)")
+            return model
+
+    def _fail(self, error: Exception) -> EmbeddingError:
+        """Remember a failed load (caller holds _load_lock)"""
+        self._load_error = f"{self.model} yüklenemedi: {error}"
+        print(f"Local embedding model unavailable: {self._load_error}")
+        return EmbeddingError(self._load_error)
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        model = self._model or self._load()
+        start = time.perf_counter()
+        try:
+            vectors = model.encode(list(texts), batch_size=EmbeddingConstants.BATCH_SIZE,
+                                   normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False)
+        except Exception as e:
+            raise EmbeddingError(f"{self.model} encode failed: {e}") from e
+        EMBED_LATENCY.labels(self.name).observe(time.perf_counter() - start)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def manifest(self) -> Dict[str, Any]:
+        return {**super().manifest(), "backend": self.backend}
+
+    def warm(self) -> None:
+        if not self.available:
+            return
+
+        def _run():
+            try:
+                self.embed("ısınma")
+            except Exception as e:
+                print(f"Local embedding warm-up failed: {e}")
+
+        threading.Thread(target=_run, name="embedding-warmup", daemon=True).start()
+
+
+_providers: Dict[tuple, EmbeddingProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_embedding_provider(name: Optional[str] = None, model: Optional[str] = None) -> EmbeddingProvider:
+    """Process-wide provider for (name, model); model=None means the provider default"""
+    name = name or os.getenv(EmbeddingConstants.PROVIDER_ENV, EmbeddingConstants.GEMINI)
+    key = (name, model)
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            if name == EmbeddingConstants.LOCAL:
+                provider = LocalEmbeddingProvider(model)
+            elif name == EmbeddingConstants.GEMINI:
+                provider = GeminiEmbeddingProvider(model or GeminiConstants.EMBEDDING_MODEL)
+            else:
+                raise ValueError(f"Unknown embedding provider: {name}")
+            _providers[key] = provider
+        return provider
+
+
+def provider_for_manifest(manifest: Optional[Dict[str, Any]]) -> EmbeddingProvider:
+    """Provider that built an index; indexes without a manifest are Gemini embedding-001"""
+    manifest = manifest or {}
+    return get_embedding_provider(manifest.get("provider") or EmbeddingConstants.GEMINI, manifest.get("model"))
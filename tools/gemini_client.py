@@ -0,0 +1,220 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tools.metrics import GEMINI_LATENCY, GEMINI_REQUESTS, GEMINI_RETRIES, GEMINI_TOKENS
+
+
+class GeminiConstants:
+    """Defaults for the shared Gemini REST client"""
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+    BASE_URL_ENV = "GEMINI_API_BASE"          # Yerel sahte sunucu için override
+    DEFAULT_MODEL = "gemini-2.5-flash"
+    EMBEDDING_MODEL = "models/embedding-001"
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUT = 60
+    MAX_RETRIES = 3
+    BACKOFF_BASE_SECONDS = 0.5
+    BACKOFF_MAX_SECONDS = 8.0
+    MAX_CONCURRENCY = 8
+    POOL_SIZE = 16
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    # Okuma timeout'unda tekrar denenmez: istek sunucuya ulaşmış, üretim sürüyor
+    # (ve token faturalanmış) olabilir; tekrar sadece bekleme süresini katlar
+    NO_READ_TIMEOUT_RETRY = frozenset({"generateContent"})
+
+
+class GeminiError(RuntimeError):
+    """Raised when a Gemini call fails after retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _resolve_api_key() -> Optional[str]:
+    key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    return key.strip() if key else None
+
+
+class GeminiClient:
+    """
+    One pooled client for every Gemini call path.
+
+    - keep-alive connection pool (requests.Session + HTTPAdapter)
+    - per-call (connect, read) timeouts; the read timeout is one deadline for
+      the whole call, retries and backoff included
+    - jittered exponential retry on 429 / 5xx / connection errors, honouring
+      Retry-After (read timeouts are not retried for generateContent)
+    - a semaphore that caps concurrent upstream calls
+
+    The transport is pluggable: pass any requests.Session-compatible object
+    and/or a base_url (or set GEMINI_API_BASE) to drive it against a local
+    fake Gemini server in tests and benchmarks.
+    """
+
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 session: Optional[requests.Session] = None,
+                 max_retries: int = GeminiConstants.MAX_RETRIES,
+                 max_concurrency: int = GeminiConstants.MAX_CONCURRENCY,
+                 timeout: float = GeminiConstants.READ_TIMEOUT):
+        self._api_key = api_key
+        self.base_url = (base_url or os.getenv(GeminiConstants.BASE_URL_ENV) or GeminiConstants.BASE_URL).rstrip("/")
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._limiter = threading.BoundedSemaphore(max_concurrency)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=GeminiConstants.POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or _resolve_api_key()
+
+    # -- public API ------------------------------------------------------
+
+    def generate(self,
+                 prompt: Union[str, List[Dict[str, Any]]],
+                 model: str = GeminiConstants.DEFAULT_MODEL,
+                 generation_config: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None) -> str:
+        """Return the text of the first candidate"""
+        data = self.generate_content(prompt, model, generation_config, timeout)
+        try:
+            return data["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            raise GeminiError(f"Beklenmeyen Gemini yanıtı: {str(data)[:300]}")
+
+    def generate_content(self,
+                         prompt: Union[str, List[Dict[str, Any]]],
+                         model: str = GeminiConstants.DEFAULT_MODEL,
+                         generation_config: Optional[Dict[str, Any]] = None,
+                         timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Raw generateContent call; prompt may be a string or a contents list"""
+        contents = [{"parts": [{"text": prompt}]}] if isinstance(prompt, str) else prompt
+        payload: Dict[str, Any] = {"contents": contents}
+        if generation_config:
+            payload["generationConfig"] = generation_config
+        return self._post(f"models/{self._model_id(model)}:generateContent", payload, timeout)
+
+    def embed(self, text: str, model: str = GeminiConstants.EMBEDDING_MODEL,
+              timeout: Optional[float] = None) -> List[float]:
+        """Embedding vector for a single text"""
+        model_id = self._model_id(model)
+        payload = {"model": f"models/{model_id}", "content": {"parts": [{"text": text}]}}
+        data = self._post(f"models/{model_id}:embedContent", payload, timeout)
+        try:
+            return data["embedding"]["values"]
+        except (KeyError, TypeError):
+            raise GeminiError(f"Beklenmeyen embedding yanıtı: {str(data)[:300]}")
+
+    # -- transport -------------------------------------------------------
+
+    @staticmethod
+    def _model_id(model: str) -> str:
+        return model.split("/", 1)[1] if model.startswith("models/") else model
+
+    def _post(self, path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        key = self.api_key
+        if not key:
+            raise GeminiError("Gemini API anahtarı bulunamadı (GEMINI_API_KEY / GOOGLE_API_KEY).")
+
+        url = f"{self.base_url}/{path}"
+        headers = {"Content-Type": "application/json", "x-goog-api-key": key}
+        read_timeout = timeout or self.timeout
+        operation = path.rsplit(":", 1)[-1]
+        start = time.perf_counter()
+        try:
+            data = self._post_with_retries(url, headers, payload, read_timeout, operation)
+        except GeminiError:
+            GEMINI_REQUESTS.labels(operation, "error").inc()
+            raise
+        finally:
+            GEMINI_LATENCY.labels(operation).observe(time.perf_counter() - start)
+        GEMINI_REQUESTS.labels(operation, "ok").inc()
+        usage = (data.get("usageMetadata") if isinstance(data, dict) else None) or {}
+        for kind, field in (("prompt", "promptTokenCount"), ("output", "candidatesTokenCount")):
+            if usage.get(field):
+                GEMINI_TOKENS.labels(operation, kind).inc(usage[field])
+        return data
+
+    def _post_with_retries(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                           read_timeout: float, operation: str) -> Dict[str, Any]:
+        last_error: Optional[GeminiError] = None
+        deadline = time.monotonic() + read_timeout
+
+        for attempt in range(self.max_retries + 1):
+            retry_after: Optional[float] = None
+            try:
+                with self._limiter:
+                    remaining = max(deadline - time.monotonic(), 0.001)
+                    resp = self.session.post(url, headers=headers, json=payload,
+                                             timeout=(GeminiConstants.CONNECT_TIMEOUT, remaining))
+                if resp.status_code < 400:
+                    return resp.json()
+                last_error = GeminiError(f"Gemini HTTP {resp.status_code}: {resp.text[:300]}", resp.status_code)
+                if resp.status_code not in GeminiConstants.RETRY_STATUSES:
+                    raise last_error
+                retry_after = self._retry_after(resp)
+                reason = str(resp.status_code)
+            except requests.ReadTimeout as e:
+                last_error = GeminiError(f"Gemini zaman aşımı: {e}")
+                if operation in GeminiConstants.NO_READ_TIMEOUT_RETRY:
+                    raise last_error
+                reason = "timeout"
+            except requests.RequestException as e:
+                last_error = GeminiError(f"Gemini bağlantı hatası: {e}")
+                reason = "connection"
+
+            if attempt < self.max_retries:
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    break   # Süre bitti: beklemeden son hatayı döndür
+                GEMINI_RETRIES.labels(operation, reason).inc()
+                time.sleep(delay)
+
+        raise last_error or GeminiError("Gemini çağrısı başarısız")
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # "Full jitter": [0, min(max, base * 2^attempt)]
+        cap = min(GeminiConstants.BACKOFF_MAX_SECONDS, GeminiConstants.BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def _retry_after(resp: requests.Response) -> Optional[float]:
+        value = resp.headers.get("Retry-After")
+        try:
+            return min(float(value), GeminiConstants.BACKOFF_MAX_SECONDS) if value else None
+        except ValueError:
+            return None
+
+
+_gemini_client: Optional[GeminiClient] = None
+_gemini_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    """Return the process-wide Gemini client"""
+    global _gemini_client
+    with _gemini_client_lock:
+        if _gemini_client is None:
+            _gemini_client = GeminiClient()
+        return _gemini_client
+
+
+def set_gemini_client(client: Optional[GeminiClient]) -> None:
+    """Swap the process-wide client (e.g. a fake-transport client in tests)"""
+    global _gemini_client
+    with _gemini_client_lock:
+        _gemini_client = client
@@ -1,28 +1,20 @@
 import requests
 import streamlit as st
 import os
+from tools.gemini_client import GeminiError, get_gemini_client
 
 # ✅ API anahtarını Streamlit secrets üzerinden al
 api_key = st.secrets["GEMINI_API_KEY"]
+os.environ.setdefault("GEMINI_API_KEY", api_key)
 
 # -----------------------------------
 # Genel amaçlı Gemini API fonksiyonu
 # -----------------------------------
 def ask_gemini(prompt: str) -> str:
-    model = "gemini-2.5-flash"
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    headers = {"Content-Type": "application/json"}
-    data = {
-        "contents": [{"parts": [{"text": prompt}]}]
-    }
-
-    response = requests.post(f"{url}?key={api_key}", headers=headers, json=data)
-    resp_json = response.json()
-
     try:
-        return resp_json["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception as e:
-        return f"⚠️ Gemini yanıtı alınırken hata oluştu: {str(e)}\n\nYanıt: {resp_json}"
+        return get_gemini_client().generate(prompt)
+    except GeminiError as e:
+        return f"⚠️ Gemini yanıtı alınırken hata oluştu: {str(e)}"
 
 # -----------------------------------
 # Ön Yazı (Cover Letter) Üretici
@@ -73,30 +65,19 @@ CV Details:
 - Do NOT leave placeholders like [Company]
 """
 
-    # -- Gemini Flash API
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-    api_key = st.secrets.get("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
-
-    payload = {
-        "contents": [
-            {"role": "user", "parts": [{"text": prompt}]}
-        ],
-        "generationConfig": {
-            "temperature": 0.7,
-            "topP": 0.95,
-            "maxOutputTokens": 2000
-        }
-        #  !! safetySettings gönderilmez
+    # -- Gemini Flash API (ortak client: pool, timeout, retry)
+    contents = [
+        {"role": "user", "parts": [{"text": prompt}]}
+    ]
+    generation_config = {
+        "temperature": 0.7,
+        "topP": 0.95,
+        "maxOutputTokens": 2000
     }
+    #  !! safetySettings gönderilmez
 
-    resp = requests.post(
-        f"{url}?key={api_key}",
-        headers={"Content-Type": "application/json"},
-        json=payload,
-        timeout=60
-    )
-    resp.raise_for_status()                 # 400/401/403 ise Exception fırlatır
-    text = resp.json()["candidates"][0]["content"]["parts"][0]["text"].strip()
+    # Hata durumunda GeminiError fırlatır
+    text = get_gemini_client().generate(contents, generation_config=generation_config, timeout=60).strip()
     if language == "tr":
         # Teşekkür cümlesini bul ve sonrasına AI notunu ekle
         tesekkur = "Zamanınız ve dikkatiniz için teşekkür ederim."
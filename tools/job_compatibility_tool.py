@@ -4,14 +4,9 @@ from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import streamlit as st
-from google import genai
-from google.genai import types
-import numpy as np
-
-client = genai.Client()  # API key is read from the environment variable GOOGLE_API_KEY
-
-from google.generativeai import types
 import numpy as np
+from tools.gemini_client import get_gemini_client
+from tools.tracing import span, start_trace
 
 
 class AnalysisConstants:
@@ -128,18 +123,19 @@ class JobCompatibilityAnalyzer:
     - Return ONLY valid JSON without markdown formatting."""
 
         try:
-            response = client.models.generate_content(
-                model=AnalysisConstants.DEFAULT_MODEL,
-                contents=prompt,
-                config={
-                    "temperature": AnalysisConstants.DEFAULT_TEMPERATURE,
-                    "max_output_tokens": 3000
-                }
-            )
-
+            with span("llm", purpose="requirements", prompt_chars=len(prompt)) as s:
+                response_text = get_gemini_client().generate(
+                    prompt,
+                    model=AnalysisConstants.DEFAULT_MODEL,
+                    generation_config={
+                        "temperature": AnalysisConstants.DEFAULT_TEMPERATURE,
+                        "maxOutputTokens": 3000
+                    }
+                )
+                s.set(reply_chars=len(response_text or ""))
             
             # Clean and parse response
-            cleaned_response = self._clean_json_response(response.text or "")
+            cleaned_response = self._clean_json_response(response_text or "")
             requirements_dict = self._safe_json_parse(cleaned_response)
             
             # Convert to JobRequirements object
@@ -457,17 +453,19 @@ Return JSON with this structure:
 
 Focus on essential matches and key insights only. Return ONLY valid JSON."""
 
-            response = client.models.generate_content(
-                model=AnalysisConstants.DEFAULT_MODEL,
-                contents=analysis_prompt,
-                config={
-                    "temperature": AnalysisConstants.ANALYSIS_TEMPERATURE,
-                    "max_output_tokens": AnalysisConstants.MAX_OUTPUT_TOKENS,
-                    "stop_sequences": AnalysisConstants.STOP_SEQUENCES
-                }
-            )
-            st.info(f"LLM raw response: {response.text}")  # DEBUG
-            cleaned_response = self._clean_json_response(response.text or "")
+            with span("llm", purpose="analysis", prompt_chars=len(analysis_prompt)) as s:
+                response_text = get_gemini_client().generate(
+                    analysis_prompt,
+                    model=AnalysisConstants.DEFAULT_MODEL,
+                    generation_config={
+                        "temperature": AnalysisConstants.ANALYSIS_TEMPERATURE,
+                        "maxOutputTokens": AnalysisConstants.MAX_OUTPUT_TOKENS,
+                        "stopSequences": AnalysisConstants.STOP_SEQUENCES
+                    }
+                )
+                s.set(reply_chars=len(response_text or ""))
+            st.info(f"LLM raw response: {response_text}")  # DEBUG
+            cleaned_response = self._clean_json_response(response_text or "")
             analysis_result = self._safe_json_parse(cleaned_response)
             st.info(f"Parsed analysis result: {analysis_result}")  # DEBUG
             required_fields = ["overall_compatibility_score", "skill_analysis", "experience_analysis", "education_analysis"]
@@ -639,19 +637,21 @@ Focus on essential matches and key insights only. Return ONLY valid JSON."""
                     report_prompt += completion_instruction.get(language, completion_instruction["en"])
                 
                 # Generate response
-                response = client.models.generate_content(
-                    model=AnalysisConstants.DEFAULT_MODEL,
-                    contents=report_prompt,
-                    config={
-                        "temperature": AnalysisConstants.REPORT_TEMPERATURE + (attempt * 0.1),
-                        "max_output_tokens": AnalysisConstants.MAX_OUTPUT_TOKENS
-                    }
-                )
+                with span("llm", purpose="report", attempt=attempt + 1, prompt_chars=len(report_prompt)) as s:
+                    response_text = get_gemini_client().generate(
+                        report_prompt,
+                        model=AnalysisConstants.DEFAULT_MODEL,
+                        generation_config={
+                            "temperature": AnalysisConstants.REPORT_TEMPERATURE + (attempt * 0.1),
+                            "maxOutputTokens": AnalysisConstants.MAX_OUTPUT_TOKENS
+                        }
+                    )
+                    s.set(reply_chars=len(response_text or ""))
                 
-                if response.text:
+                if response_text:
                     # Validate completeness
-                    if self._validate_report_completeness(response.text, language):
-                        return response.text
+                    if self._validate_report_completeness(response_text, language):
+                        return response_text
                     else:
                         st.warning(lang_msgs["retry_warning"].format(attempt + 1))
                         continue
@@ -851,7 +851,22 @@ This candidate shows **{overall_score}%** compatibility for the {position_title}
     ) -> Dict[str, Any]:
         """
         Generate comprehensive compatibility report - guaranteed to never fail.
+
+        Each step is recorded as a span of a "job_compatibility" trace.
         """
+        with start_trace("job_compatibility", language=language) as trace:
+            result = self._generate_compatibility_report(job_description, language, company_name)
+        if "metadata" in result:
+            result["metadata"]["trace"] = [s.as_dict() for s in trace.spans]
+            result["metadata"]["total_ms"] = round(trace.duration_ms, 1)
+        return result
+
+    def _generate_compatibility_report(
+        self,
+        job_description: str,
+        language: str,
+        company_name: str
+    ) -> Dict[str, Any]:
         # Language-specific error messages
         error_messages = {
             "tr": {
@@ -892,7 +907,7 @@ This candidate shows **{overall_score}%** compatibility for the {position_title}
         
         try:
             # Step 1: Extract job requirements - with fallback
-            with st.spinner(progress["analyzing_job"]):
+            with st.spinner(progress["analyzing_job"]), span("requirements") as step:
                 try:
                     job_requirements = self.extract_job_requirements(job_description)
                     if not job_requirements.position_title:
@@ -909,9 +924,10 @@ This candidate shows **{overall_score}%** compatibility for the {position_title}
                 except Exception as e:
                     st.warning(f"Job requirements extraction had issues: {e}")
                     job_requirements = JobRequirements(position_title="Position Analysis", company_info=company_name)
+                step.set(required_skills=len(job_requirements.required_skills))
             
             # Step 2: Get relevant CV context - with fallback
-            with st.spinner(progress["matching_cv"]):
+            with st.spinner(progress["matching_cv"]), span("cv_context") as step:
                 try:
                     cv_context = self.get_relevant_cv_context(job_requirements)
                     if not cv_context:
@@ -919,9 +935,10 @@ This candidate shows **{overall_score}%** compatibility for the {position_title}
                 except Exception as e:
                     st.warning(f"CV context retrieval had issues: {e}")
                     cv_context = self._format_cv_data_as_text()
+                step.set(context_chars=len(cv_context))
             
             # Step 3: Perform compatibility analysis - with fallback
-            with st.spinner(progress["analyzing_compatibility"]):
+            with st.spinner(progress["analyzing_compatibility"]), span("analysis") as step:
                 try:
                     compatibility_analysis = self.analyze_compatibility_with_llm(
                         job_requirements, 
@@ -932,15 +949,17 @@ This candidate shows **{overall_score}%** compatibility for the {position_title}
                     compatibility_analysis = self._create_enhanced_fallback_analysis(
                         job_requirements, cv_context, error=str(e)
                     )
+                step.set(score=compatibility_analysis.get('overall_compatibility_score', 50))
             
             # Step 4: Generate final report - guaranteed success
-            with st.spinner(progress["generating_report"]):
+            with st.spinner(progress["generating_report"]), span("report") as step:
                 report_text = self._generate_report_with_retry(
                     job_requirements,
                     compatibility_analysis,
                     language,
                     company_name # Pass company name here
                 )
+                step.set(report_chars=len(report_text))
             
             # Always return successful response
             return {
@@ -0,0 +1,357 @@
+import math
+import os
+import resource
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class MetricsConstants:
+    """Defaults for the in-process Prometheus registry"""
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _ShardedChild:
+    """
+    One labelled series, stored as per-thread shards.
+
+    Updates only touch the calling thread's own list, so the hot path takes no
+    lock; the shard lock is held once per (series, thread) on first use. A
+    scrape sums the shards, which may be a few updates behind, never torn.
+    """
+
+    __slots__ = ("_width", "_shards", "_lock")
+
+    def __init__(self, width: int):
+        self._width = width
+        self._shards: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> List[float]:
+        tid = threading.get_ident()
+        shard = self._shards.get(tid)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(tid, [0.0] * self._width)
+        return shard
+
+    def _totals(self) -> List[float]:
+        totals = [0.0] * self._width
+        for shard in list(self._shards.values()):
+            for i, v in enumerate(shard):
+                totals[i] += v
+        return totals
+
+
+class _CounterChild(_ShardedChild):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shard()[0] += amount
+
+    def value(self) -> float:
+        return self._totals()[0]
+
+
+class _GaugeChild(_ShardedChild):
+    __slots__ = ("_base",)
+
+    def __init__(self):
+        super().__init__(1)
+        self._base = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shard()[0] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._shard()[0] -= amount
+
+    def set(self, value: float) -> None:
+        # set() is for single-writer gauges; it overrides any inc/dec history
+        with self._lock:
+            self._shards.clear()
+            self._base = value
+
+    def value(self) -> float:
+        return self._base + self._totals()[0]
+
+
+class _HistogramChild(_ShardedChild):
+    __slots__ = ("_bounds",)
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        super().__init__(len(bounds) + 2)   # bucket sayıları + sum + count
+        self._bounds = bounds
+
+    def observe(self, value: float) -> None:
+        shard = self._shard()
+        for i, bound in enumerate(self._bounds):
+            if value <= bound:
+                shard[i] += 1
+                break
+        shard[-2] += value
+        shard[-1] += 1
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        totals = self._totals()
+        cumulative, running = [], 0.0
+        for count in totals[:len(self._bounds)]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-2], totals[-1]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._fn = fn                           # Değer scrape anında okunur (process metrikleri)
+        self._children: Dict[Tuple[str, ...], _ShardedChild] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> _ShardedChild:
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values: str) -> None:
+        """Drop a label set so it is no longer exported (e.g. a mode that is no longer active)"""
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def _series(self) -> Iterable[Tuple[Tuple[str, ...], _ShardedChild]]:
+        return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        if self._fn is not None:
+            try:
+                return [f"{self.name} {_format_value(float(self._fn()))}"]
+            except Exception:
+                return []
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_format_value(c.value())}"
+                for k, c in self._series()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = MetricsConstants.LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for key, child in self._series():
+            cumulative, total, count = child.snapshot()
+            for bound, c in zip(self.buckets, cumulative):
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {_format_value(c)}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, inf)} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {_format_value(count)}")
+        return lines
+
+
+class Registry:
+    """Holds metrics in registration order and renders the text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                fn: Optional[Callable[[], float]] = None) -> Counter:
+        """fn: monotonic value read at scrape time (e.g. CPU seconds) instead of inc()"""
+        return self.register(Counter(name, documentation, labelnames, fn))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              fn: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, fn))  # type: ignore[return-value]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = MetricsConstants.LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# -- process metrics ---------------------------------------------------------
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_START_TIME = time.time()
+
+
+def _rss_bytes() -> float:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return float(int(f.read().split()[1]) * _PAGE_SIZE)
+    except (OSError, IndexError, ValueError):
+        # /proc yoksa (macOS): tepe RSS (macOS'ta byte, Linux'ta KB)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return float(peak if os.uname().sysname == "Darwin" else peak * 1024)
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+registry.gauge("process_resident_memory_bytes", "Resident memory size in bytes.", fn=_rss_bytes)
+registry.counter("process_cpu_seconds_total", "Total user and system CPU time in seconds.", fn=_cpu_seconds)
+registry.gauge("process_start_time_seconds", "Start time of the process since unix epoch.", fn=lambda: _START_TIME)
+registry.gauge("python_threads", "Number of live Python threads.", fn=lambda: threading.active_count())
+
+
+# -- shared application metrics ---------------------------------------------
+
+GEMINI_REQUESTS = registry.counter(
+    "gemini_requests_total", "Gemini API calls by operation and outcome.", ("operation", "outcome"))
+GEMINI_LATENCY = registry.histogram(
+    "gemini_request_duration_seconds", "Gemini API call latency including retries.", ("operation",))
+GEMINI_RETRIES = registry.counter(
+    "gemini_retries_total", "Gemini API retry attempts.", ("operation", "reason"))
+GEMINI_TOKENS = registry.counter(
+    "gemini_tokens_total", "Tokens reported by Gemini usageMetadata.", ("operation", "kind"))
+EMBEDDING_CACHE = registry.counter(
+    "embedding_cache_requests_total", "Embedding cache lookups by cache and result (hit/miss).", ("cache", "result"))
+RETRIEVAL_LATENCY = registry.histogram(
+    "rag_retrieval_duration_seconds", "Time spent retrieving CV chunks for a query.", ("mode",),
+    buckets=MetricsConstants.FAST_BUCKETS)
+
+
+# -- ASGI middleware ---------------------------------------------------------
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route template and status.", ("method", "route", "status"))
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"))
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route request counts and latency.
+
+    Routes are labelled by their template (e.g. /api/pdf/{pdf_id}) so label
+    cardinality stays bounded; latency covers the full (streamed) body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.labels(method, route_path, str(status[0])).inc()
+            HTTP_LATENCY.labels(method, route_path).observe(time.perf_counter() - start)
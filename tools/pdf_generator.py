@@ -27,6 +27,17 @@ from PIL import Image as PILImage, ImageDraw
 import tempfile
 import os
 import urllib.request
+import json
+import time
+import zipfile
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator
 
 
 class PDFConstants:
@@ -985,6 +996,20 @@ class JobCompatibilityPDFGenerator:
                      language: str = "en",
                      company_name: str = "Unknown Company") -> bytes:
         """Generate enhanced PDF report with professional design"""
+        buffer = self.render_pdf_buffer(report_content, job_title, candidate_name, language, company_name)
+        return buffer.getvalue()
+
+    def render_pdf_buffer(self,
+                          report_content: str,
+                          job_title: str = "Unknown Position",
+                          candidate_name: str = "Candidate",
+                          language: str = "en",
+                          company_name: str = "Unknown Company") -> io.BytesIO:
+        """
+        Render the PDF and return the render buffer itself (no copy).
+
+        Use buffer.getbuffer() for a zero-copy memoryview of the document.
+        """
 
         # Create enhanced metadata
         metadata = DocumentMetadata(
@@ -1025,9 +1050,8 @@ class JobCompatibilityPDFGenerator:
             onLaterPages=self.pdf_builder.add_enhanced_page_elements
         )
         self._cleanup_temp_files()
-        # Return PDF bytes
         buffer.seek(0)
-        return buffer.getvalue()
+        return buffer
 
     def _build_enhanced_document(self, report_content: str,
                                 metadata: DocumentMetadata) -> List[Any]:
@@ -1105,6 +1129,118 @@ class JobCompatibilityPDFGenerator:
         return footer_elements
 
 
+class PDFStoreConstants:
+    """Limits for the in-process rendered PDF store"""
+    TTL_SECONDS = 15 * 60
+    MAX_ENTRIES = 64
+    MAX_TOTAL_BYTES = 64 * 1024 * 1024
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class PDFTooLarge(ValueError):
+    """The document alone exceeds the store's byte budget"""
+
+
+@dataclass
+class StoredPDF:
+    """A rendered PDF kept in its original render buffer"""
+    pdf_id: str
+    filename: str
+    buffer: io.BytesIO
+    etag: str
+    size: int
+    created_at: float
+
+    def view(self) -> memoryview:
+        """Zero-copy view over the rendered document"""
+        return self.buffer.getbuffer()
+
+    def iter_chunks(self, chunk_size: int = PDFStoreConstants.STREAM_CHUNK_SIZE) -> Iterator[memoryview]:
+        """Yield memoryview slices of the document (no copies)"""
+        view = self.view()
+        for start in range(0, self.size, chunk_size):
+            yield view[start:start + chunk_size]
+
+
+class PDFStore:
+    """
+    Process-wide, bounded TTL store for rendered PDFs.
+
+    Keeps the render buffer as-is (no getvalue() copy) so downloads can stream
+    straight out of it. Entries expire after TTL_SECONDS and the oldest are
+    evicted when the entry or byte budget is exceeded, so nothing is held
+    indefinitely.
+    """
+
+    def __init__(self,
+                 ttl_seconds: float = PDFStoreConstants.TTL_SECONDS,
+                 max_entries: int = PDFStoreConstants.MAX_ENTRIES,
+                 max_total_bytes: int = PDFStoreConstants.MAX_TOTAL_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_total_bytes = max_total_bytes
+        self._entries: "OrderedDict[str, StoredPDF]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, buffer: io.BytesIO, filename: str) -> StoredPDF:
+        """
+        Store a render buffer and return its entry.
+
+        Older entries make room for the new one; the new entry itself is never
+        evicted, so the returned id stays downloadable until its TTL. Raises
+        PDFTooLarge if the document alone exceeds max_total_bytes.
+        """
+        view = buffer.getbuffer()
+        if view.nbytes > self.max_total_bytes:
+            size = view.nbytes
+            view.release()
+            raise PDFTooLarge(f"PDF is {size} bytes; store limit is {self.max_total_bytes}")
+        entry = StoredPDF(
+            pdf_id=uuid.uuid4().hex,
+            filename=filename,
+            buffer=buffer,
+            etag=f'"{hashlib.sha256(view).hexdigest()[:32]}"',
+            size=view.nbytes,
+            created_at=time.time(),
+        )
+        view.release()
+        with self._lock:
+            self._entries[entry.pdf_id] = entry
+            self._total_bytes += entry.size
+            self._evict_locked(keep=entry.pdf_id)
+        return entry
+
+    def get(self, pdf_id: str) -> Optional[StoredPDF]:
+        """Return a live entry or None if it is unknown or expired"""
+        with self._lock:
+            self._evict_locked()
+            return self._entries.get(pdf_id)
+
+    def discard(self, pdf_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(pdf_id, None)
+            if entry:
+                self._total_bytes -= entry.size
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.pdf_id == keep:
+                # Geriye sadece yeni kayıt (ve ondan yeniler) kaldı; onu atma
+                break
+            over_budget = (len(self._entries) > self.max_entries
+                           or self._total_bytes > self.max_total_bytes)
+            if oldest.created_at >= cutoff and not over_budget:
+                break
+            self._entries.popitem(last=False)
+            self._total_bytes -= oldest.size
+
+
+pdf_store = PDFStore()
+
+
 # Enhanced utility function
 def generate_enhanced_compatibility_pdf(report_content: str,
                                       job_title: str = "Unknown Position",
@@ -1162,3 +1298,204 @@ def _generate_simple_fallback_pdf(report_content: str, job_title: str, candidate
     doc.build(story)
     return buffer.getvalue()
 
+
+# ---------------------------------------------------------------------------
+# Batch rendering (çoklu ilan -> ZIP)
+# ---------------------------------------------------------------------------
+
+class BatchConstants:
+    """Constants for batch PDF rendering"""
+    # Aynı anda havada tutulacak iş sayısı = worker sayısı * bu çarpan
+    IN_FLIGHT_PER_WORKER = 2
+    SUMMARY_FILENAME = "batch_summary.json"
+    WORKERS_ENV = "PDF_BATCH_WORKERS"       # Havuz boyutu (varsayılan: CPU sayısı)
+    # fork değil: sunucu çok thread'li (index izleyici, outbox, özet executor'ları...);
+    # fork edilen çocuk başka bir thread'in tuttuğu kilidi miras alıp kilitlenebilir
+    START_METHOD = "spawn"
+
+
+# Her worker process kendi generator'ını bir kez kurar (font kaydı vb. tekrar edilmez)
+_batch_worker_generator: Optional["JobCompatibilityPDFGenerator"] = None
+
+
+def _init_batch_worker():
+    global _batch_worker_generator
+    _batch_worker_generator = JobCompatibilityPDFGenerator()
+
+
+def _batch_filename(index: int, payload: Dict[str, Any]) -> str:
+    """Build a unique, filesystem-safe file name for a batch item"""
+    base = payload.get("filename") or f"{payload.get('company_name', '')} {payload.get('job_title', '')}"
+    slug = re.sub(r"[^\w-]+", "_", str(base)).strip("_")[:60] or "report"
+    if slug.lower().endswith("_pdf"):
+        slug = slug[:-4]
+    return f"{index + 1:03d}_{slug}.pdf"
+
+
+def _render_batch_item(index: int, payload: Dict[str, Any]) -> Tuple[int, str, bytes]:
+    """Render one report inside a worker process"""
+    generator = _batch_worker_generator or JobCompatibilityPDFGenerator()
+    pdf_bytes = generator.generate_pdf(
+        report_content=payload["report_content"],
+        job_title=payload.get("job_title", "Unknown Position"),
+        candidate_name=payload.get("candidate_name", "Candidate"),
+        language=payload.get("language", "en"),
+        company_name=payload.get("company_name", "Unknown Company"),
+    )
+    return index, _batch_filename(index, payload), pdf_bytes
+
+
+_batch_pool: Optional[ProcessPoolExecutor] = None
+_batch_pool_workers = 0
+_batch_pool_lock = threading.Lock()
+
+
+def get_batch_pool() -> Tuple[ProcessPoolExecutor, int]:
+    """
+    Process-wide render pool, created on first use and reused across batches.
+
+    Workers are spawned (not forked) and keep their generator between batches,
+    so only the first batch pays the interpreter/font startup cost.
+    Returns (pool, worker count).
+    """
+    global _batch_pool, _batch_pool_workers
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool_workers = int(os.getenv(BatchConstants.WORKERS_ENV, 0)) or os.cpu_count() or 1
+            _batch_pool = ProcessPoolExecutor(
+                max_workers=_batch_pool_workers,
+                mp_context=multiprocessing.get_context(BatchConstants.START_METHOD),
+                initializer=_init_batch_worker,
+            )
+        return _batch_pool, _batch_pool_workers
+
+
+def shutdown_batch_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """Stop the render pool (app shutdown); with pool, only if it is still the current one"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None or (pool is not None and pool is not _batch_pool):
+            return
+        current, _batch_pool = _batch_pool, None
+    current.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_batch(payloads: Iterable[Dict[str, Any]],
+                   max_workers: Optional[int] = None,
+                   errors: Optional[List[Dict[str, Any]]] = None) -> Iterator[Tuple[int, str, bytes]]:
+    """
+    Render many reports across worker processes.
+
+    Yields (index, filename, pdf_bytes) as soon as each document finishes
+    (completion order, not input order). Only a bounded window of jobs is
+    in flight, so memory stays flat regardless of batch size. The shared
+    pool (get_batch_pool) does the work; concurrent batches share its workers.
+
+    Args:
+        payloads: Dicts with generate_pdf arguments (report_content is required)
+        max_workers: Caps how many of the pool's workers this batch keeps busy
+        errors: Optional list that collects {"index", "error"} for failed items
+    """
+    executor, pool_workers = get_batch_pool()
+    workers = min(max_workers or pool_workers, pool_workers)
+    max_in_flight = workers * BatchConstants.IN_FLIGHT_PER_WORKER
+    items = iter(enumerate(payloads))
+    pending = {}
+
+    def _submit_next() -> bool:
+        try:
+            index, payload = next(items)
+        except StopIteration:
+            return False
+        pending[executor.submit(_render_batch_item, index, payload)] = index
+        return True
+
+    try:
+        while len(pending) < max_in_flight and _submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    # Bir worker öldü: havuz kullanılamaz, sonraki batch yenisini kurar
+                    shutdown_batch_pool(executor)
+                    raise
+                except Exception as e:
+                    print(f"Batch PDF #{index + 1} failed: {e}")
+                    if errors is not None:
+                        errors.append({"index": index, "error": str(e)})
+                _submit_next()
+    finally:
+        # İstemci koptu / hata: bu batch'in bekleyen işleri paylaşılan havuzu meşgul etmesin
+        for future in pending:
+            future.cancel()
+
+
+class _ZipChunkSink:
+    """Write-only sink for zipfile; collected bytes are drained after every entry"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_pdf_zip(payloads: Iterable[Dict[str, Any]],
+                   max_workers: Optional[int] = None,
+                   stats: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+    """
+    Render reports in parallel and stream them back as a ZIP archive.
+
+    Each PDF is written to the archive and flushed to the caller as soon as it
+    is rendered; nothing but the current entry is buffered. A
+    batch_summary.json entry with the throughput (PDFs/s) closes the archive.
+
+    Args:
+        payloads: Dicts with generate_pdf arguments
+        max_workers: Caps how many pool workers this batch uses (default: all)
+        stats: Optional dict that receives the final summary
+
+    Yields:
+        ZIP archive chunks
+    """
+    sink = _ZipChunkSink()
+    errors: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    count = 0
+    total_bytes = 0
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for _, filename, pdf_bytes in iter_pdf_batch(payloads, max_workers, errors):
+            archive.writestr(filename, pdf_bytes)
+            count += 1
+            total_bytes += len(pdf_bytes)
+            yield sink.drain()
+
+        elapsed = time.perf_counter() - started
+        summary = {
+            "pdf_count": count,
+            "failed": errors,
+            "total_pdf_bytes": total_bytes,
+            "elapsed_seconds": round(elapsed, 3),
+            "pdfs_per_second": round(count / elapsed, 2) if elapsed > 0 else None,
+        }
+        archive.writestr(BatchConstants.SUMMARY_FILENAME, json.dumps(summary, ensure_ascii=False, indent=2))
+
+    print(f"Batch PDF: {count} PDF, {summary['elapsed_seconds']}s, {summary['pdfs_per_second']} PDF/s")
+    if stats is not None:
+        stats.update(summary)
+    yield sink.drain()
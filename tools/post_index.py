@@ -0,0 +1,182 @@
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tools.gemini_client import GeminiError, get_gemini_client
+from tools.metrics import EMBEDDING_CACHE
+
+
+EmbedFn = Callable[[str], Optional[np.ndarray]]
+
+_TOKEN_RE = re.compile(r"[0-9a-zçğıöşü]{3,}")
+
+
+class PostIndexConstants:
+    """Constants for semantic post search"""
+    MIN_SIMILARITY_ENV = "POST_SEARCH_MIN_SIMILARITY"
+    DEFAULT_MIN_SIMILARITY = 0.5    # embedding-001'de alakasız yazılar ~0.3-0.45 arası
+
+
+def _default_embed(text: str) -> Optional[np.ndarray]:
+    """Gemini embedding (rag_system / api_server ile aynı model)"""
+    try:
+        vec = get_gemini_client().embed(text, model="models/embedding-001", timeout=10)
+        return np.asarray(vec, dtype=np.float32)
+    except GeminiError as e:
+        print(f"Post embedding failed: {e}")
+        return None
+
+
+class PostIndex:
+    """
+    Small vector index over Medium posts, keyed by post URL.
+
+    sync() only embeds posts that are new or whose text changed (tracked by a
+    content hash), so feed refreshes cost one embedding call per new article;
+    it is meant to run off the request path (feed refresher thread). Queries
+    are answered from the precomputed, L2-normalized matrix and posts below
+    min_similarity are dropped; when no embedding is available a
+    token-overlap score is used instead.
+
+    Shared state is only ever replaced (never mutated in place) under _lock,
+    so searches see either the old or the new snapshot.
+    """
+
+    def __init__(self, embed_fn: Optional[EmbedFn] = None, disk_path: Optional[Path] = None,
+                 min_similarity: Optional[float] = None):
+        if min_similarity is None:
+            min_similarity = float(os.getenv(PostIndexConstants.MIN_SIMILARITY_ENV,
+                                             PostIndexConstants.DEFAULT_MIN_SIMILARITY))
+        self._embed = embed_fn or _default_embed
+        self.disk_path = disk_path
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()      # Aynı anda tek sync
+        self._posts: Dict[str, Dict[str, Any]] = {}
+        self._hashes: Dict[str, str] = {}
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._urls: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._load_from_disk()
+
+    @staticmethod
+    def post_text(post: Dict[str, Any]) -> str:
+        tags = ", ".join(post.get("tags") or [])
+        parts = [post.get("title", ""), post.get("summary", ""), f"Etiketler: {tags}" if tags else ""]
+        return "\n".join(p for p in parts if p).strip()
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def sync(self, posts: List[Dict[str, Any]]) -> int:
+        """Bring the index in line with the current feed; returns #embedded posts"""
+        with self._sync_lock:
+            return self._sync(posts)
+
+    def _sync(self, posts: List[Dict[str, Any]]) -> int:
+        current: Dict[str, Dict[str, Any]] = {}
+        texts: Dict[str, str] = {}
+        hashes: Dict[str, str] = {}
+        for post in posts:
+            url = post.get("url")
+            if not url:
+                continue
+            current[url] = post
+            texts[url] = self.post_text(post)
+            hashes[url] = hashlib.sha1(texts[url].encode("utf-8")).hexdigest()
+
+        with self._lock:
+            known = {u: v for u, v in self._vectors.items()
+                     if u in current and self._hashes.get(u) == hashes[u]}
+        EMBEDDING_CACHE.labels("post_index", "hit").inc(len(known))
+
+        # Embedding çağrıları kilit dışında; aramalar bu sırada eski snapshot'ı kullanır
+        fresh: Dict[str, np.ndarray] = {}
+        for url in current:
+            if url in known:
+                continue
+            EMBEDDING_CACHE.labels("post_index", "miss").inc()
+            vec = self._embed(texts[url])
+            if vec is not None and vec.size:
+                fresh[url] = vec.astype(np.float32, copy=False)
+
+        with self._lock:
+            self._vectors = {**known, **fresh}
+            self._hashes = {u: hashes[u] for u in self._vectors}
+            self._posts = current
+            self._rebuild_matrix()
+        if fresh:
+            self._save_to_disk()
+        return len(fresh)
+
+    def search(self, query: str, top_k: int = 3,
+               query_vec: Optional[np.ndarray] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Return (post, score) pairs ranked by relevance to the query"""
+        with self._lock:
+            posts, urls, matrix = self._posts, self._urls, self._matrix
+        if not posts or not query.strip():
+            return []
+
+        if matrix is not None:
+            q = query_vec if query_vec is not None else self._embed(query.lower().strip())
+            if q is not None and q.shape[-1] == matrix.shape[1]:
+                q = q / (float(np.linalg.norm(q)) + 1e-8)
+                sims = matrix @ q
+                order = np.argsort(sims)[::-1][:top_k]
+                return [(posts[urls[i]], float(sims[i])) for i in order if sims[i] >= self.min_similarity]
+
+        # Embedding yoksa: basit kelime örtüşmesi
+        q_tokens = set(_TOKEN_RE.findall(query.lower()))
+        scored = []
+        for post in posts.values():
+            tokens = set(_TOKEN_RE.findall(self.post_text(post).lower()))
+            overlap = len(q_tokens & tokens) / (len(q_tokens) or 1)
+            if overlap:
+                scored.append((post, overlap))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:top_k]
+
+    def _rebuild_matrix(self) -> None:
+        urls = [u for u in self._posts if u in self._vectors]
+        if not urls:
+            self._urls, self._matrix = [], None
+            return
+        matrix = np.vstack([self._vectors[u] for u in urls])
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-8
+        self._urls, self._matrix = urls, matrix
+
+    def _load_from_disk(self) -> None:
+        if not self.disk_path or not self.disk_path.exists():
+            return
+        try:
+            with open(self.disk_path, "rb") as f:
+                data = pickle.load(f)
+            self._hashes = data.get("hashes", {})
+            self._vectors = data.get("vectors", {})
+        except Exception as e:
+            print(f"Post index cache unreadable: {e}")
+
+    def _save_to_disk(self) -> None:
+        if not self.disk_path:
+            return
+        with self._lock:
+            data = {"hashes": self._hashes, "vectors": self._vectors}
+        tmp = None
+        try:
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            # Geçici dosyaya yaz + rename: yarıda kalan yazım canlı dosyayı bozmaz
+            with tempfile.NamedTemporaryFile(dir=self.disk_path.parent, prefix=f".{self.disk_path.name}.",
+                                             suffix=".tmp", delete=False) as tmp:
+                pickle.dump(data, tmp)
+            os.replace(tmp.name, self.disk_path)
+        except Exception as e:
+            print(f"Post index cache write failed: {e}")
+            if tmp is not None:
+                Path(tmp.name).unlink(missing_ok=True)
@@ -0,0 +1,111 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.prompt_builder import estimate_tokens
+
+_TOKEN_RE = re.compile(r"[0-9a-zçğıöşü]+")
+
+
+class ProjectMatcherConstants:
+    """Constants for project-name matching"""
+    MIN_TOKEN_LEN = 3           # "ai", "&" gibi parçalar eşleşmeye katılmaz
+    ALL_TOKENS = 1.0            # api_server: adın tüm kelimeleri geçmeli
+    HALF_TOKENS = 0.5           # legacy Streamlit: kelimelerin yarısı yeterli
+
+
+def format_project_block(proj: Dict[str, Any]) -> str:
+    return (
+        f"Proje Adı: {proj.get('name', '')}\n"
+        f"Teknolojiler: {proj.get('technology', '')}\n"
+        f"Açıklama: {proj.get('description', '')}\n"
+        f"Özellikler: {proj.get('features', '')}"
+    )
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.casefold()) if len(t) >= ProjectMatcherConstants.MIN_TOKEN_LEN]
+
+
+class ProjectMatcher:
+    """
+    Token -> project inverted index over casefolded project names and aliases.
+
+    Built once per CV; match() tokenizes the message once and looks every
+    token (and its prefixes, so Turkish suffixes like "Chatbot'unu" or
+    "chatbotta" still hit) up in the index. A project matches when at least
+    min_ratio of the tokens of its name or of one alias were seen. The prompt
+    blocks are formatted at build time.
+    """
+
+    def __init__(self, projects: Optional[List[Any]] = None):
+        self.projects: List[Dict[str, Any]] = []
+        self.blocks: List[str] = []
+        self.block_tokens: List[int] = []
+        self.summary_blocks: List[str] = []                 # özelliksiz kısa blok (eşleşme yoksa örnek)
+        self._phrases: List[Tuple[int, int]] = []          # phrase -> (project idx, token count)
+        self._index: Dict[str, List[int]] = {}              # token -> phrase ids
+        self._max_token_len = 0
+
+        for proj in projects or []:
+            if not isinstance(proj, dict):
+                continue
+            name = str(proj.get("name") or "").strip()
+            if not name:
+                continue
+            idx = len(self.projects)
+            self.projects.append(proj)
+            self.blocks.append(format_project_block(proj))
+            self.block_tokens.append(estimate_tokens(self.blocks[-1]))
+            self.summary_blocks.append(
+                f"Proje Adı: {name}\nTeknolojiler: {proj.get('technology', '')}\nAçıklama: {proj.get('description', '')}"
+            )
+            for phrase in [name, *(proj.get("aliases") or [])]:
+                tokens = sorted(set(_tokens(str(phrase))))
+                if not tokens:
+                    continue
+                phrase_id = len(self._phrases)
+                self._phrases.append((idx, len(tokens)))
+                for tok in tokens:
+                    self._index.setdefault(tok, []).append(phrase_id)
+                    self._max_token_len = max(self._max_token_len, len(tok))
+
+    @classmethod
+    def from_cv(cls, cv_json: Dict[str, Any]) -> "ProjectMatcher":
+        return cls((cv_json or {}).get("projects") or [])
+
+    def match(self, message: str, min_ratio: float = ProjectMatcherConstants.ALL_TOKENS) -> List[int]:
+        """Indices of matched projects, in CV order"""
+        if not self._index:
+            return []
+        seen: Dict[int, set] = {}
+        min_len = ProjectMatcherConstants.MIN_TOKEN_LEN
+        for tok in set(_tokens(message)):
+            for end in range(min_len, min(len(tok), self._max_token_len) + 1):
+                phrase_ids = self._index.get(tok[:end])
+                if phrase_ids:
+                    for pid in phrase_ids:
+                        seen.setdefault(pid, set()).add(tok[:end])
+
+        matched = set()
+        for pid, hit_tokens in seen.items():
+            idx, n_tokens = self._phrases[pid]
+            if len(hit_tokens) >= max(1, int(n_tokens * min_ratio)):
+                matched.add(idx)
+        return sorted(matched)
+
+    def matched_blocks(self, message: str, min_ratio: float = ProjectMatcherConstants.ALL_TOKENS) -> List[str]:
+        return [self.blocks[i] for i in self.match(message, min_ratio)]
+
+
+_matcher_cache: Tuple[Optional[List[Any]], Optional[ProjectMatcher]] = (None, None)
+
+
+def get_project_matcher(cv_json: Dict[str, Any]) -> ProjectMatcher:
+    """Matcher for this CV, rebuilt only when a different projects list is passed"""
+    global _matcher_cache
+    cached_projects, matcher = _matcher_cache
+    projects = (cv_json or {}).get("projects") or []
+    if matcher is None or cached_projects is not projects:
+        matcher = ProjectMatcher(projects)
+        _matcher_cache = (projects, matcher)
+    return matcher
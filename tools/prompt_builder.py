@@ -0,0 +1,187 @@
+import math
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from tools.metrics import registry
+
+
+class PromptBudgetConstants:
+    """Constants for token-budgeted prompt assembly"""
+    BUDGET_ENV = "CHAT_PROMPT_TOKEN_BUDGET"
+    DEFAULT_BUDGET = 3000
+    # Gemini tokenizer'ı çevrimdışı yok; TR/EN karışık metinde ~3.5 karakter/token iyi bir üst tahmin
+    CHARS_PER_TOKEN = 3.5
+    QUESTION_MAX_TOKENS = 400
+    HISTORY_SHARE = 0.3                 # Bütçenin geçmişe ayrılabilecek en fazla payı
+    HISTORY_MESSAGE_MAX_TOKENS = 200
+    MIN_PARTIAL_TOKENS = 48             # Bundan az yer kaldıysa parçayı kesmek yerine atla
+    NOTE_RESERVE_TOKENS = 24            # "… N önceki mesaj çıkarıldı" notu + ayırıcı payı
+    TRUNCATION_MARK = " …"
+    TOKEN_BUCKETS = (250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000)
+
+
+class PromptLabels:
+    """Fixed prompt texts per language (api_server passes instruction / context / question labels)"""
+    DEFAULT_LANG = "tr"
+    HISTORY = {"tr": "Son sohbet geçmişi (referans için)", "en": "Recent conversation (for reference)"}
+    SUMMARY = {"tr": "Önceki konuşmanın özeti", "en": "Summary of the earlier conversation"}
+    DROPPED = {"tr": "(… {n} önceki mesaj bağlam sınırı nedeniyle çıkarıldı)",
+               "en": "(… {n} earlier messages omitted to fit the context limit)"}
+    ROLES = {"tr": {"user": "Kullanıcı", "assistant": "Asistan"},
+             "en": {"user": "User", "assistant": "Assistant"}}
+
+    @staticmethod
+    def pick(table: dict, lang: str):
+        return table.get(lang, table[PromptLabels.DEFAULT_LANG])
+
+
+PROMPT_TOKENS = registry.histogram(
+    "chat_prompt_tokens", "Estimated size of the final chat prompt in tokens.", ("lang",),
+    buckets=PromptBudgetConstants.TOKEN_BUCKETS)
+PROMPT_TRIMMED = registry.counter(
+    "chat_prompt_trimmed_total", "Prompt parts truncated or dropped to fit the token budget.", ("part", "action"))
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / PromptBudgetConstants.CHARS_PER_TOKEN) if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, preferring a word boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, int(max_tokens * PromptBudgetConstants.CHARS_PER_TOKEN) - len(PromptBudgetConstants.TRUNCATION_MARK))
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    if space > limit * 0.8:
+        cut = cut[:space]
+    return cut.rstrip() + PromptBudgetConstants.TRUNCATION_MARK
+
+
+@dataclass
+class ContextItem:
+    """A candidate context block; tokens is precomputed at index time when known"""
+    text: str
+    score: float = 0.0
+    tokens: Optional[int] = None
+
+    def __post_init__(self):
+        if self.tokens is None:
+            self.tokens = estimate_tokens(self.text)
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    tokens: int
+    context_used: int = 0
+    context_dropped: int = 0
+    history_used: int = 0
+    history_dropped: int = 0
+    truncated: List[str] = field(default_factory=list)
+
+
+class PromptBuilder:
+    """
+    Assemble the chat prompt within a token budget.
+
+    The instruction and (capped) question always go in. History is filled
+    newest-first up to HISTORY_SHARE of the budget; the rest goes to context
+    items in descending score order. Items that do not fit are truncated
+    when enough room is left, otherwise dropped.
+    """
+
+    def __init__(self, budget: Optional[int] = None):
+        if budget is None:
+            budget = int(os.getenv(PromptBudgetConstants.BUDGET_ENV, PromptBudgetConstants.DEFAULT_BUDGET))
+        self.budget = budget
+
+    def build(self,
+              instruction: str,
+              context_label: str,
+              question_label: str,
+              question: str,
+              context: Sequence[ContextItem],
+              history: Sequence[Tuple[str, str]] = (),
+              history_label: Optional[str] = None,
+              lang: str = PromptLabels.DEFAULT_LANG,
+              summary: str = "") -> BuiltPrompt:
+        C = PromptBudgetConstants
+        L = PromptLabels
+        if history_label is None:
+            history_label = L.pick(L.HISTORY, lang)
+        roles = L.pick(L.ROLES, lang)
+        result = BuiltPrompt(text="", tokens=0)
+
+        if estimate_tokens(question) > C.QUESTION_MAX_TOKENS:
+            question = truncate_to_tokens(question, C.QUESTION_MAX_TOKENS)
+            result.truncated.append("question")
+            PROMPT_TRIMMED.labels("question", "truncated").inc()
+
+        fixed = f"{instruction}\n\n{context_label}:\n\n\n{question_label}:\n{question}\n\n{history_label}:\n"
+        remaining = self.budget - estimate_tokens(fixed) - C.NOTE_RESERVE_TOKENS
+
+        # Geçmiş: önce (varsa) konuşma özeti, sonra en yeniden eskiye mesajlar; bütçenin bir payı kadar
+        history_lines: List[str] = []
+        history_budget = min(remaining, int(self.budget * C.HISTORY_SHARE))
+        summary_line = ""
+        if summary:
+            summary_line = f"{L.pick(L.SUMMARY, lang)}: " + truncate_to_tokens(summary, max(0, history_budget // 2))
+            cost = estimate_tokens(summary_line) + 1
+            history_budget -= cost
+            remaining -= cost
+        for i, (role, content) in enumerate(reversed(history)):
+            line = f"{roles.get(role, role)}: {content}"
+            if estimate_tokens(line) > C.HISTORY_MESSAGE_MAX_TOKENS:
+                line = truncate_to_tokens(line, C.HISTORY_MESSAGE_MAX_TOKENS)
+                PROMPT_TRIMMED.labels("history", "truncated").inc()
+            cost = estimate_tokens(line) + 1
+            if cost > history_budget:
+                if history_budget >= C.MIN_PARTIAL_TOKENS:
+                    line = truncate_to_tokens(line, history_budget - 1)
+                    cost = estimate_tokens(line) + 1
+                    PROMPT_TRIMMED.labels("history", "truncated").inc()
+                else:
+                    result.history_dropped = len(history) - i
+                    PROMPT_TRIMMED.labels("history", "dropped").inc(result.history_dropped)
+                    break
+            history_lines.append(line)
+            history_budget -= cost
+            remaining -= cost
+        history_lines.reverse()
+        if result.history_dropped:
+            history_lines.insert(0, L.pick(L.DROPPED, lang).format(n=result.history_dropped))
+            result.truncated.append("history")
+        if summary_line:
+            history_lines.insert(0, summary_line)
+        result.history_used = len(history) - result.history_dropped
+
+        # Bağlam: skora göre, kalan bütçeyle
+        context_blocks: List[str] = []
+        for item in sorted(context, key=lambda c: c.score, reverse=True):
+            cost = item.tokens + 2      # "\n---\n" ayırıcı
+            text = item.text
+            if cost > remaining:
+                if remaining - 2 >= C.MIN_PARTIAL_TOKENS:
+                    text = truncate_to_tokens(text, remaining - 2)
+                    cost = estimate_tokens(text) + 2
+                    result.truncated.append("context")
+                    PROMPT_TRIMMED.labels("context", "truncated").inc()
+                else:
+                    result.context_dropped += 1
+                    PROMPT_TRIMMED.labels("context", "dropped").inc()
+                    continue
+            context_blocks.append(text)
+            remaining -= cost
+        result.context_used = len(context_blocks)
+
+        result.text = (
+            f"{instruction}\n\n"
+            f"{context_label}:\n" + "\n---\n".join(context_blocks) + "\n\n"
+            f"{question_label}:\n{question}\n\n"
+            f"{history_label}:\n" + "\n".join(history_lines)
+        )
+        result.tokens = estimate_tokens(result.text)
+        PROMPT_TOKENS.labels(lang).observe(result.tokens)
+        return result
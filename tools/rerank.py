@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.metrics import MetricsConstants, registry
+
+try:  # Opsiyonel: cross-encoder reranker sadece sentence-transformers kuruluysa
+    from sentence_transformers import CrossEncoder
+except ImportError:  # pragma: no cover
+    CrossEncoder = None
+
+
+class RerankConstants:
+    """Constants for post-retrieval re-ranking"""
+    MIN_SIMILARITY_ENV = "RETRIEVAL_MIN_SIMILARITY"
+    DEFAULT_MIN_SIMILARITY = 0.45       # embedding-001'de alakasız CV parçaları ~0.3-0.45 arası
+    RELATIVE_FLOOR_ENV = "RETRIEVAL_RELATIVE_FLOOR"
+    DEFAULT_RELATIVE_FLOOR = 0.8        # En iyi skorun bu oranının altı zayıf eşleşme sayılır; 0 = kapalı
+    MMR_LAMBDA_ENV = "RETRIEVAL_MMR_LAMBDA"
+    DEFAULT_MMR_LAMBDA = 0.7            # 1.0 = sadece alaka, 0.0 = sadece çeşitlilik
+    CANDIDATE_FACTOR = 4                # MMR, top_k * 4 aday üzerinde çalışır
+    DUPLICATE_SIMILARITY = 0.95         # Seçilmiş bir parçaya bu kadar benzeyen aday hiç alınmaz
+    MIN_RESULTS = 1                     # Eşik ne derse desin en iyi parça bağlama girer
+    RESULT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10)
+    # Cross-encoder aşaması (RERANKER_MODEL ayarlanmazsa kapalı)
+    MODEL_ENV = "RERANKER_MODEL"        # ör. cross-encoder/mmarco-mMiniLMv2-L12-H384-v1 (çok dilli, TR dahil)
+    BUDGET_MS_ENV = "RERANKER_BUDGET_MS"
+    DEFAULT_BUDGET_MS = 150
+    MIN_SCORE = 0.05                    # sigmoid(logit); altı alakasız sayılır
+    MAX_LENGTH = 256                    # (soru, parça) çifti token sınırı
+
+
+RETRIEVAL_RESULTS = registry.histogram(
+    "retrieval_results", "Chunks returned per query after threshold and MMR.", ("mode",),
+    buckets=RerankConstants.RESULT_BUCKETS)
+RERANK_REQUESTS = registry.counter(
+    "reranker_requests_total", "Cross-encoder rerank attempts by outcome.", ("outcome",))
+RERANK_LATENCY = registry.histogram(
+    "reranker_latency_seconds", "Cross-encoder forward pass latency.",
+    buckets=MetricsConstants.FAST_BUCKETS)
+
+
+def top_candidates(sims: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n highest scores, best first (argpartition, no full sort)"""
+    if n >= sims.shape[0]:
+        return np.argsort(sims)[::-1]
+    part = np.argpartition(sims, -n)[-n:]
+    return part[np.argsort(sims[part])[::-1]]
+
+
+def mmr_select(query_sims: np.ndarray,
+               vectors: np.ndarray,
+               top_k: int,
+               mmr_lambda: Optional[float] = None,
+               min_similarity: Optional[float] = None,
+               relative_floor: Optional[float] = None) -> List[Tuple[int, float]]:
+    """
+    Maximal marginal relevance over a candidate set.
+
+    query_sims are the candidates' cosine similarities to the query and
+    vectors their (unnormalized) embeddings. Candidates below the absolute
+    threshold or the relative floor are dropped first (the best one is
+    always kept); the rest are picked greedily by
+    lambda * sim(q, d) - (1 - lambda) * max sim(d, selected), with the
+    candidate-candidate similarities computed as one matrix product.
+    Near-duplicates of a picked chunk are skipped outright, so fewer than
+    top_k may come back.
+    Returns (candidate position, query similarity) pairs in pick order.
+    """
+    C = RerankConstants
+    if mmr_lambda is None:
+        mmr_lambda = float(os.getenv(C.MMR_LAMBDA_ENV, C.DEFAULT_MMR_LAMBDA))
+    if min_similarity is None:
+        min_similarity = float(os.getenv(C.MIN_SIMILARITY_ENV, C.DEFAULT_MIN_SIMILARITY))
+    if relative_floor is None:
+        relative_floor = float(os.getenv(C.RELATIVE_FLOOR_ENV, C.DEFAULT_RELATIVE_FLOOR))
+    n = query_sims.shape[0]
+    if n == 0:
+        return []
+
+    best = float(query_sims.max())
+    floor = max(min_similarity, best * relative_floor)
+    keep = np.flatnonzero(query_sims >= floor)
+    if keep.size < C.MIN_RESULTS:
+        keep = top_candidates(query_sims, C.MIN_RESULTS)
+    if keep.size <= 1:
+        return [(int(i), float(query_sims[i])) for i in keep]
+
+    sims = query_sims[keep]
+    unit = vectors[keep].astype(np.float32)
+    unit /= np.linalg.norm(unit, axis=1, keepdims=True) + 1e-8
+    pair = unit @ unit.T
+
+    selected: List[int] = []
+    # Seçilenlere en yüksek benzerlik; her seçimde tek bir vektörel maximum ile güncellenir
+    redundancy = np.full(keep.size, -np.inf, dtype=np.float32)
+    available = np.ones(keep.size, dtype=bool)
+    for _ in range(min(top_k, keep.size)):
+        if selected:
+            score = mmr_lambda * sims - (1 - mmr_lambda) * redundancy
+        else:
+            score = sims.copy()
+        score[~available | (redundancy >= C.DUPLICATE_SIMILARITY)] = -np.inf
+        pick = int(np.argmax(score))
+        if score[pick] == -np.inf:
+            break
+        selected.append(pick)
+        available[pick] = False
+        redundancy = np.maximum(redundancy, pair[pick])
+    return [(int(keep[i]), float(sims[i])) for i in selected]
+
+
+class CrossEncoderReranker:
+    """
+    Optional second-stage relevance scorer over the retrieval candidates.
+
+    The model is loaded once (in the background, so startup is not blocked)
+    and shared by all requests. All (query, chunk) pairs go through a single
+    batched forward pass on one worker thread; if it does not finish within
+    the time budget, or a previous pass is still running, score() returns
+    None and the caller keeps the bi-encoder order.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, budget_ms: Optional[float] = None):
+        C = RerankConstants
+        self.model_name = model_name if model_name is not None else os.getenv(C.MODEL_ENV, "")
+        if budget_ms is None:
+            budget_ms = float(os.getenv(C.BUDGET_MS_ENV, C.DEFAULT_BUDGET_MS))
+        self.budget = budget_ms / 1000
+        self._model = None
+        self._busy = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self.enabled:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+            self._executor.submit(self._load)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.model_name) and CrossEncoder is not None
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            self._model = CrossEncoder(self.model_name, max_length=RerankConstants.MAX_LENGTH, device="cpu")
+            print(f"Reranker '{self.model_name}' loaded ({time.perf_counter() - start:.1f}s)")
+        except Exception as e:
+            print(f"Reranker '{self.model_name}' could not be loaded: {e}")
+            self.model_name = ""
+
+    def _predict(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        try:
+            start = time.perf_counter()
+            logits = self._model.predict([(query, t) for t in texts], batch_size=len(texts),
+                                         show_progress_bar=False, convert_to_numpy=True)
+            RERANK_LATENCY.observe(time.perf_counter() - start)
+            return 1.0 / (1.0 + np.exp(-np.asarray(logits, dtype=np.float32).reshape(-1)))
+        finally:
+            self._busy.release()
+
+    def score(self, query: str, texts: Sequence[str]) -> Optional[np.ndarray]:
+        """Relevance in [0, 1] per text, or None to keep the original order"""
+        if not self.enabled or not texts:
+            return None
+        if self._model is None:
+            RERANK_REQUESTS.labels("loading").inc()
+            return None
+        # Önceki geçiş hâlâ sürüyorsa kuyruk birikmesin
+        if not self._busy.acquire(blocking=False):
+            RERANK_REQUESTS.labels("busy").inc()
+            return None
+        future = self._executor.submit(self._predict, query, texts)
+        try:
+            scores = future.result(timeout=self.budget)
+        except FutureTimeout:
+            RERANK_REQUESTS.labels("timeout").inc()
+            return None
+        except Exception as e:
+            print(f"Reranker failed: {e}")
+            RERANK_REQUESTS.labels("error").inc()
+            return None
+        RERANK_REQUESTS.labels("ok").inc()
+        return scores
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker()
+    return _reranker
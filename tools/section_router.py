@@ -0,0 +1,116 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from tools.metrics import registry
+
+_WORD_RE = re.compile(r"[0-9a-zçğıöşüâîû]+")
+
+
+class SectionRouterConstants:
+    """Constants for alias-based section routing"""
+    ENABLED_ENV = "SECTION_ROUTING"             # "0" = kapalı
+    # Sadece kısa, bölüm odaklı sorular yönlendirilir ("eğitim bilgilerin neler?");
+    # uzun / çok konulu sorular tüm matriste aranır
+    MAX_QUERY_WORDS = 7
+    MAX_SECTIONS = 2
+    MIN_STEM_LEN = 4                            # Daha kısa alias'lar sadece birebir eşleşir
+    # Yönlendirilen bölümün en iyi kosinüsü bunun altındaysa tüm matriste aranır
+    MIN_SIMILARITY_ENV = "SECTION_ROUTE_MIN_SIMILARITY"
+    DEFAULT_MIN_SIMILARITY = 0.5
+    # Alias kökü -> section. RAGSystem.alias / embeddings_data.pkl'deki tablonun genişletilmiş hali;
+    # kökler önek olarak eşleşir, böylece "eğitimin", "projelerinden" gibi ekli haller de yakalanır.
+    # Sorunun konusu olmadan da geçen genel kelimeler yok: "hakkında" ("LLM hakkında ne biliyorsun?"),
+    # "çalıştı" ("Docker ile çalıştın mı?"), "work", "dil"/"diller"/"language" ("programlama dilleri")
+    ALIASES: Dict[str, str] = {
+        "deneyim": "experience", "tecrübe": "experience", "staj": "experience",
+        "experience": "experience", "internship": "experience", "job": "experience",
+        "eğitim": "education", "okul": "education", "üniversite": "education", "mezun": "education",
+        "lisans": "education", "education": "education", "degree": "education", "university": "education",
+        "proje": "projects", "project": "projects",
+        "ödül": "awards", "yarışma": "awards", "datathon": "awards", "award": "awards",
+        "yetenek": "skills", "beceri": "skills", "yetkinlik": "skills", "skill": "skills",
+        "sertifika": "certifications", "certificat": "certifications", "kurs": "certifications",
+        "gönüllü": "volunteering", "volunteer": "volunteering",
+        "makale": "medium_articles", "medium": "medium_articles", "blog": "medium_articles",
+        "article": "medium_articles",
+        "referans": "references", "reference": "references",
+        "iletişim": "links", "linkedin": "links", "github": "links", "contact": "links",
+        "mail": "personal", "eposta": "personal", "telefon": "personal",
+        "phone": "personal", "email": "personal",
+        "kimsin": "profile", "profil": "profile",
+    }
+
+
+SECTION_ROUTES = registry.counter(
+    "retrieval_section_routes_total", "Chat queries by routed section (none = full search).", ("section",))
+SECTION_FALLBACKS = registry.counter(
+    "retrieval_section_fallbacks_total", "Routed queries re-searched over the full matrix after a weak section match.")
+
+
+@dataclass
+class Route:
+    sections: List[str] = field(default_factory=list)
+    matched: List[str] = field(default_factory=list)     # eşleşen alias'lar (trace için)
+
+    @property
+    def routed(self) -> bool:
+        return bool(self.sections)
+
+
+class SectionRouter:
+    """
+    Detects section intent in a question from the alias table.
+
+    Words are matched against alias stems by prefix (Turkish suffixes), short
+    aliases only exactly. A route is returned only for short questions that
+    hit at most MAX_SECTIONS sections; everything else falls back to a full
+    search so routing never narrows a broad question. The retriever also
+    searches the full matrix when the routed section's best similarity is
+    below min_similarity.
+    """
+
+    def __init__(self, aliases: Optional[Dict[str, str]] = None, enabled: Optional[bool] = None,
+                 min_similarity: Optional[float] = None):
+        C = SectionRouterConstants
+        if enabled is None:
+            enabled = os.getenv(C.ENABLED_ENV, "1") != "0"
+        if min_similarity is None:
+            min_similarity = float(os.getenv(C.MIN_SIMILARITY_ENV, C.DEFAULT_MIN_SIMILARITY))
+        self.enabled = enabled
+        self.min_similarity = min_similarity
+        aliases = aliases or C.ALIASES
+        self._exact = {a: s for a, s in aliases.items() if len(a) < C.MIN_STEM_LEN}
+        # Uzun kökler önce denensin (en özgül eşleşme kazanır)
+        self._stems: List[Tuple[str, str]] = sorted(
+            ((a, s) for a, s in aliases.items() if len(a) >= C.MIN_STEM_LEN), key=lambda p: -len(p[0]))
+
+    def route(self, message: str) -> Route:
+        words = _WORD_RE.findall(message.casefold().replace("e-posta", "eposta"))
+        if not self.enabled or not words or len(words) > SectionRouterConstants.MAX_QUERY_WORDS:
+            SECTION_ROUTES.labels("none").inc()
+            return Route()
+
+        route = Route()
+        for word in words:
+            section = self._exact.get(word)
+            alias = word
+            if section is None:
+                for stem, stem_section in self._stems:
+                    if word.startswith(stem):
+                        section, alias = stem_section, stem
+                        break
+            if section is not None:
+                route.matched.append(alias)
+                if section not in route.sections:
+                    route.sections.append(section)
+
+        if len(route.sections) > SectionRouterConstants.MAX_SECTIONS:
+            route = Route(matched=route.matched)
+        for section in route.sections or ["none"]:
+            SECTION_ROUTES.labels(section).inc()
+        return route
+
+
+section_router = SectionRouter()
@@ -1,12 +1,267 @@
 import requests
 import feedparser
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 import streamlit as st
 import re
 import time
 import hashlib
-from bs4 import BeautifulSoup
+import json
+import os
+import threading
+import html
+from concurrent.futures import wait
+from pathlib import Path
+from tools.thumbnail_cache import get_thumbnail_cache, thumbnail_proxy_url
+from tools.post_index import PostIndex
+
+
+# RSS içerik taraması için derlenmiş regex'ler (entry başına HTML parser yok)
+_IMG_SRC_RE = re.compile(r'<img\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_READING_TIME_RE = re.compile(r'(\d+)\s*min\s*read', re.IGNORECASE)
+_POST_ID_RE = re.compile(r'-([a-f0-9]{12,})$')
+_GUESSED_IMAGE_URL = "https://miro.medium.com/v2/resize:fit:1200/1*{post_id}.jpeg"
+
+
+class FeedCacheConstants:
+    """Constants for the shared Medium feed cache"""
+    TTL_SECONDS = 1800           # Bu süreden eski veri "stale" sayılır
+    REFRESH_INTERVAL = 900       # Arka plan yenileme periyodu
+    COLD_RETRY_SECONDS = 60      # Hiç veri yokken başarısız fetch sonrası bekleme
+    FETCH_TIMEOUT = 10
+    MAX_ENTRIES = 20
+    SUMMARY_CHARS = 600
+    DISK_DIR_ENV = "MEDIUM_FEED_CACHE_DIR"
+    THUMBNAIL_CHECK_WAIT = 6     # Tahmini görsel kontrolleri için yayın öncesi en fazla bekleme (sn)
+
+
+class MediumFeedCache:
+    """
+    Process-wide Medium RSS cache shared by every session.
+
+    A daemon thread re-pulls the feed on a schedule with conditional GET
+    (ETag / Last-Modified), so request paths only read the warm cache. Stale
+    data keeps being served while a refresh runs or when the feed is down
+    (stale-while-revalidate). Optionally persisted to disk so a restarted
+    process starts warm.
+    """
+
+    def __init__(self,
+                 feed_url: str,
+                 processor: Callable[[List[Any]], List[Dict[str, Any]]],
+                 ttl: float = FeedCacheConstants.TTL_SECONDS,
+                 refresh_interval: float = FeedCacheConstants.REFRESH_INTERVAL,
+                 disk_path: Optional[Path] = None):
+        self.feed_url = feed_url
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.disk_path = disk_path
+        self._processor = processor
+        self._posts: List[Dict[str, Any]] = []
+        self._etag: Optional[str] = None
+        self._modified: Optional[str] = None
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._http = requests.Session()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._load_from_disk()
+
+    # -- read path -------------------------------------------------------
+
+    def get_posts(self) -> List[Dict[str, Any]]:
+        """Return cached posts; never waits on the network once warm"""
+        self.start_refresher()
+        if not self._fetched_at:
+            # Soğuk başlangıç: tek bir fetch, eşzamanlı ziyaretçiler onu bekler
+            if time.time() - self._last_attempt >= FeedCacheConstants.COLD_RETRY_SECONDS:
+                self.refresh(wait=True)
+        elif self.is_stale():
+            self.refresh_async()
+        return self._posts
+
+    def is_stale(self) -> bool:
+        return (time.time() - self._fetched_at) > self.ttl
+
+    # -- refresh ---------------------------------------------------------
+
+    def refresh(self, wait: bool = False) -> bool:
+        """Re-pull the feed (conditional GET). Only one refresh runs at a time."""
+        if not self._refresh_lock.acquire(blocking=wait):
+            return False
+        try:
+            if wait and self._fetched_at and not self.is_stale():
+                return True  # Beklerken başka bir thread yeniledi
+            return self._fetch()
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_async(self) -> None:
+        threading.Thread(target=self.refresh, name="medium-feed-refresh", daemon=True).start()
+
+    def start_refresher(self) -> None:
+        if self._refresher is not None:
+            return
+        with self._start_lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="medium-feed-refresher", daemon=True)
+            self._refresher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def on_update(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """
+        listener(posts) runs on a background thread whenever a fetch brings new
+        posts (and once right away if the cache is already warm), never on the
+        request path.
+        """
+        self._listeners.append(listener)
+        if self._posts:
+            self._notify_async([listener])
+
+    def _notify_async(self, listeners: List[Callable[[List[Dict[str, Any]]], None]]) -> None:
+        posts = self._posts
+
+        def _run():
+            for listener in listeners:
+                try:
+                    listener(posts)
+                except Exception as e:
+                    print(f"Medium feed listener failed: {e}")
+
+        threading.Thread(target=_run, name="medium-feed-listeners", daemon=True).start()
+
+    def invalidate(self) -> None:
+        """Drop validators so the next refresh downloads the full feed"""
+        self._etag = None
+        self._modified = None
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def _fetch(self) -> bool:
+        self._last_attempt = time.time()
+        headers = {"User-Agent": "PortfolioChatbot/1.0 (+https://portfoli-chatbot.vercel.app)"}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._modified:
+            headers["If-Modified-Since"] = self._modified
+        try:
+            resp = self._http.get(self.feed_url, headers=headers, timeout=FeedCacheConstants.FETCH_TIMEOUT)
+            if resp.status_code == 304 and self._posts:
+                self._fetched_at = time.time()
+                self._save_to_disk()
+                return True
+            resp.raise_for_status()
+            feed = feedparser.parse(resp.content)
+            posts = self._processor(feed.entries[:FeedCacheConstants.MAX_ENTRIES])
+        except Exception as e:
+            # Feed yavaş/erişilemez: eski veriyi sunmaya devam et
+            print(f"Medium feed refresh failed: {e}")
+            return False
+
+        if not posts and self._posts:
+            return False
+        self._posts = posts
+        self._etag = resp.headers.get("ETag")
+        self._modified = resp.headers.get("Last-Modified")
+        self._fetched_at = time.time()
+        self._save_to_disk()
+        if self._listeners:
+            # Soğuk fetch istek thread'inde olabilir; dinleyiciler (ör. embedding) onu bekletmez
+            self._notify_async(list(self._listeners))
+        return True
+
+    # -- disk persistence ------------------------------------------------
+
+    def _load_from_disk(self) -> None:
+        if not self.disk_path or not self.disk_path.exists():
+            return
+        try:
+            with open(self.disk_path, encoding="utf-8") as f:
+                data = json.load(f)
+            posts = data.get("posts") or []
+            for post in posts:
+                if post.get("published_date"):
+                    post["published_date"] = datetime.fromisoformat(post["published_date"])
+            self._posts = posts
+            self._etag = data.get("etag")
+            self._modified = data.get("modified")
+            self._fetched_at = float(data.get("fetched_at") or 0.0)
+        except Exception as e:
+            print(f"Medium feed disk cache unreadable: {e}")
+
+    def _save_to_disk(self) -> None:
+        if not self.disk_path:
+            return
+        try:
+            posts = [
+                dict(p, published_date=p["published_date"].isoformat() if p.get("published_date") else None)
+                for p in self._posts
+            ]
+            data = {
+                "feed_url": self.feed_url,
+                "etag": self._etag,
+                "modified": self._modified,
+                "fetched_at": self._fetched_at,
+                "posts": posts,
+            }
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.disk_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.disk_path)
+        except Exception as e:
+            print(f"Medium feed disk cache write failed: {e}")
+
+
+_feed_caches: Dict[str, MediumFeedCache] = {}
+_feed_caches_lock = threading.Lock()
+
+
+def get_medium_feed_cache(username: str,
+                          processor: Callable[[List[Any]], List[Dict[str, Any]]]) -> MediumFeedCache:
+    """Return the process-wide feed cache for a Medium user (created once)"""
+    with _feed_caches_lock:
+        cache = _feed_caches.get(username)
+        if cache is None:
+            disk_dir = os.getenv(FeedCacheConstants.DISK_DIR_ENV)
+            cache = MediumFeedCache(
+                f"https://medium.com/@{username}/feed",
+                processor,
+                disk_path=Path(disk_dir) / f"medium_{username}.json" if disk_dir else None,
+            )
+            _feed_caches[username] = cache
+        return cache
+
+
+_post_indexes: Dict[str, PostIndex] = {}
+
+
+def get_medium_post_index(username: str, feed_cache: MediumFeedCache) -> PostIndex:
+    """
+    Return the process-wide semantic index over a Medium user's posts.
+
+    The index follows the feed cache: every refresh syncs it on a background
+    thread (only new / changed posts are embedded).
+    """
+    with _feed_caches_lock:
+        index = _post_indexes.get(username)
+        if index is None:
+            disk_dir = os.getenv(FeedCacheConstants.DISK_DIR_ENV)
+            index = PostIndex(disk_path=Path(disk_dir) / f"medium_{username}_index.pkl" if disk_dir else None)
+            _post_indexes[username] = index
+            feed_cache.on_update(index.sync)
+        return index
 
 
 class SocialMediaAggregator:
@@ -14,123 +269,152 @@ class SocialMediaAggregator:
     
     def __init__(self):
         self.medium_username = "betularsln01"
-        self.cache_duration = 1800
+        self.feed_cache = get_medium_feed_cache(self.medium_username, self._build_posts)
+        self.post_index = get_medium_post_index(self.medium_username, self.feed_cache)
         
     def get_medium_posts(self, limit: int = 6) -> List[Dict[str, Any]]:
-        """Fetch Medium posts with real images"""
+        """Fetch Medium posts with real images (served from the shared feed cache)"""
         try:
-            rss_url = f"https://medium.com/@{self.medium_username}/feed"
+            posts = self.feed_cache.get_posts()
+            if not posts:
+                return self._get_demo_posts()
             
-            # Check cache
-            cache_key = f"medium_posts_{self.medium_username}"
-            if self._is_cache_valid(cache_key):
-                return st.session_state.get(cache_key, [])
-            
-            feed = feedparser.parse(rss_url)
-            posts = []
-            
-            for i, entry in enumerate(feed.entries[:limit]):
-                # Simple processing
-                pub_date = entry.get('published_parsed')
-                # Handle if pub_date is a list (should not be, but linter warns)
-                if pub_date and not isinstance(pub_date, list) and hasattr(pub_date, 'tm_year'):
-                    pub_datetime = datetime(pub_date.tm_year, pub_date.tm_mon, pub_date.tm_mday, pub_date.tm_hour, pub_date.tm_min, pub_date.tm_sec)
-                    time_ago = self._get_time_ago(pub_datetime)
-                else:
-                    time_ago = "Recent"
-                    pub_datetime = datetime.now()
-                # Ensure title is a string
-                title = str(entry.title) if hasattr(entry, 'title') else "Untitled"
-                
-                # Extract real image from Medium post
-                image_url = self._extract_medium_image(entry)
-                
-                # Extract reading time if available
-                reading_time = self._extract_reading_time(entry)
-                
-                posts.append({
-                    'platform': 'Medium',
-                    'title': title.strip(),
-                    'url': entry.link,
-                    'published': time_ago,
-                    'published_date': pub_datetime,
-                    'thumbnail': image_url,
-                    'reading_time': reading_time,
-                    'author': 'Fatma Betül ARSLAN'
-                })
-            
-            # Cache results
-            st.session_state[cache_key] = posts
-            st.session_state[f"{cache_key}_timestamp"] = time.time()
-            
-            return posts
+            # "x gün önce" okuma anında hesaplanır, cache'teki kayıtlar değişmez
+            return [self._with_display_fields(post) for post in posts[:limit]]
             
         except Exception as e:
             st.error(f"Error: {e}")
             return self._get_demo_posts()
     
-    def _extract_medium_image(self, entry) -> str:
-        """Extract real image from Medium RSS entry"""
+    def search_posts(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Rank cached posts by semantic similarity to a topic query"""
+        if not query or not query.strip():
+            return self.get_medium_posts(limit)
         try:
-            # Method 1: Check media_thumbnail
-            if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-                return entry.media_thumbnail[0]['url']
-            
-            # Method 2: Check enclosures for images
-            if hasattr(entry, 'enclosures') and entry.enclosures:
-                for enclosure in entry.enclosures:
-                    if 'image' in enclosure.get('type', ''):
-                        return enclosure['href']
-            
-            # Method 3: Parse content for images
-            content = entry.get('summary', '') or entry.get('content', [{}])[0].get('value', '')
-            if content:
-                soup = BeautifulSoup(content, 'html.parser')
-                img_tags = soup.find_all('img')
-                for img in img_tags:
-                    src = img.get('src', '')
-                    if 'medium.com' in src and src.startswith('http'):
-                        return src
-            
-            # Method 4: Try to get from Medium API-like URL
-            post_id = self._extract_post_id_from_url(entry.link)
-            if post_id:
-                possible_img = f"https://miro.medium.com/v2/resize:fit:1200/1*{post_id}.jpeg"
-                return possible_img
-            
+            # Index arka planda senkronlanır (on_update); burada sadece okunur
+            self.feed_cache.get_posts()
+            if not len(self.post_index):
+                # Soğuk süreç / ilk sync sürüyor: "0 yazı" yerine son yazıları göster
+                return self.get_medium_posts(limit)
+            return [self._with_display_fields(post) for post, _ in self.post_index.search(query, top_k=limit)]
         except Exception as e:
-            print(f"Error extracting image: {e}")
+            print(f"Post search failed: {e}")
+            return self.get_medium_posts(limit)
+    
+    def _with_display_fields(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        # "x gün önce" okuma anında hesaplanır, cache'teki kayıtlar değişmez
+        return dict(
+            post,
+            published=self._get_time_ago(post['published_date']) if post.get('published_date') else "Recent",
+            published_date=post.get('published_date') or datetime.now(),
+        )
+    
+    def _build_posts(self, entries: List[Any]) -> List[Dict[str, Any]]:
+        """Normalize feed entries into post dicts (runs on the refresher thread)"""
+        posts = []
+        for entry in entries:
+            try:
+                posts.append(self._normalize_entry(entry))
+            except Exception as e:
+                print(f"Error normalizing feed entry: {e}")
+        self._validate_guessed_thumbnails(posts)
+        return posts
+    
+    def _validate_guessed_thumbnails(self, posts: List[Dict[str, Any]]) -> None:
+        """
+        Guessed miro.medium.com URLs often 404. Check them in parallel and swap
+        unreachable ones for the generated card image before the posts are
+        published, so cached (and persisted) post dicts are never mutated.
+
+        Checks still running after THUMBNAIL_CHECK_WAIT keep their guess; they
+        finish in the background and their negative cache entry makes the next
+        refresh swap the image right away.
+        """
+        guessed = [p for p in posts if p.get('post_id') and
+                   p['thumbnail'] == _GUESSED_IMAGE_URL.format(post_id=p['post_id'])]
+        if not guessed:
+            return
+        checks = get_thumbnail_cache().validate_async(p['thumbnail'] for p in guessed)
+        wait(checks.values(), timeout=FeedCacheConstants.THUMBNAIL_CHECK_WAIT)
+        for post in guessed:
+            check = checks[post['thumbnail']]
+            if check.done() and check.exception() is None and not check.result():
+                post['thumbnail'] = self._create_card_image(post['title'], 0)
+    
+    def _normalize_entry(self, entry) -> Dict[str, Any]:
+        """
+        Single pass over one RSS entry: image, reading time, post id and plain
+        text are all derived from the same content string with precompiled
+        regexes (no HTML parser per entry).
+        """
+        pub_date = entry.get('published_parsed')
+        # Handle if pub_date is a list (should not be, but linter warns)
+        if pub_date and not isinstance(pub_date, list) and hasattr(pub_date, 'tm_year'):
+            pub_datetime = datetime(pub_date.tm_year, pub_date.tm_mon, pub_date.tm_mday, pub_date.tm_hour, pub_date.tm_min, pub_date.tm_sec)
+        else:
+            pub_datetime = None
+        # Ensure title is a string
+        title = str(entry.get('title') or "Untitled").strip()
+        link = str(entry.get('link') or "")
+        
+        content = entry.get('summary', '') or (entry.get('content') or [{}])[0].get('value', '')
+        # Etiketleri at, whitespace'i normalize et; kelime listesi okuma süresi için de kullanılır
+        words = html.unescape(_TAG_RE.sub(' ', content)).split() if content else []
+        plain_text = ' '.join(words)
+        post_id = self._extract_post_id_from_url(link)
+        
+        return {
+            'platform': 'Medium',
+            'title': title,
+            'url': link,
+            'published_date': pub_datetime,
+            'thumbnail': self._extract_medium_image(entry, content, post_id, title),
+            'reading_time': self._extract_reading_time(plain_text, len(words)),
+            'post_id': post_id,
+            'summary': plain_text[:FeedCacheConstants.SUMMARY_CHARS],
+            'tags': [str(t.get('term')) for t in entry.get('tags') or [] if t.get('term')],
+            'author': 'Fatma Betül ARSLAN'
+        }
+    
+    def _extract_medium_image(self, entry, content: str, post_id: Optional[str], title: str) -> str:
+        """Extract real image from Medium RSS entry"""
+        # Method 1: Check media_thumbnail
+        media_thumbnail = entry.get('media_thumbnail')
+        if media_thumbnail and media_thumbnail[0].get('url'):
+            return media_thumbnail[0]['url']
+        
+        # Method 2: Check enclosures for images
+        for enclosure in entry.get('enclosures') or []:
+            if 'image' in enclosure.get('type', '') and enclosure.get('href'):
+                return enclosure['href']
+        
+        # Method 3: First Medium-hosted <img> in the content
+        if content:
+            for match in _IMG_SRC_RE.finditer(content):
+                src = html.unescape(match.group(1))
+                if 'medium.com' in src and src.startswith('http'):
+                    return src
+        
+        # Method 4: Try to get from Medium API-like URL
+        if post_id:
+            return _GUESSED_IMAGE_URL.format(post_id=post_id)
         
-        return self._create_card_image(entry.title, 0)
+        return self._create_card_image(title, 0)
     
     def _extract_post_id_from_url(self, url: str) -> Optional[str]:
         """Extract post ID from Medium URL"""
-        try:
-            import re
-            match = re.search(r'-([a-f0-9]{12,})$', url)
-            if match:
-                return match.group(1)[:12]
-        except:
-            pass
-        return None
+        match = _POST_ID_RE.search(url or "")
+        return match.group(1)[:12] if match else None
     
-    def _extract_reading_time(self, entry) -> str:
-        """Extract reading time from Medium entry"""
-        try:
-            content = entry.get('summary', '') or entry.get('content', [{}])[0].get('value', '')
-            if content:
-                import re
-                reading_time_match = re.search(r'(\d+)\s*min\s*read', content, re.IGNORECASE)
-                if reading_time_match:
-                    return f"{reading_time_match.group(1)} min"
-            
-            if content:
-                word_count = len(content.split())
-                estimated_time = max(1, word_count // 200)
-                return f"{estimated_time} min"
-        except:
-            pass
-        return "5 min"
+    def _extract_reading_time(self, plain_text: str, word_count: int) -> str:
+        """Extract reading time from whitespace-normalized entry text"""
+        if not plain_text:
+            return "5 min"
+        # Regex orijinal metinde çalışır: lower() "İ" gibi harflerde uzunluğu değiştirir
+        reading_time_match = _READING_TIME_RE.search(plain_text)
+        if reading_time_match:
+            return f"{reading_time_match.group(1)} min"
+        return f"{max(1, word_count // 200)} min"
     
     def _create_card_image(self, title: str, index: int) -> str:
         """Create beautiful gradient images"""
@@ -193,14 +477,6 @@ class SocialMediaAggregator:
             }
         ]
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check cache validity"""
-        timestamp_key = f"{cache_key}_timestamp"
-        if timestamp_key not in st.session_state:
-            return False
-        last_update = st.session_state[timestamp_key]
-        return (time.time() - last_update) < self.cache_duration
-    
     def _get_time_ago(self, pub_date: datetime) -> str:
         """Simple time ago calculation"""
         now = datetime.now()
@@ -427,7 +703,7 @@ class SocialMediaAggregator:
                 
                 card_html = f"""
                 <div class="responsive-card">
-                    <img src="{post['thumbnail']}" 
+                    <img src="{thumbnail_proxy_url(post['thumbnail'])}" 
                          class="card-img" 
                          alt="{safe_title}"
                          loading="lazy"
@@ -484,14 +760,14 @@ class SocialMediaAggregator:
         return formatted
     
     def get_post_summary(self, query: str, posts: List[Dict[str, Any]], language: str = "en") -> str:
-        """Simple search"""
+        """Posts most relevant to the query, formatted for chat"""
+        matches = self.search_posts(query, limit=3) if query else []
+        if matches:
+            return self.format_posts_for_chat(matches, language)
         if not posts:
             return "📭 No posts available"
         return self.format_posts_for_chat(posts[:3], language)
     
     def clear_cache(self) -> None:
         """Clear cache"""
-        keys_to_remove = [key for key in st.session_state.keys() 
-                         if isinstance(key, str) and key.startswith('medium_posts_')]
-        for key in keys_to_remove:
-            del st.session_state[key]
\ No newline at end of file
+        self.feed_cache.invalidate()
@@ -0,0 +1,196 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from tools.cv_index import CVIndex, CVIndexManager
+from tools.metrics import registry
+
+
+class TenantConstants:
+    """Constants for multi-tenant portfolio indexes"""
+    DEFAULT_TENANT = "default"
+    DIR_ENV = "PORTFOLIO_TENANTS_DIR"            # <dir>/<tenant>/cv.json + embeddings_data.pkl
+    HOSTS_ENV = "PORTFOLIO_TENANT_HOSTS"         # "ali.example.com=ali,ayse.example.com=ayse"
+    MAX_RESIDENT_ENV = "TENANT_MAX_RESIDENT"
+    MAX_RESIDENT_MB_ENV = "TENANT_MAX_RESIDENT_MB"
+    DEFAULT_MAX_RESIDENT = 64
+    DEFAULT_MAX_RESIDENT_MB = 256                # mmap'li matrisler bu sınıra dahil değil
+    CHECK_SECONDS = 30.0                         # Erişimde dosya değişikliği kontrol aralığı
+    CV_FILE = "cv.json"
+    EMBEDDINGS_FILE = "embeddings_data.pkl"
+    HEADER = "x-tenant"
+    PATH_PREFIX = "/t/"                          # /t/<tenant>/api/chat -> /api/chat
+    ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+TENANT_LOADS = registry.counter(
+    "tenant_index_loads_total", "Tenant index residency events.", ("event",))
+TENANTS_RESIDENT = registry.gauge(
+    "tenant_indexes_resident", "Tenant indexes currently held in memory.")
+TENANTS_RESIDENT_BYTES = registry.gauge(
+    "tenant_indexes_resident_bytes", "Approximate heap held by resident tenant indexes.")
+
+
+class UnknownTenant(KeyError):
+    pass
+
+
+def _parse_host_map(raw: str) -> Dict[str, str]:
+    hosts = {}
+    for pair in (raw or "").split(","):
+        host, _, tenant = pair.partition("=")
+        if host.strip() and tenant.strip():
+            hosts[host.strip().lower()] = tenant.strip()
+    return hosts
+
+
+class TenantRegistry:
+    """
+    Maps a tenant id to its own CVIndex, loaded lazily and kept in an LRU.
+
+    The default tenant is the repo's own CV (the hot-reloading manager the
+    server already runs) and is never evicted. Other tenants live under
+    PORTFOLIO_TENANTS_DIR/<tenant>/ and are loaded on first request with
+    memory-mapped matrices; residency is bounded both by count and by
+    approximate heap bytes, and file changes are picked up on access at most
+    every CHECK_SECONDS (no watcher thread per tenant).
+    """
+
+    def __init__(self, default: CVIndexManager,
+                 base_dir: Optional[Path] = None,
+                 max_resident: Optional[int] = None,
+                 max_resident_bytes: Optional[int] = None):
+        C = TenantConstants
+        if base_dir is None and os.getenv(C.DIR_ENV):
+            base_dir = Path(os.getenv(C.DIR_ENV))
+        if max_resident is None:
+            max_resident = int(os.getenv(C.MAX_RESIDENT_ENV, C.DEFAULT_MAX_RESIDENT))
+        if max_resident_bytes is None:
+            max_resident_bytes = int(float(os.getenv(C.MAX_RESIDENT_MB_ENV, C.DEFAULT_MAX_RESIDENT_MB)) * 1024 * 1024)
+        self.default = default
+        self.base_dir = Path(base_dir) if base_dir else None
+        self.max_resident = max_resident
+        self.max_resident_bytes = max_resident_bytes
+        self.hosts = _parse_host_map(os.getenv(C.HOSTS_ENV, ""))
+        self._lock = threading.Lock()
+        self._resident: "OrderedDict[str, CVIndexManager]" = OrderedDict()
+        # tenant -> snapshot boyutu; toplam kilit altında artımlı tutulur (her seferinde toplanmaz)
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        # Aynı tenant'ın eşzamanlı ilk istekleri tek yükleme yapsın
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def resolve(self, path: str, host: Optional[str], header: Optional[str]) -> Tuple[str, str]:
+        """(tenant id, path without the /t/<tenant> prefix)"""
+        C = TenantConstants
+        if path.startswith(C.PATH_PREFIX):
+            tenant, _, rest = path[len(C.PATH_PREFIX):].partition("/")
+            return tenant, "/" + rest
+        if header:
+            return header.strip(), path
+        if host:
+            tenant = self.hosts.get(host.split(":", 1)[0].lower())
+            if tenant:
+                return tenant, path
+        return C.DEFAULT_TENANT, path
+
+    def _tenant_dir(self, tenant: str) -> Path:
+        if tenant == TenantConstants.DEFAULT_TENANT or not TenantConstants.ID_RE.match(tenant) or self.base_dir is None:
+            raise UnknownTenant(tenant)
+        tenant_dir = self.base_dir / tenant
+        if not (tenant_dir / TenantConstants.CV_FILE).exists():
+            raise UnknownTenant(tenant)
+        return tenant_dir
+
+    def get(self, tenant: str) -> CVIndex:
+        """Current index snapshot for tenant; raises UnknownTenant"""
+        if tenant == TenantConstants.DEFAULT_TENANT:
+            return self.default.current
+
+        with self._lock:
+            known = tenant in self._resident
+        if not known:
+            # Geçersiz id'ler için kilit/yükleme durumu oluşturma
+            self._tenant_dir(tenant)
+        with self._lock:
+            manager = self._resident.get(tenant)
+            if manager is not None:
+                self._resident.move_to_end(tenant)
+            load_lock = self._loading.setdefault(tenant, threading.Lock()) if manager is None else None
+
+        if manager is None:
+            with load_lock:
+                with self._lock:
+                    manager = self._resident.get(tenant)
+                if manager is None:
+                    manager = self._load(tenant)
+        elif time.monotonic() - manager.last_checked > TenantConstants.CHECK_SECONDS:
+            if manager.reload():
+                with self._lock:
+                    if self._resident.get(tenant) is manager:
+                        self._account_locked(tenant, manager.current.resident_bytes)
+                        self._evict_locked()
+        return manager.current
+
+    def _load(self, tenant: str) -> CVIndexManager:
+        try:
+            tenant_dir = self._tenant_dir(tenant)
+            start = time.perf_counter()
+            manager = CVIndexManager(tenant_dir / TenantConstants.CV_FILE,
+                                     tenant_dir / TenantConstants.EMBEDDINGS_FILE,
+                                     poll_seconds=0, mmap=True, publish_metrics=False)
+            TENANT_LOADS.labels("load").inc()
+            print(f"Tenant '{tenant}' loaded: {len(manager.current.chunks)} chunks "
+                  f"({(time.perf_counter() - start) * 1000:.0f}ms)")
+            with self._lock:
+                self._resident[tenant] = manager
+                self._account_locked(tenant, manager.current.resident_bytes)
+                self._evict_locked()
+            return manager
+        finally:
+            with self._lock:
+                self._loading.pop(tenant, None)
+
+    def _account_locked(self, tenant: str, size: int) -> None:
+        self._total_bytes += size - self._sizes.get(tenant, 0)
+        self._sizes[tenant] = size
+
+    def _evict_locked(self) -> None:
+        # En son yüklenen tenant tek başına sınırı aşsa da tutulur
+        while len(self._resident) > 1 and (len(self._resident) > self.max_resident
+                                           or self._total_bytes > self.max_resident_bytes):
+            tenant, _ = self._resident.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(tenant, 0)
+            TENANT_LOADS.labels("evict").inc()
+        TENANTS_RESIDENT.set(len(self._resident))
+        TENANTS_RESIDENT_BYTES.set(self._total_bytes)
+
+
+class TenantMiddleware:
+    """
+    Pure ASGI middleware resolving the tenant of a request.
+
+    Strips a /t/<tenant> path prefix (so routes stay unchanged) and stores the
+    tenant id in scope["state"]["tenant"]; handlers read request.state.tenant.
+    """
+
+    def __init__(self, app, tenants: TenantRegistry):
+        self.app = app
+        self.tenants = tenants
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        host = headers.get(b"host", b"").decode("latin-1") or None
+        header = headers.get(TenantConstants.HEADER.encode(), b"").decode("latin-1") or None
+        tenant, path = self.tenants.resolve(scope["path"], host, header)
+        if path != scope["path"]:
+            scope = dict(scope, path=path, raw_path=path.encode("utf-8"))
+        scope.setdefault("state", {})["tenant"] = tenant
+        await self.app(scope, receive, send)
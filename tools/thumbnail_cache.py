@@ -0,0 +1,275 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlparse
+
+import requests
+from PIL import Image as PILImage, ImageOps
+
+
+class ThumbnailConstants:
+    """Constants for the blog card thumbnail proxy"""
+    CARD_WIDTH = 480             # .card-img ~240px, 2x DPR için
+    CARD_HEIGHT = 240
+    WEBP_QUALITY = 80
+    JPEG_QUALITY = 82
+    FETCH_TIMEOUT = 8
+    VALIDATE_TIMEOUT = 4
+    MAX_SOURCE_BYTES = 10 * 1024 * 1024
+    MISSING_TTL_SECONDS = 6 * 3600   # 404 olan (tahmini) URL'ler bu süre tekrar denenmez
+    VALIDATE_WORKERS = 4
+    ALLOWED_HOST = "miro.medium.com"
+    # miro görsel yolları: /v2/resize:fit:1200/1*abc.jpeg, /max/1024/0*xyz.png ...
+    ALLOWED_PATH_RE = re.compile(r"^/(?:[A-Za-z0-9:,._=-]+/){0,4}[0-9]\*[A-Za-z0-9_-]{4,128}(?:\.(?:jpe?g|png|gif|webp))?$")
+    MAX_URL_CHARS = 512
+    CACHE_DIR_ENV = "THUMBNAIL_CACHE_DIR"
+    MAX_CACHE_MB_ENV = "THUMBNAIL_CACHE_MAX_MB"
+    DEFAULT_MAX_CACHE_MB = 256
+    MAX_CACHE_FILES = 20000              # .missing işaretleri 0 bayt; dosya sayısı da sınırlı
+    PRUNE_TARGET = 0.8                   # Sınır aşılınca en eski dosyalar bu orana kadar silinir
+    LOCK_STRIPES = 64
+    FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+
+
+class ThumbnailCache:
+    """
+    Fetch-once, resize-once cache for Medium card thumbnails.
+
+    Each source image is downloaded a single time, fitted to card size with
+    Pillow and stored on disk as WebP and JPEG variants. Unreachable URLs
+    (typically guessed miro.medium.com paths) are remembered for a while so
+    they are not re-fetched on every card render.
+
+    The endpoint is public, so only miro.medium.com image paths are accepted,
+    the directory is capped by bytes and file count (least recently used
+    files are evicted) and per-URL work is serialized on a fixed set of
+    striped locks.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None,
+                 max_files: int = ThumbnailConstants.MAX_CACHE_FILES):
+        C = ThumbnailConstants
+        default_dir = Path(tempfile.gettempdir()) / "portfolio_thumbnails"
+        self.cache_dir = Path(cache_dir or os.getenv(C.CACHE_DIR_ENV) or default_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv(C.MAX_CACHE_MB_ENV, C.DEFAULT_MAX_CACHE_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._http = requests.Session()
+        self._http.headers["User-Agent"] = "PortfolioChatbot/1.0 (+https://portfoli-chatbot.vercel.app)"
+        self._stripes = [threading.Lock() for _ in range(C.LOCK_STRIPES)]
+        self._usage_lock = threading.Lock()
+        entries = self._scan()
+        self._bytes = sum(size for _, _, size in entries)
+        self._files = len(entries)
+        self._validator = ThreadPoolExecutor(
+            max_workers=ThumbnailConstants.VALIDATE_WORKERS, thread_name_prefix="thumb-validate"
+        )
+
+    @staticmethod
+    def is_allowed(url: str) -> bool:
+        """Only proxy https image paths on miro.medium.com"""
+        if not url or len(url) > ThumbnailConstants.MAX_URL_CHARS:
+            return False
+        parsed = urlparse(url)
+        return (parsed.scheme == "https"
+                and (parsed.hostname or "").lower() == ThumbnailConstants.ALLOWED_HOST
+                and parsed.port is None and not parsed.query and not parsed.fragment
+                and not parsed.username and not parsed.password
+                and ".." not in parsed.path
+                and bool(ThumbnailConstants.ALLOWED_PATH_RE.match(parsed.path)))
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+    def variant_path(self, url: str, fmt: str) -> Path:
+        ext = "jpg" if fmt == "jpeg" else fmt
+        return self.cache_dir / f"{self.key_for(url)}.{ext}"
+
+    def get_variant(self, url: str, fmt: str = "webp") -> Optional[Path]:
+        """
+        Return the on-disk card-size variant, fetching and resizing on first use.
+
+        Returns None when the URL is not allowed, unreachable or not an image.
+        """
+        if fmt not in ThumbnailConstants.FORMATS or not self.is_allowed(url):
+            return None
+        path = self.variant_path(url, fmt)
+        if self._touch(path):
+            return path
+        if self.is_missing(url):
+            return None
+
+        with self._lock_for(url):
+            if path.exists():
+                return path
+            if not self._fetch_and_store(url):
+                return None
+        return path if path.exists() else None
+
+    def is_missing(self, url: str) -> bool:
+        marker = self._missing_marker(url)
+        try:
+            return (time.time() - marker.stat().st_mtime) < ThumbnailConstants.MISSING_TTL_SECONDS
+        except FileNotFoundError:
+            return False
+
+    def is_reachable(self, url: str) -> bool:
+        """HEAD check used for guessed URLs; failures are negatively cached"""
+        if not self.is_allowed(url) or self.is_missing(url):
+            return False
+        if self.variant_path(url, "jpeg").exists():
+            return True
+        try:
+            resp = self._http.head(url, timeout=ThumbnailConstants.VALIDATE_TIMEOUT, allow_redirects=True)
+            ok = resp.ok and resp.headers.get("Content-Type", "").startswith("image/")
+        except requests.RequestException:
+            return False  # Geçici ağ hatası: negatif cache'e yazma
+        if not ok:
+            self._mark_missing(url)
+        return ok
+
+    def validate_async(self, urls: Iterable[str]) -> Dict[str, Future]:
+        """Validate (guessed) URLs in the background; returns url -> Future[bool]"""
+        return {url: self._validator.submit(self.is_reachable, url) for url in set(urls)}
+
+    def _fetch_and_store(self, url: str) -> bool:
+        try:
+            with self._http.get(url, timeout=ThumbnailConstants.FETCH_TIMEOUT, stream=True) as resp:
+                if resp.status_code in (403, 404, 410):
+                    self._mark_missing(url)
+                    return False
+                resp.raise_for_status()
+                data = resp.raw.read(ThumbnailConstants.MAX_SOURCE_BYTES + 1, decode_content=True)
+            if len(data) > ThumbnailConstants.MAX_SOURCE_BYTES:
+                print(f"Thumbnail too large, skipped: {url}")
+                return False
+
+            size = (ThumbnailConstants.CARD_WIDTH, ThumbnailConstants.CARD_HEIGHT)
+            with PILImage.open(io.BytesIO(data)) as img:
+                img.draft("RGB", (size[0] * 2, size[1] * 2))  # JPEG: büyük kaynakta hızlı decode
+                card = ImageOps.fit(img.convert("RGB"), size, PILImage.Resampling.LANCZOS)
+
+            self._atomic_save(card, url, "webp", quality=ThumbnailConstants.WEBP_QUALITY, method=4)
+            self._atomic_save(card, url, "jpeg", quality=ThumbnailConstants.JPEG_QUALITY,
+                              optimize=True, progressive=True)
+            return True
+        except requests.RequestException as e:
+            print(f"Thumbnail fetch failed ({url}): {e}")
+            return False
+        except Exception as e:
+            print(f"Thumbnail processing failed ({url}): {e}")
+            self._mark_missing(url)
+            return False
+
+    def _atomic_save(self, img, url: str, fmt: str, **params) -> None:
+        path = self.variant_path(url, fmt)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        img.save(tmp_path, ThumbnailConstants.FORMATS[fmt][0], **params)
+        os.replace(tmp_path, path)
+        self._account(path.stat().st_size)
+
+    def _missing_marker(self, url: str) -> Path:
+        return self.cache_dir / f"{self.key_for(url)}.missing"
+
+    def _mark_missing(self, url: str) -> None:
+        marker = self._missing_marker(url)
+        try:
+            existed = marker.exists()
+            marker.touch()
+        except OSError:
+            return
+        if not existed:
+            self._account(0)
+
+    def _lock_for(self, url: str) -> threading.Lock:
+        # Sabit sayıda kilit: URL başına kilit tutulmaz, bellek URL sayısıyla büyümez
+        return self._stripes[int(self.key_for(url)[:8], 16) % len(self._stripes)]
+
+    # -- disk budget -----------------------------------------------------
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """Mark a cached file as recently used (mtime = LRU order); False if missing"""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def _scan(self) -> List[Tuple[float, Path, int]]:
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+        return entries
+
+    def _account(self, size: int) -> None:
+        with self._usage_lock:
+            self._bytes += size
+            self._files += 1
+            if self._bytes <= self.max_bytes and self._files <= self.max_files:
+                return
+            self._prune_locked()
+
+    def _prune_locked(self) -> None:
+        """Delete least recently used files until usage is PRUNE_TARGET of the limits"""
+        entries = sorted(self._scan())
+        total = sum(size for _, _, size in entries)
+        count = len(entries)
+        target_bytes = self.max_bytes * ThumbnailConstants.PRUNE_TARGET
+        target_files = self.max_files * ThumbnailConstants.PRUNE_TARGET
+        removed = 0
+        for _, path, size in entries:
+            if total <= target_bytes and count <= target_files:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            count -= 1
+            removed += 1
+        self._bytes, self._files = total, count
+        print(f"Thumbnail cache pruned: {removed} files removed, {total / 1024 / 1024:.1f} MB left")
+
+
+_thumbnail_cache: Optional[ThumbnailCache] = None
+_thumbnail_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Return the process-wide thumbnail cache"""
+    global _thumbnail_cache
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ThumbnailCache()
+        return _thumbnail_cache
+
+
+def thumbnail_proxy_url(url: str, api_base: Optional[str] = None) -> str:
+    """
+    Rewrite a remote Medium image URL to the api_server thumbnail endpoint.
+
+    Data URIs and non-Medium URLs are returned unchanged. The API base comes
+    from THUMBNAIL_PROXY_BASE (e.g. https://<render-url>) when not given;
+    without it the original URL is kept.
+    """
+    base = api_base if api_base is not None else os.getenv("THUMBNAIL_PROXY_BASE")
+    if not base or not ThumbnailCache.is_allowed(url):
+        return url
+    return f"{base.rstrip('/')}/api/thumbnail?url={quote(url, safe='')}"
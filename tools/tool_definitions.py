@@ -1,11 +1,11 @@
 # tools/tool_definitions.py
 
 from google.generativeai.types import Tool, FunctionDeclaration
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Optional
 import streamlit as st
 from tools.social_media_tool import SocialMediaAggregator
 from tools.job_compatibility_tool import JobCompatibilityAnalyzer
-from tools.pdf_generator import JobCompatibilityPDFGenerator
+from tools.pdf_generator import JobCompatibilityPDFGenerator, StoredPDF, pdf_store
 from datetime import datetime
 from tools.gemini_tool import generate_cover_letter
 from pathlib import Path
@@ -52,6 +52,19 @@ class ToolDefinitions:
             print(f"[ERROR] Job analyzer init failed: {e}")
             return False
 
+    @staticmethod
+    def session_pdf() -> Optional[StoredPDF]:
+        """
+        The last compatibility PDF of this session, for st.download_button
+        (data=entry.buffer, file_name=entry.filename). None once it expired
+        from pdf_store; the stale id is dropped then.
+        """
+        pdf_id = st.session_state.get("pdf_id")
+        entry = pdf_store.get(pdf_id) if pdf_id else None
+        if pdf_id and entry is None:
+            st.session_state.pop("pdf_id", None)
+        return entry
+
     # ========== TOOL DEFINITIONS ==========
 
     @staticmethod
@@ -154,7 +167,12 @@ class ToolDefinitions:
             return {"success": True, "message": "Email prepared.", "data": tool_args}
         elif tool_name == "get_recent_posts":
             try:
-                posts = self.social_media_aggregator.get_medium_posts(tool_args.get("limit", 5))
+                limit = tool_args.get("limit", 5)
+                search_query = (tool_args.get("search_query") or "").strip()
+                if search_query:
+                    posts = self.social_media_aggregator.search_posts(search_query, limit)
+                else:
+                    posts = self.social_media_aggregator.get_medium_posts(limit)
                 language = "tr" if "tr" in str(st.session_state.get("messages", [])).lower() else "en"
                 summary = self.social_media_aggregator.format_posts_for_chat(posts, language)
                 return {
@@ -169,21 +187,27 @@ class ToolDefinitions:
             if not report:
                 return {"success": False, "message": "No report found. Run analysis first."}
             try:
-                pdf_bytes = self.pdf_generator.generate_pdf(
+                buffer = self.pdf_generator.render_pdf_buffer(
                     report,
                     st.session_state.get("last_job_title", "Unknown Position"),
                     "Fatma Betül Arslan",
                     st.session_state.get("last_report_language", "en"),
                     st.session_state.get("last_company_name", "Unknown Company")
                 )
-                st.session_state.pdf_data = pdf_bytes
-                st.session_state.pdf_filename = (
-                    f"job_compatibility_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+                # /api/pdf/{id} sadece api_server sürecinde var; Streamlit byte'ları
+                # st.download_button ile kendisi sunar. Byte'lar session'da değil,
+                # bu sürecin TTL/boyut sınırlı pdf_store'unda durur; session sadece id tutar
+                previous = st.session_state.pop("pdf_id", None)
+                if previous:
+                    pdf_store.discard(previous)
+                entry = pdf_store.put(
+                    buffer, f"job_compatibility_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
                 )
+                st.session_state.pdf_id = entry.pdf_id
                 return {
                     "success": True,
                     "message": "PDF ready.",
-                    "data": {"filename": st.session_state.pdf_filename}
+                    "data": {"pdf_id": entry.pdf_id, "filename": entry.filename}
                 }
             except Exception as e:
                 return {"success": False, "message": f"PDF error: {e}"}
@@ -0,0 +1,134 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+try:  # OpenTelemetry kuruluysa span'ler oraya da aktarılır
+    from opentelemetry import trace as _otel_trace
+    _otel_tracer = _otel_trace.get_tracer("portfolio-chatbot")
+except ImportError:  # pragma: no cover
+    _otel_tracer = None
+
+
+class TracingConstants:
+    """Constants for the built-in span recorder"""
+    SLOW_TRACE_ENV = "TRACE_SLOW_MS"      # Bu süreyi aşan trace'ler loglanır (0 = kapalı)
+    DEFAULT_SLOW_TRACE_MS = 0.0
+    MAX_SPANS = 256                       # Tek trace'te tutulacak en fazla span
+
+
+_METRIC_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class Span:
+    """One timed stage; attributes are plain str/int/float/bool values"""
+
+    __slots__ = ("name", "start", "duration_ms", "attrs", "_otel")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.attrs = attrs
+        self._otel = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+        if self._otel is not None:
+            for key, value in attrs.items():
+                self._otel.set_attribute(key, value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "duration_ms": round(self.duration_ms, 2), **self.attrs}
+
+
+class Trace:
+    """
+    Spans recorded for one request (or one analyzer run).
+
+    Kept intentionally tiny: a list append per span, no locks, no exporters.
+    server_timing() renders the spans as a Server-Timing header value.
+    """
+
+    def __init__(self, name: str, **attrs: Any):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.spans: List[Span] = []
+
+    @property
+    def elapsed_ms(self) -> float:
+        return self.duration_ms or (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self) -> str:
+        parts = []
+        for s in self.spans:
+            entry = f"{_METRIC_NAME_RE.sub('_', s.name)};dur={s.duration_ms:.1f}"
+            if "cache" in s.attrs:
+                entry += f';desc="cache {s.attrs["cache"]}"'
+            parts.append(entry)
+        parts.append(f"total;dur={self.elapsed_ms:.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> str:
+        stages = " ".join(f"{s.name}={s.duration_ms:.0f}ms" for s in self.spans)
+        return f"[trace] {self.name} {self.elapsed_ms:.0f}ms {stages}"
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def _slow_threshold_ms() -> float:
+    try:
+        return float(os.getenv(TracingConstants.SLOW_TRACE_ENV, TracingConstants.DEFAULT_SLOW_TRACE_MS))
+    except ValueError:
+        return TracingConstants.DEFAULT_SLOW_TRACE_MS
+
+
+@contextmanager
+def start_trace(name: str, **attrs: Any) -> Iterator[Trace]:
+    """Make a new trace current for the enclosed block"""
+    trace = Trace(name, **attrs)
+    token = _current_trace.set(trace)
+    try:
+        if _otel_tracer is not None:
+            with _otel_tracer.start_as_current_span(name, attributes=attrs):
+                yield trace
+        else:
+            yield trace
+    finally:
+        trace.duration_ms = (time.perf_counter() - trace.start) * 1000
+        _current_trace.reset(token)
+        threshold = _slow_threshold_ms()
+        if threshold and trace.duration_ms >= threshold:
+            print(trace.summary())
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """
+    Time a stage of the current trace.
+
+    Works without an active trace too (the span is simply not recorded), so
+    library code such as the analyzer can be instrumented unconditionally.
+    """
+    s = Span(name, attrs)
+    trace = _current_trace.get()
+    try:
+        if _otel_tracer is not None:
+            with _otel_tracer.start_as_current_span(name, attributes=attrs) as otel_span:
+                s._otel = otel_span
+                yield s
+        else:
+            yield s
+    finally:
+        s.duration_ms = (time.perf_counter() - s.start) * 1000
+        if trace is not None and len(trace.spans) < TracingConstants.MAX_SPANS:
+            trace.spans.append(s)